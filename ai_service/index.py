@@ -0,0 +1,465 @@
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Same tokenisation as the TfidfVectorizer used before the index existed
+analyze = TfidfVectorizer(lowercase=True).build_analyzer()
+
+
+class Snapshot(NamedTuple):
+    matrix: sparse.csr_matrix
+    # Same weights in CSC layout: column j lists the users whose skills contain term j
+    postings: sparse.csc_matrix
+    idf: np.ndarray
+    # A list, or a (memory-mapped) string array for SnapshotIndex
+    ids: List[str]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the ``k`` largest scores, best first, via partial selection."""
+    if k <= 0 or scores.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < scores.size:
+        part = np.argpartition(-scores, k - 1)[:k]
+        # argpartition keeps arbitrary members of a tie at the k-th score; keep the
+        # earliest ones instead, as a full sort would
+        kth = scores[part].min()
+        above = np.flatnonzero(scores > kth)
+        part = np.concatenate([above, np.flatnonzero(scores == kth)[:k - above.size]])
+    else:
+        part = np.arange(scores.size)
+    # Order the k survivors by score, ties broken by position
+    return part[np.lexsort((part, -scores[part]))]
+
+
+class MentorIndex:
+    """TF-IDF index over users' ``skills_known`` that is updated one profile at a time.
+
+    Raw term counts are stored per user together with document frequencies, so an
+    upsert or delete only touches that user's tokens. The IDF-weighted, L2-normalised
+    matrix is derived from the counts (O(nnz), no re-tokenising) on the first query
+    after a change and cached until the next one.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._vocab: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._df: List[int] = []
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._rows: List[Tuple[np.ndarray, np.ndarray]] = []
+        # Derived from the counts, reset on every mutation
+        self._state: Optional[Snapshot] = None
+        self._version = 0
+        self._saved_version = 0
+        self._exported: Optional[Tuple[int, str]] = None
+
+    @classmethod
+    def from_profiles(cls, profiles: Iterable[Tuple[str, List[str]]]) -> "MentorIndex":
+        index = cls()
+        for user_id, skills_known in profiles:
+            index.upsert(user_id, skills_known)
+        return index
+
+    @classmethod
+    def from_columns(cls, ids: List[str], offsets: np.ndarray, codes: np.ndarray, vocab: List[str]) -> "MentorIndex":
+        """Same index as ``from_profiles`` from dictionary-encoded profiles.
+
+        User ``i`` knows ``vocab[c]`` for each ``c`` in ``codes[offsets[i]:offsets[i + 1]]``.
+        Each distinct skill string is tokenised once and term counts are summed with a
+        sparse product, instead of tokenising every user's skills.
+        """
+        terms: List[str] = []
+        term_cols: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for skill in vocab:
+            for term, count in Counter(analyze(skill)).items():
+                col = term_cols.get(term)
+                if col is None:
+                    col = term_cols[term] = len(terms)
+                    terms.append(term)
+                indices.append(col)
+                data.append(count)
+            indptr.append(len(indices))
+        skill_terms = sparse.csr_matrix((data, indices, indptr), shape=(len(vocab), len(terms)))
+        user_skills = sparse.csr_matrix(
+            (np.ones(len(codes)), np.asarray(codes, dtype=np.int64), np.asarray(offsets, dtype=np.int64)),
+            shape=(len(ids), len(vocab)),
+        )
+        return cls.from_counts(ids, terms, sparse.csr_matrix(user_skills @ skill_terms))
+
+    @classmethod
+    def from_counts(cls, ids: List[str], terms: List[str], counts: sparse.csr_matrix) -> "MentorIndex":
+        """Index over a users x terms matrix of raw term counts."""
+        counts.sum_duplicates()
+        counts.sort_indices()
+        index = cls()
+        index._terms = list(terms)
+        index._vocab = {t: i for i, t in enumerate(index._terms)}
+        index._df = np.bincount(counts.indices, minlength=len(terms)).tolist()
+        index._ids = list(ids)
+        index._pos = {u: i for i, u in enumerate(index._ids)}
+        indices = counts.indices.astype(np.int32, copy=False)
+        index._rows = [
+            (indices[counts.indptr[i]:counts.indptr[i + 1]], counts.data[counts.indptr[i]:counts.indptr[i + 1]])
+            for i in range(len(index._ids))
+        ]
+        index._touch()
+        return index
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ---- mutation ----
+
+    def upsert(self, user_id: str, skills_known: List[str]):
+        counts = Counter(analyze(" ".join(skills_known)))
+        with self._lock:
+            cols = []
+            for term in counts:
+                col = self._vocab.get(term)
+                if col is None:
+                    col = len(self._terms)
+                    self._vocab[term] = col
+                    self._terms.append(term)
+                    self._df.append(0)
+                cols.append(col)
+            order = np.argsort(cols)
+            indices = np.asarray(cols, dtype=np.int32)[order]
+            data = np.asarray(list(counts.values()), dtype=np.float64)[order]
+
+            pos = self._pos.get(user_id)
+            if pos is None:
+                self._pos[user_id] = len(self._ids)
+                self._ids.append(user_id)
+                self._rows.append((indices, data))
+            else:
+                for col in self._rows[pos][0]:
+                    self._df[col] -= 1
+                self._rows[pos] = (indices, data)
+            for col in indices:
+                self._df[col] += 1
+            self._touch()
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock:
+            pos = self._pos.pop(user_id, None)
+            if pos is None:
+                return False
+            for col in self._rows[pos][0]:
+                self._df[col] -= 1
+            # Swap-remove keeps row positions dense
+            last = len(self._ids) - 1
+            if pos != last:
+                moved = self._ids[last]
+                self._ids[pos] = moved
+                self._rows[pos] = self._rows[last]
+                self._pos[moved] = pos
+            self._ids.pop()
+            self._rows.pop()
+            self._touch()
+            return True
+
+    def _touch(self):
+        self._state = None
+        self._version += 1
+
+    # ---- querying ----
+
+    def _build(self) -> Snapshot:
+        with self._lock:
+            if self._state is not None:
+                return self._state
+            n = len(self._rows)
+            df = np.asarray(self._df, dtype=np.float64)
+            # Smoothed IDF, as in TfidfVectorizer's defaults
+            idf = np.log((1 + n) / (1 + df)) + 1
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            if n:
+                np.cumsum([len(r[0]) for r in self._rows], out=indptr[1:])
+                indices = np.concatenate([r[0] for r in self._rows])
+                data = np.concatenate([r[1] for r in self._rows])
+            else:
+                indices = np.zeros(0, dtype=np.int32)
+                data = np.zeros(0, dtype=np.float64)
+            counts = sparse.csr_matrix((data, indices, indptr), shape=(n, len(self._terms)))
+            weighted = sparse.csr_matrix(counts.multiply(idf))
+            norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            matrix = sparse.csr_matrix(sparse.diags(1.0 / norms) @ weighted)
+            self._state = Snapshot(matrix, matrix.tocsc(), idf, list(self._ids))
+            return self._state
+
+    def query_matrix(self, texts: List[str], snap: Optional[Snapshot] = None) -> sparse.csr_matrix:
+        """L2-normalised TF-IDF rows for ``texts`` in the index's vocabulary."""
+        snap = snap or self._build()
+        n, vocab_size = snap.matrix.shape
+        unseen_idf = np.log(1 + n) + 1
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for text in texts:
+            row_start = len(data)
+            unseen = 0.0
+            for term, count in Counter(analyze(text)).items():
+                col = self._vocab.get(term)
+                if col is None or col >= vocab_size:
+                    # Terms no mentor knows only contribute to the query norm
+                    unseen += (count * unseen_idf) ** 2
+                else:
+                    indices.append(col)
+                    data.append(count * snap.idf[col])
+            row = np.asarray(data[row_start:])
+            norm = np.sqrt(row @ row + unseen)
+            if norm:
+                data[row_start:] = (row / norm).tolist()
+            indptr.append(len(data))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(texts), vocab_size),
+        )
+
+    def query_vector(self, text: str, snap: Optional[Snapshot] = None) -> np.ndarray:
+        return self.query_matrix([text], snap).toarray().ravel()
+
+    def candidates(self, snap: Snapshot, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Score only users sharing at least one term with ``q``.
+
+        Walks the postings of the query's non-zero terms, so the cost is proportional
+        to how many users know those terms rather than to the size of the index.
+        """
+        cols = np.flatnonzero(q)
+        if cols.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        postings = snap.postings
+        starts = postings.indptr[cols]
+        lengths = postings.indptr[cols + 1] - starts
+        if not lengths.sum():
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        # Flat positions of every posting of every query term
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        rows = postings.indices[offsets]
+        weights = postings.data[offsets] * np.repeat(q[cols], lengths)
+        users, inverse = np.unique(rows, return_inverse=True)
+        return users, np.bincount(inverse, weights=weights)
+
+    def search(self, text: str, top_k: int = 5) -> Tuple[List[Tuple[str, float]], List[str]]:
+        snap = self._build()
+        users, sim = self.candidates(snap, self.query_vector(text, snap))
+        return self._rank(snap, users, sim, text, top_k)
+
+    def search_many(
+        self,
+        texts: List[str],
+        top_k: int = 5,
+        exclude: Optional[List[Optional[str]]] = None,
+        chunk_size: int = 64,
+    ) -> Iterator[Tuple[List[Tuple[str, float]], List[str]]]:
+        """Yield ``search`` results for each text, in order.
+
+        Queries are vectorised together and scored ``chunk_size`` at a time with one
+        sparse matrix product, so memory is bounded by the chunk rather than the batch.
+        ``exclude`` optionally names a user to leave out of each query's mentors.
+        """
+        snap = self._build()
+        for start in range(0, len(texts), chunk_size):
+            chunk = texts[start:start + chunk_size]
+            scores = sparse.csc_matrix(snap.matrix @ self.query_matrix(chunk, snap).T)
+            for j, text in enumerate(chunk):
+                lo, hi = scores.indptr[j], scores.indptr[j + 1]
+                users, sim = scores.indices[lo:hi], scores.data[lo:hi]
+                row = self._row_of(snap, exclude[start + j]) if exclude else None
+                if row is not None:
+                    keep = users != row
+                    users, sim = users[keep], sim[keep]
+                yield self._rank(snap, users, sim, text, top_k)
+
+    def _row_of(self, snap: Snapshot, user_id: Optional[str]) -> Optional[int]:
+        pos = self._pos.get(user_id) if user_id is not None else None
+        if pos is None or pos >= len(snap.ids) or snap.ids[pos] != user_id:
+            return None
+        return pos
+
+    def _rank(self, snap: Snapshot, users: np.ndarray, sim: np.ndarray, text: str, top_k: int):
+        top = top_k_indices(sim, top_k)
+        top = top[sim[top] > 0]
+        mentors = [(str(snap.ids[users[i]]), float(sim[i])) for i in top]
+        return mentors, self.next_skills(snap.matrix, users[top], text)
+
+    def next_skills(self, matrix: sparse.csr_matrix, rows: np.ndarray, text: str, limit: int = 5) -> List[str]:
+        # Next skills = most frequent tokens in mentors beyond target term
+        if len(rows) == 0:
+            return []
+        avg_weights = matrix[rows].mean(axis=0).A1
+        top_terms_idx = np.argsort(avg_weights)[::-1][:10]
+        exclude = text.lower().split()
+        candidate_terms = [self._terms[i] for i in top_terms_idx if avg_weights[i] > 0]
+        return [t for t in candidate_terms if t not in exclude][:limit]
+
+    # ---- persistence ----
+
+    @classmethod
+    def load(cls, path: str) -> "MentorIndex":
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        with np.load(path, allow_pickle=False) as f:
+            terms = f["terms"].tolist()
+            ids = f["ids"].tolist()
+            indptr = f["indptr"]
+            indices = f["indices"]
+            data = f["data"]
+        index._terms = terms
+        index._vocab = {t: i for i, t in enumerate(terms)}
+        index._df = np.bincount(indices, minlength=len(terms)).tolist()
+        index._ids = ids
+        index._pos = {u: i for i, u in enumerate(ids)}
+        index._rows = [
+            (indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]])
+            for i in range(len(ids))
+        ]
+        return index
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            return
+        with self._save_lock:
+            self._save(path)
+
+    def _save(self, path: str):
+        with self._lock:
+            if path == self.path and self._saved_version == self._version and os.path.exists(path):
+                return
+            version = self._version
+            n = len(self._rows)
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            if n:
+                np.cumsum([len(r[0]) for r in self._rows], out=indptr[1:])
+            indices = np.concatenate([r[0] for r in self._rows]) if n else np.zeros(0, dtype=np.int32)
+            data = np.concatenate([r[1] for r in self._rows]) if n else np.zeros(0)
+            terms = np.array(self._terms, dtype=str)
+            ids = np.array(self._ids, dtype=str)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            np.savez_compressed(fh, terms=terms, ids=ids, indptr=indptr, indices=indices, data=data)
+        # Atomic swap so a crash mid-write never leaves a truncated index behind
+        os.replace(tmp, path)
+        if path == self.path:
+            self._saved_version = version
+
+    # ---- shared snapshots ----
+
+    def export_snapshot(self, root: str, keep: int = 2, grace: float = 300.0) -> str:
+        """Write the derived matrices as uncompressed ``.npy`` files for ``SnapshotIndex``.
+
+        Each export goes to a new directory under ``root`` (renamed into place once
+        complete) and ``root/CURRENT`` names the latest. Unchanged indexes are not
+        re-exported. Older exports beyond ``keep`` are removed once they have been
+        superseded for ``grace`` seconds, so tasks queued against them can still open
+        them; processes that already map them keep reading the unlinked files.
+        """
+        with self._lock:
+            if self._exported and self._exported[0] == self._version and os.path.isdir(self._exported[1]):
+                return self._exported[1]
+            version = self._version
+            snap = self._build()
+            terms = np.array(self._terms, dtype=str)
+        arrays = {
+            "data": snap.matrix.data,
+            "indices": snap.matrix.indices,
+            "indptr": snap.matrix.indptr,
+            "post_data": snap.postings.data,
+            "post_indices": snap.postings.indices,
+            "post_indptr": snap.postings.indptr,
+            "idf": snap.idf,
+            "terms": terms,
+            "ids": np.array(snap.ids, dtype=str),
+        }
+        os.makedirs(root, exist_ok=True)
+        name = f"{time.time_ns():x}"
+        tmp = os.path.join(root, f".{name}.tmp")
+        os.makedirs(tmp)
+        for key, array in arrays.items():
+            np.save(os.path.join(tmp, f"{key}.npy"), array)
+        path = os.path.join(root, name)
+        os.replace(tmp, path)
+        with open(os.path.join(root, "CURRENT.tmp"), "w") as fh:
+            fh.write(name)
+        os.replace(os.path.join(root, "CURRENT.tmp"), os.path.join(root, "CURRENT"))
+        # Names are export times, so each export was superseded when the next one was written
+        names = sorted(d for d in os.listdir(root) if not d.startswith(".") and d != "CURRENT")
+        expired = time.time_ns() - int(grace * 1e9)
+        for old, newer in zip(names[:-keep], names[1:]):
+            if int(newer, 16) < expired:
+                shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+        with self._lock:
+            self._exported = (version, path)
+        return path
+
+
+class SnapshotIndex(MentorIndex):
+    """Read-only MentorIndex over an exported snapshot.
+
+    Arrays are memory-mapped, so any number of processes opening the same snapshot
+    share one copy of the matrices in the page cache. Only the term vocabulary is
+    materialised per process.
+    """
+
+    @classmethod
+    def open(cls, path: str) -> "SnapshotIndex":
+        if os.path.isfile(os.path.join(path, "CURRENT")):
+            with open(os.path.join(path, "CURRENT")) as fh:
+                path = os.path.join(path, fh.read().strip())
+
+        def load(key):
+            return np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r")
+
+        index = cls(path)
+        terms = load("terms")
+        ids = load("ids")
+        shape = (len(ids), len(terms))
+        matrix = sparse.csr_matrix((load("data"), load("indices"), load("indptr")), shape=shape, copy=False)
+        postings = sparse.csc_matrix(
+            (load("post_data"), load("post_indices"), load("post_indptr")), shape=shape, copy=False
+        )
+        index._terms = terms.tolist()
+        index._vocab = {t: i for i, t in enumerate(index._terms)}
+        index._state = Snapshot(matrix, postings, np.asarray(load("idf")), ids)
+        return index
+
+    def __len__(self):
+        return len(self._state.ids)
+
+    def _build(self) -> Snapshot:
+        return self._state
+
+    def _row_of(self, snap: Snapshot, user_id: Optional[str]) -> Optional[int]:
+        if user_id is None:
+            return None
+        if not self._pos:
+            # Built on first use only: batch queries with learners to exclude
+            self._pos = {str(u): i for i, u in enumerate(snap.ids)}
+        return self._pos.get(user_id)
+
+    def upsert(self, user_id: str, skills_known: List[str]):
+        raise TypeError("SnapshotIndex is read-only")
+
+    def delete(self, user_id: str) -> bool:
+        raise TypeError("SnapshotIndex is read-only")
+
+    def save(self, path: Optional[str] = None):
+        raise TypeError("SnapshotIndex is read-only")
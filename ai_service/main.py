@@ -1,22 +1,69 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import List
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
 
-app = FastAPI(title="Peerverse AI Service", version="0.1.0")
+import wire
+from index import MentorIndex
+from pool import ScoringPool
+
+# Long-lived mentor index, loaded once and kept in sync through /index/users
+MENTOR_INDEX_PATH = os.getenv("MENTOR_INDEX_PATH", "data/mentor_index.npz")
+mentor_index = MentorIndex.load(MENTOR_INDEX_PATH)
+
+# With SCORING_WORKERS > 0, queries against the mentor index run in that many
+# processes sharing a memory-mapped snapshot (see pool.py); 0 scores in-process
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "0"))
+MENTOR_SNAPSHOT_DIR = os.getenv("MENTOR_SNAPSHOT_DIR", "data/snapshots")
+scoring_pool: Optional[ScoringPool] = None
+
+# Index updates are saved and published this many seconds after the first of a burst,
+# once for the whole burst
+PERSIST_DELAY = float(os.getenv("PERSIST_DELAY", "1.0"))
+_persist_timer: Optional[threading.Timer] = None
+_persist_timer_lock = threading.Lock()
+_persist_lock = threading.Lock()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global scoring_pool
+    if SCORING_WORKERS > 0:
+        scoring_pool = ScoringPool(mentor_index, MENTOR_SNAPSHOT_DIR, SCORING_WORKERS)
+    yield
+    flush_index()
+    if scoring_pool is not None:
+        scoring_pool.shutdown()
+        scoring_pool = None
+
+app = FastAPI(title="Peerverse AI Service", version="0.1.0", lifespan=lifespan)
 
 class UserProfile(BaseModel):
     id: str
     skills_known: List[str] = []
     skills_to_learn: List[str] = []
 
+class IndexedProfile(BaseModel):
+    skills_known: List[str] = []
+    skills_to_learn: List[str] = []
+
 class SkillQuery(BaseModel):
-    users: List[UserProfile]
+    users: Optional[List[UserProfile]] = None
     target_skill: str
     top_k: int = 5
 
+class BatchSkillQuery(BaseModel):
+    users: Optional[List[UserProfile]] = None
+    # Either plain target skills, or learners whose skills_to_learn form the query
+    target_skills: List[str] = []
+    learners: List[UserProfile] = []
+    top_k: int = 5
+
 class Recommendation(BaseModel):
     user_id: str
     score: float
@@ -27,30 +74,140 @@ class SkillRecResponse(BaseModel):
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
-
-@app.post("/recommend", response_model=SkillRecResponse)
-def recommend(data: SkillQuery):
-    corpus = [" ".join(u.skills_known) for u in data.users]
-    if not corpus:
-        return {"mentors": [], "next_skills": []}
-
-    vectorizer = TfidfVectorizer(lowercase=True)
-    X = vectorizer.fit_transform(corpus + [data.target_skill])
-    sim = cosine_similarity(X[-1], X[:-1]).flatten()
-
-    top_idx = np.argsort(sim)[::-1][: data.top_k]
-    mentors = [
-        {"user_id": data.users[i].id, "score": float(sim[i])}
-        for i in top_idx if sim[i] > 0
-    ]
-
-    # Next skills = most frequent tokens in mentors beyond target term
-    feature_names = np.array(vectorizer.get_feature_names_out())
-    mentor_vecs = X[top_idx]
-    avg_weights = mentor_vecs.mean(axis=0).A1
-    top_terms_idx = np.argsort(avg_weights)[::-1][:10]
-    candidate_terms = feature_names[top_terms_idx]
-    next_skills = [t for t in candidate_terms if t.lower() not in data.target_skill.lower().split()][:5]
-
-    return {"mentors": mentors, "next_skills": next_skills}
+    return {"status": "ok", "indexed_users": len(mentor_index), "scoring_workers": SCORING_WORKERS}
+
+def profile_index(users: Optional[List[UserProfile]]) -> MentorIndex:
+    if users is None:
+        return mentor_index
+    return MentorIndex.from_profiles((u.id, u.skills_known) for u in users)
+
+@app.post(
+    "/recommend",
+    response_model=SkillRecResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": SkillQuery.model_json_schema()},
+                # Columnar users, see wire.py
+                wire.CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    },
+)
+async def recommend(request: Request):
+    # The body is parsed by hand so msgpack payloads skip per-user pydantic models
+    body = await request.body()
+    if wire.is_msgpack(request.headers.get("content-type")):
+        try:
+            query = wire.decode_query(body)
+        except wire.WireError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        target_skill, top_k, users = query
+        build = lambda: mentor_index if users is None else MentorIndex.from_columns(*users)
+    else:
+        try:
+            data = SkillQuery.model_validate_json(body)
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors(include_url=False))
+        target_skill, top_k, users = data.target_skill, data.top_k, data.users
+        build = lambda: profile_index(data.users)
+
+    # Without an explicit user list, query the persistent mentor index
+    if users is None and scoring_pool is not None:
+        mentors, next_skills = await scoring_pool.search(target_skill, top_k)
+    else:
+        mentors, next_skills = await run_in_threadpool(lambda: build().search(target_skill, top_k))
+    result = {
+        "mentors": [{"user_id": user_id, "score": score} for user_id, score in mentors],
+        "next_skills": next_skills,
+    }
+    if wire.CONTENT_TYPE in request.headers.get("accept", ""):
+        return Response(wire.pack(result), media_type=wire.CONTENT_TYPE)
+    return result
+
+@app.post("/recommend/batch")
+async def recommend_batch(data: BatchSkillQuery):
+    texts = list(data.target_skills) + [" ".join(l.skills_to_learn) for l in data.learners]
+    # A learner is never recommended as their own mentor
+    learner_ids = [None] * len(data.target_skills) + [l.id for l in data.learners]
+
+    def line(text, learner_id, mentors, next_skills):
+        row = {
+            "target_skill": text,
+            "mentors": [{"user_id": user_id, "score": score} for user_id, score in mentors],
+            "next_skills": next_skills,
+        }
+        if learner_id is not None:
+            row["learner_id"] = learner_id
+        return json.dumps(row) + "\n"
+
+    if data.users is None and scoring_pool is not None:
+        async def pooled_lines():
+            results = scoring_pool.search_many(texts, data.top_k, exclude=learner_ids)
+            i = 0
+            async for mentors, next_skills in results:
+                yield line(texts[i], learner_ids[i], mentors, next_skills)
+                i += 1
+
+        return StreamingResponse(pooled_lines(), media_type="application/x-ndjson")
+
+    index = await run_in_threadpool(profile_index, data.users)
+
+    def lines():
+        results = index.search_many(texts, data.top_k, exclude=learner_ids)
+        for text, learner_id, (mentors, next_skills) in zip(texts, learner_ids, results):
+            yield line(text, learner_id, mentors, next_skills)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def persist_index():
+    with _persist_lock:
+        mentor_index.save()
+        if scoring_pool is not None:
+            scoring_pool.publish()
+
+def _persist_scheduled():
+    global _persist_timer
+    with _persist_timer_lock:
+        _persist_timer = None
+    # Updates from here on schedule the next persist
+    persist_index()
+
+def schedule_persist():
+    """Persist the index PERSIST_DELAY seconds from now, unless already scheduled."""
+    global _persist_timer
+    with _persist_timer_lock:
+        if _persist_timer is None:
+            _persist_timer = threading.Timer(PERSIST_DELAY, _persist_scheduled)
+            _persist_timer.daemon = True
+            _persist_timer.start()
+
+def flush_index():
+    """Persist any scheduled update now."""
+    global _persist_timer
+    with _persist_timer_lock:
+        timer, _persist_timer = _persist_timer, None
+    if timer is not None:
+        timer.cancel()
+        persist_index()
+
+@app.put("/index/users/{user_id}")
+def index_upsert(user_id: str, profile: IndexedProfile):
+    mentor_index.upsert(user_id, profile.skills_known)
+    schedule_persist()
+    return {"id": user_id, "indexed": len(mentor_index)}
+
+@app.post("/index/users")
+def index_bulk_upsert(profiles: List[UserProfile]):
+    for p in profiles:
+        mentor_index.upsert(p.id, p.skills_known)
+    schedule_persist()
+    return {"upserted": len(profiles), "indexed": len(mentor_index)}
+
+@app.delete("/index/users/{user_id}")
+def index_delete(user_id: str):
+    if not mentor_index.delete(user_id):
+        raise HTTPException(status_code=404, detail="User not indexed")
+    schedule_persist()
+    return {"id": user_id, "indexed": len(mentor_index)}
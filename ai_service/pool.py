@@ -0,0 +1,91 @@
+"""Scoring in a process pool over shared, memory-mapped index snapshots.
+
+The API process keeps the mutable MentorIndex. ``ScoringPool.publish`` exports it
+with ``MentorIndex.export_snapshot``; every pool worker opens the same files with
+``SnapshotIndex`` (mmap), so N workers cost one copy of the matrices, not N. Tasks
+name the snapshot they were submitted against, and a worker reopens when it sees a
+newer one, so updates through /index/users reach the workers without restarting them.
+A task whose snapshot has already been cleaned up is scored against the latest one.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+from index import MentorIndex, SnapshotIndex
+
+_worker_index: Optional[SnapshotIndex] = None
+_worker_path: Optional[str] = None
+
+
+def _open(path: str) -> SnapshotIndex:
+    global _worker_index, _worker_path
+    if path != _worker_path:
+        try:
+            _worker_index = SnapshotIndex.open(path)
+        except FileNotFoundError:
+            # Removed after the task was queued: the snapshot root's CURRENT is newer
+            _worker_index = SnapshotIndex.open(os.path.dirname(path))
+        _worker_path = path
+    return _worker_index
+
+
+def _search(path: str, text: str, top_k: int):
+    return _open(path).search(text, top_k)
+
+
+def _search_many(path: str, texts: List[str], top_k: int, exclude: Optional[List[Optional[str]]]):
+    return list(_open(path).search_many(texts, top_k, exclude=exclude))
+
+
+class ScoringPool:
+    def __init__(self, index: MentorIndex, root: str, workers: int):
+        self.index = index
+        self.root = root
+        self.workers = workers
+        self.path = index.export_snapshot(root)
+        # spawn: forking a process that already runs an event loop and threads is unsafe
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_open,
+            initargs=(self.path,),
+        )
+
+    def publish(self):
+        """Export the index if it changed; tasks submitted from now on use the new snapshot."""
+        self.path = self.index.export_snapshot(self.root)
+
+    async def search(self, text: str, top_k: int) -> Tuple[List[Tuple[str, float]], List[str]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _search, self.path, text, top_k)
+
+    async def search_many(
+        self,
+        texts: List[str],
+        top_k: int,
+        exclude: Optional[List[Optional[str]]] = None,
+        chunk_size: int = 64,
+    ) -> AsyncIterator[Tuple[List[Tuple[str, float]], List[str]]]:
+        """Like ``MentorIndex.search_many``: chunks are scored in parallel, results yielded in order."""
+        loop = asyncio.get_running_loop()
+        path = self.path
+        chunks = [
+            (texts[i:i + chunk_size], exclude[i:i + chunk_size] if exclude else None)
+            for i in range(0, len(texts), chunk_size)
+        ]
+        # Keep every worker busy without queueing the whole batch up front
+        window = self.workers * 2
+        pending = []
+        for chunk, chunk_exclude in chunks:
+            pending.append(loop.run_in_executor(self.executor, _search_many, path, chunk, top_k, chunk_exclude))
+            if len(pending) >= window:
+                for result in await pending.pop(0):
+                    yield result
+        for future in pending:
+            for result in await future:
+                yield result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,128 @@
+"""Throughput and tail latency of /recommend versus SCORING_WORKERS.
+
+Builds a synthetic mentor index, then for each worker count starts the service with
+uvicorn, drives it with --concurrency parallel clients for --duration seconds and
+reports requests/s, p50/p99 latency and the server's total PSS (proportional set
+size, so pages shared through the mmap'd snapshot are counted once).
+
+    cd ai_service && python scripts/bench_concurrency.py --users 200000 --workers 0 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_topk import synthetic_profiles  # noqa: E402
+from index import MentorIndex  # noqa: E402
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_tree(pid):
+    pids = [pid]
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/task/{p}/children") as fh:
+                pids.extend(int(c) for c in fh.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def pss_mb(pid):
+    # Linux only; 0 elsewhere
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/smaps_rollup") as fh:
+                total += sum(int(line.split()[1]) for line in fh if line.startswith("Pss:"))
+        except OSError:
+            pass
+    return total / 1024
+
+
+async def load(url, queries, concurrency, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+
+        async def worker(i):
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                r = await client.post("/recommend", json={"target_skill": queries[i % len(queries)], "top_k": 5})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                i += concurrency
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    index_path = os.path.join(tmp, "mentor_index.npz")
+    MentorIndex.from_profiles(synthetic_profiles(args.users, args.vocab, rng)).save(index_path)
+    # Mostly popular skills, which touch the most postings
+    queries = [f"skill{t} skill{t + 7}" for t in rng.zipf(1.3, 500) % args.vocab]
+
+    print(f"{args.users} users, {args.concurrency} concurrent clients, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'PSS MB':>9}")
+    for workers in args.workers:
+        port = free_port()
+        env = {
+            **os.environ,
+            "MENTOR_INDEX_PATH": index_path,
+            "SCORING_WORKERS": str(workers),
+            "MENTOR_SNAPSHOT_DIR": os.path.join(tmp, f"snapshots-{workers}"),
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=SERVICE_DIR,
+            env=env,
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(600):
+                try:
+                    if httpx.get(f"{url}/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            # Warm every pool worker before measuring
+            asyncio.run(load(url, queries, max(workers, 1) * 2, 1.0))
+            rps, p50, p99 = asyncio.run(load(url, queries, args.concurrency, args.duration))
+            print(f"{workers:>8} {rps:>9.0f} {p50:>9.1f} {p99:>9.1f} {pss_mb(server.pid):>9.0f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare top-k mentor retrieval strategies on synthetic profiles.
+
+    cd ai_service && python scripts/bench_topk.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index import MentorIndex, top_k_indices  # noqa: E402
+
+
+def synthetic_profiles(n, vocab_size, rng):
+    # Zipf-ish popularity so a few skills are very common, as in real catalogs
+    weights = 1.0 / np.arange(1, vocab_size + 1)
+    weights /= weights.sum()
+    sizes = rng.integers(2, 8, size=n)
+    tokens = rng.choice(vocab_size, size=int(sizes.sum()), p=weights)
+    pos = 0
+    for i, size in enumerate(sizes):
+        yield str(i), [f"skill{t}" for t in tokens[pos:pos + size]]
+        pos += size
+
+
+def timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return np.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    # A popular, a mid-range and a rare skill
+    queries = ["skill1", "skill40 skill41", "skill900"]
+
+    print(f"{'users':>9} {'query':>16} {'argsort':>10} {'argpart':>10} {'inverted':>10}  (median ms)")
+    for n in args.sizes:
+        index = MentorIndex.from_profiles(synthetic_profiles(n, args.vocab, rng))
+        snap = index._build()
+        for text in queries:
+            q = index.query_vector(text, snap)
+
+            def full_argsort():
+                sim = snap.matrix @ q
+                return np.argsort(sim)[::-1][:args.top_k]
+
+            def full_argpartition():
+                return top_k_indices(snap.matrix @ q, args.top_k)
+
+            def inverted():
+                users, sim = index.candidates(snap, q)
+                return users[top_k_indices(sim, args.top_k)]
+
+            print(
+                f"{n:>9} {text:>16} "
+                f"{timeit(full_argsort, args.repeat):>10.2f} "
+                f"{timeit(full_argpartition, args.repeat):>10.2f} "
+                f"{timeit(inverted, args.repeat):>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Payload size and decode cost of /recommend bodies: JSON versus columnar msgpack.
+
+"decode" is everything between receiving the body and having an index to search:
+JSON goes through pydantic (one UserProfile per user) and MentorIndex.from_profiles,
+msgpack through wire.decode_query and MentorIndex.from_columns.
+
+    cd ai_service && python scripts/bench_wire.py --sizes 10000 100000
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire  # noqa: E402
+from bench_topk import synthetic_profiles, timeit  # noqa: E402
+from index import MentorIndex  # noqa: E402
+from main import SkillQuery, profile_index  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'users':>9} {'format':>8} {'bytes':>12} {'decode ms':>10} {'search ms':>10}")
+    for n in args.sizes:
+        profiles = list(synthetic_profiles(n, args.vocab, rng))
+        json_body = json.dumps({
+            "target_skill": "skill40",
+            "users": [{"id": user_id, "skills_known": skills} for user_id, skills in profiles],
+        }).encode()
+        msgpack_body = wire.pack({"target_skill": "skill40", "users": wire.encode_users(profiles)})
+
+        def from_json():
+            return profile_index(SkillQuery.model_validate_json(json_body).users)
+
+        def from_msgpack():
+            return MentorIndex.from_columns(*wire.decode_query(msgpack_body).users)
+
+        for name, body, decode in (("json", json_body, from_json), ("msgpack", msgpack_body, from_msgpack)):
+            index = decode()
+            search = timeit(lambda: index.search("skill40", 5), args.repeat)
+            print(f"{n:>9} {name:>8} {len(body):>12,} {timeit(decode, args.repeat):>10.1f} {search:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
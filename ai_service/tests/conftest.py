@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# The service runs from its own directory (``uvicorn main:app``)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main loads and saves its index at import: keep it away from data/
+_data = tempfile.mkdtemp(prefix="ai-service-tests-")
+os.environ.setdefault("MENTOR_INDEX_PATH", os.path.join(_data, "mentor_index.npz"))
+os.environ.setdefault("MENTOR_SNAPSHOT_DIR", os.path.join(_data, "snapshots"))
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from index import MentorIndex, top_k_indices
+
+PROFILES = [
+    ("u1", ["Python", "Django"]),
+    ("u2", ["Rust", "Go"]),
+    ("u3", ["Python", "NumPy", "pandas"]),
+    ("u4", ["Django", "PostgreSQL"]),
+]
+
+
+def state(index):
+    snap = index._build()
+    return list(snap.ids), snap.matrix.toarray(), index._terms
+
+
+def assert_same_index(a, b):
+    for text in ("python", "django postgresql", "rust", "haskell"):
+        (mentors_a, next_a), (mentors_b, next_b) = a.search(text, 3), b.search(text, 3)
+        assert mentors_a == pytest.approx(mentors_b)
+        # Equal-weight next skills come in vocabulary order, which depends on insertion order
+        assert sorted(next_a) == sorted(next_b)
+    # Same users and weights per term, whatever the row and column order
+    ids_a, matrix_a, terms_a = state(a)
+    ids_b, matrix_b, terms_b = state(b)
+    assert sorted(ids_a) == sorted(ids_b)
+    rows = [ids_b.index(u) for u in ids_a]
+    # Terms that nobody knows any more stay in the vocabulary with empty columns
+    shared = [i for i, t in enumerate(terms_a) if t in terms_b]
+    assert not matrix_a[:, [i for i in range(len(terms_a)) if i not in shared]].any()
+    assert set(terms_b) <= set(terms_a)
+    cols = [terms_b.index(terms_a[i]) for i in shared]
+    np.testing.assert_allclose(matrix_a[:, shared], matrix_b[np.ix_(rows, cols)])
+
+
+def test_upserts_and_deletes_match_a_fresh_build():
+    index = MentorIndex.from_profiles(PROFILES)
+    index.upsert("u2", ["Python", "FastAPI"])
+    index.upsert("u5", ["Go"])
+    assert index.delete("u1")
+    assert not index.delete("u1")
+    expected = [("u4", PROFILES[3][1]), ("u2", ["Python", "FastAPI"]), ("u3", PROFILES[2][1]), ("u5", ["Go"])]
+    assert len(index) == 4
+    assert_same_index(index, MentorIndex.from_profiles(expected))
+    # Terms nobody knows any more drop out of the document frequencies
+    assert index._df[index._vocab["rust"]] == 0
+
+
+def test_from_columns_matches_from_profiles():
+    vocab = sorted({skill for _, skills in PROFILES for skill in skills})
+    codes, offsets = [], [0]
+    for _, skills in PROFILES:
+        codes += [vocab.index(skill) for skill in skills]
+        offsets.append(len(codes))
+    index = MentorIndex.from_columns([u for u, _ in PROFILES], np.array(offsets), np.array(codes), vocab)
+    assert_same_index(index, MentorIndex.from_profiles(PROFILES))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = MentorIndex(path)
+    for user_id, skills in PROFILES:
+        index.upsert(user_id, skills)
+    index.delete("u2")
+    index.save()
+    loaded = MentorIndex.load(path)
+    assert_same_index(loaded, index)
+
+    # The loaded index keeps taking updates and saves them again
+    loaded.upsert("u6", ["Rust"])
+    loaded.save()
+    assert_same_index(MentorIndex.load(path), loaded)
+    assert MentorIndex.load(str(tmp_path / "missing.npz")).search("python") == ([], [])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_top_k_matches_a_full_sort_with_ties(seed):
+    rng = np.random.default_rng(seed)
+    # Few distinct values, so most of the top k are ties
+    scores = rng.integers(0, 4, size=200).astype(np.float64)
+    full = np.lexsort((np.arange(scores.size), -scores))
+    for k in (0, 1, 5, 57, 199, 200, 500):
+        np.testing.assert_array_equal(top_k_indices(scores, k), full[:k])
+    assert top_k_indices(np.zeros(0), 3).size == 0
@@ -0,0 +1,81 @@
+import json
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import wire
+
+MENTORS = [
+    {"id": "ana", "skills_known": ["Python", "Django"]},
+    {"id": "bo", "skills_known": ["Python", "NumPy"]},
+    {"id": "cy", "skills_known": ["Rust"]},
+]
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def indexed(client):
+    """MENTORS in the persistent index for the duration of a test."""
+    assert client.post("/index/users", json=MENTORS).status_code == 200
+    yield
+    for mentor in MENTORS:
+        main.mentor_index.delete(mentor["id"])
+
+
+def lines(response):
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.parametrize("with_users", [True, False])
+def test_batch_lines_and_learner_self_exclusion(client, indexed, with_users):
+    query = {
+        "target_skills": ["python", "rust"],
+        # bo knows Python too, but is never their own mentor
+        "learners": [{"id": "bo", "skills_to_learn": ["Python"]}],
+        "top_k": 5,
+    }
+    if with_users:
+        query["users"] = MENTORS
+    rows = lines(client.post("/recommend/batch", json=query))
+
+    assert [row["target_skill"] for row in rows] == ["python", "rust", "Python"]
+    for row in rows:
+        assert set(row) - {"learner_id"} == {"target_skill", "mentors", "next_skills"}
+        assert all(set(m) == {"user_id", "score"} and 0 < m["score"] <= 1 for m in row["mentors"])
+        assert all(isinstance(skill, str) for skill in row["next_skills"])
+    assert {m["user_id"] for m in rows[0]["mentors"]} == {"ana", "bo"}
+    assert [m["user_id"] for m in rows[1]["mentors"]] == ["cy"]
+    assert "learner_id" not in rows[0]
+    assert rows[2]["learner_id"] == "bo"
+    assert [m["user_id"] for m in rows[2]["mentors"]] == ["ana"]
+
+
+def test_msgpack_with_an_empty_user_list_ignores_the_index(client, indexed):
+    def recommend(users):
+        msg = {"target_skill": "python", "top_k": 5}
+        if users is not None:
+            msg["users"] = wire.encode_users(users)
+        response = client.post(
+            "/recommend",
+            content=wire.pack(msg),
+            headers={"content-type": wire.CONTENT_TYPE, "accept": wire.CONTENT_TYPE},
+        )
+        assert response.status_code == 200
+        return msgpack.unpackb(response.content)
+
+    assert {m["user_id"] for m in recommend(None)["mentors"]} == {"ana", "bo"}
+    assert recommend([]) == {"mentors": [], "next_skills": []}
+    assert [m["user_id"] for m in recommend([("dee", ["Python"])])["mentors"]] == ["dee"]
+
+
+def test_malformed_msgpack_is_a_400(client):
+    response = client.post("/recommend", content=b"\xc1", headers={"content-type": wire.CONTENT_TYPE})
+    assert response.status_code == 400
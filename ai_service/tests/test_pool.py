@@ -0,0 +1,59 @@
+import os
+import shutil
+import time
+
+import pool
+from index import MentorIndex
+
+PROFILES = [("u1", ["python", "django"]), ("u2", ["rust"]), ("u3", ["python", "numpy"])]
+
+
+def exports(root):
+    return sorted(d for d in os.listdir(root) if not d.startswith(".") and d != "CURRENT")
+
+
+def test_superseded_snapshots_survive_the_grace_period(tmp_path):
+    index = MentorIndex.from_profiles(PROFILES)
+    first = index.export_snapshot(str(tmp_path), keep=1, grace=60)
+    index.upsert("u4", ["go"])
+    second = index.export_snapshot(str(tmp_path), keep=1, grace=60)
+    assert exports(tmp_path) == [os.path.basename(first), os.path.basename(second)]
+
+    index.upsert("u5", ["java"])
+    third = index.export_snapshot(str(tmp_path), keep=1, grace=0)
+    assert exports(tmp_path) == [os.path.basename(third)]
+
+
+def test_unchanged_index_is_not_reexported(tmp_path):
+    index = MentorIndex.from_profiles(PROFILES)
+    assert index.export_snapshot(str(tmp_path)) == index.export_snapshot(str(tmp_path))
+    assert len(exports(tmp_path)) == 1
+
+
+def test_worker_falls_back_to_current_snapshot(tmp_path):
+    index = MentorIndex.from_profiles(PROFILES)
+    stale = index.export_snapshot(str(tmp_path))
+    index.upsert("u4", ["python"])
+    index.export_snapshot(str(tmp_path))
+    shutil.rmtree(stale)
+
+    mentors, _ = pool._search(stale, "python", 5)
+    assert {user_id for user_id, _ in mentors} == {"u1", "u3", "u4"}
+
+
+def test_burst_of_updates_is_persisted_once(monkeypatch):
+    import main
+
+    calls = []
+    monkeypatch.setattr(main, "PERSIST_DELAY", 0.2)
+    monkeypatch.setattr(main, "persist_index", lambda: calls.append(time.monotonic()))
+    for _ in range(20):
+        main.schedule_persist()
+    time.sleep(0.5)
+    assert len(calls) == 1
+
+    main.schedule_persist()
+    main.flush_index()
+    assert len(calls) == 2
+    time.sleep(0.3)
+    assert len(calls) == 2
@@ -0,0 +1,62 @@
+import msgpack
+import numpy as np
+import pytest
+
+import wire
+
+
+def body(**fields):
+    msg = {"target_skill": "python", "top_k": 3}
+    msg.update(fields)
+    return msgpack.packb(msg, use_bin_type=True)
+
+
+def users(ids=("u1", "u2"), vocab=("Python", "Go"), codes=(0, 1, 1), offsets=(0, 1, 3)):
+    """A columnar ``users`` value; tuples become arrays, anything else is sent as is."""
+    def value(v):
+        return list(v) if isinstance(v, tuple) else v
+
+    skills = {"vocab": value(vocab), "codes": value(codes), "offsets": value(offsets)}
+    return {"ids": value(ids), "skills_known": skills}
+
+
+def test_decodes_columns():
+    query = wire.decode_query(body(users=wire.encode_users([("u1", ["Python"]), ("u2", ["Go", "Python"])])))
+    assert (query.target_skill, query.top_k) == ("python", 3)
+    assert query.users.ids == ["u1", "u2"]
+    assert query.users.vocab == ["Python", "Go"]
+    np.testing.assert_array_equal(query.users.offsets, [0, 1, 3])
+    np.testing.assert_array_equal(query.users.codes, [0, 1, 0])
+    assert wire.decode_query(body(users=users())).users.ids == ["u1", "u2"]
+    assert wire.decode_query(body()).users is None
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"\xc1",
+        msgpack.packb(["python"]),
+        msgpack.packb({"top_k": 3}),
+        body(target_skill=7),
+        body(top_k="3"),
+        body(top_k=True),
+        body(users=[]),
+        body(users={"ids": ["u1"]}),
+        body(users={"ids": ["u1"], "skills_known": []}),
+        body(users=users(ids="u1")),
+        body(users=users(ids=("u1", 2))),
+        body(users=users(ids=("u1", "u1"))),
+        body(users=users(vocab=("Python", None))),
+        body(users=users(codes=b"\x00\x00\x00")),
+        body(users=users(codes=(0, -1, 1))),
+        body(users=users(codes="011")),
+        body(users=users(offsets=(0, 1))),
+        body(users=users(offsets=(1, 2, 3))),
+        body(users=users(offsets=(0, 1, 2))),
+        body(users=users(ids=("u1", "u2", "u3"), offsets=(0, 2, 1, 3))),
+        body(users=users(codes=(0, 1, 2))),
+    ],
+)
+def test_rejects_malformed_bodies(raw):
+    with pytest.raises(wire.WireError):
+        wire.decode_query(raw)
@@ -0,0 +1,128 @@
+"""msgpack wire format for /recommend.
+
+Sent with ``Content-Type: application/msgpack``. Users travel as columns instead of
+one object per user, and their skills are dictionary-encoded::
+
+    {
+        "target_skill": "python",
+        "top_k": 5,
+        "users": {                       # optional, as in SkillQuery
+            "ids": ["u1", "u2", ...],
+            "skills_known": {
+                "vocab": ["Python", "Django", ...],   # each distinct skill once
+                "codes": <bin: uint32 LE>,            # indexes into vocab
+                "offsets": <bin: uint32 LE>,          # len(ids) + 1; user i owns
+            },                                        # codes[offsets[i]:offsets[i+1]]
+        },
+    }
+
+``codes`` and ``offsets`` may also be plain integer arrays. Binary columns are wrapped
+with ``np.frombuffer`` without copying, and no per-user objects are built: the index
+comes straight from the columns (``MentorIndex.from_columns``). ``encode_users`` builds
+the columns from ``(id, skills)`` pairs for Python clients.
+"""
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import msgpack
+import numpy as np
+
+CONTENT_TYPE = "application/msgpack"
+CONTENT_TYPES = {CONTENT_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+
+
+class WireError(ValueError):
+    pass
+
+
+class ColumnarUsers(NamedTuple):
+    ids: List[str]
+    offsets: np.ndarray
+    codes: np.ndarray
+    vocab: List[str]
+
+
+class ColumnarQuery(NamedTuple):
+    target_skill: str
+    top_k: int
+    users: Optional[ColumnarUsers]
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in CONTENT_TYPES
+
+
+def pack(obj) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def _column(value, name: str) -> np.ndarray:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        if len(value) % 4:
+            raise WireError(f"{name} must be packed uint32 values")
+        return np.frombuffer(value, dtype="<u4")
+    if isinstance(value, list):
+        try:
+            return np.asarray(value, dtype=np.uint32)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    raise WireError(f"{name} must be bin (uint32 LE) or an array of non-negative integers")
+
+
+def decode_query(body: bytes) -> ColumnarQuery:
+    try:
+        msg = msgpack.unpackb(body, raw=False)
+    except Exception as exc:
+        raise WireError(f"Invalid msgpack body: {exc}") from None
+    if not isinstance(msg, dict):
+        raise WireError("Body must be a map")
+    target_skill = msg.get("target_skill")
+    if not isinstance(target_skill, str):
+        raise WireError("target_skill must be a string")
+    top_k = msg.get("top_k", 5)
+    if not isinstance(top_k, int) or isinstance(top_k, bool):
+        raise WireError("top_k must be an integer")
+
+    users = msg.get("users")
+    if users is None:
+        return ColumnarQuery(target_skill, top_k, None)
+    try:
+        ids = users["ids"]
+        skills = users["skills_known"]
+        vocab = skills["vocab"]
+        codes = _column(skills["codes"], "codes")
+        offsets = _column(skills["offsets"], "offsets")
+    except (KeyError, TypeError):
+        raise WireError("users needs ids and skills_known {vocab, codes, offsets}") from None
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        raise WireError("users.ids must be an array of strings")
+    if not isinstance(vocab, list) or not all(isinstance(v, str) for v in vocab):
+        raise WireError("skills_known.vocab must be an array of strings")
+    if len(set(ids)) != len(ids):
+        raise WireError("users.ids must be unique")
+    if len(offsets) != len(ids) + 1 or offsets[0] != 0 or offsets[-1] != len(codes):
+        raise WireError("offsets must have len(ids) + 1 entries, from 0 to len(codes)")
+    if len(offsets) > 1 and np.any(offsets[1:] < offsets[:-1]):
+        raise WireError("offsets must be non-decreasing")
+    if len(codes) and int(codes.max()) >= len(vocab):
+        raise WireError("codes must index into vocab")
+    return ColumnarQuery(target_skill, top_k, ColumnarUsers(ids, offsets, codes, vocab))
+
+
+def encode_users(profiles: Iterable[Tuple[str, List[str]]]) -> dict:
+    """Columnar ``users`` value for ``(id, skills_known)`` pairs."""
+    ids: List[str] = []
+    vocab: dict = {}
+    codes: List[int] = []
+    offsets = [0]
+    for user_id, skills in profiles:
+        ids.append(user_id)
+        codes.extend(vocab.setdefault(skill, len(vocab)) for skill in skills)
+        offsets.append(len(codes))
+    return {
+        "ids": ids,
+        "skills_known": {
+            "vocab": list(vocab),
+            "codes": np.asarray(codes, dtype="<u4").tobytes(),
+            "offsets": np.asarray(offsets, dtype="<u4").tobytes(),
+        },
+    }
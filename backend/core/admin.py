@@ -8,6 +8,8 @@ class CustomUserAdmin(UserAdmin):
     model = CustomUser
     list_display = ("username", "email", "role", "points", "is_staff")
     list_filter = ("role", "is_staff", "is_superuser", "is_active")
+    # Moved by core.gamification with F() updates; full saves leave it alone
+    readonly_fields = ("points",)
     fieldsets = (
         (None, {"fields": ("username", "password")} ),
         ("Personal info", {"fields": ("first_name", "last_name", "email", "bio", "profile_picture")} ),
@@ -0,0 +1,330 @@
+"""Client for the AI service (``AI_SERVICE_URL``).
+
+One keep-alive connection pool per process for sync callers and one per event loop
+for async callers, so requests reuse connections instead of opening one per call.
+
+Every call has a deadline covering all of its attempts. Transport errors, 5xx and
+429 are retried with jittered exponential backoff while the deadline allows. A call
+that still fails counts against a circuit breaker; after ``AI_SERVICE_BREAKER_THRESHOLD``
+consecutive failed calls the breaker opens and calls fail fast for
+``AI_SERVICE_BREAKER_RESET`` seconds, then a single trial call decides whether it
+closes again. A 4xx or an unreadable body is not retried and does not count against
+the breaker, but the call still fails. ``recommend``/``arecommend`` answer from stored
+``Recommendation`` rows whenever the service cannot.
+
+Identical concurrent calls are coalesced: the first one goes upstream and the others
+wait for its result.
+"""
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Recommendation
+
+logger = logging.getLogger(__name__)
+
+
+class AIServiceUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one trial call) -> closed."""
+
+    def __init__(self, threshold, reset_timeout, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                # A failed trial call reopens for another full reset period
+                self.opened_at = self.clock()
+
+
+def _retryable(response):
+    return response.status_code >= 500 or response.status_code == 429
+
+
+def _decode(path, response):
+    if response.is_error:
+        raise AIServiceUnavailable(f"{path}: HTTP {response.status_code}")
+    try:
+        return response.json()
+    except ValueError as exc:
+        raise AIServiceUnavailable(f"{path}: invalid JSON ({exc})") from None
+
+
+def _recommendation(data):
+    try:
+        return {"mentors": list(data["mentors"]), "next_skills": list(data["next_skills"]), "source": "ai"}
+    except (KeyError, TypeError):
+        raise AIServiceUnavailable("/recommend: unexpected response") from None
+
+
+class AIServiceClient:
+    def __init__(
+        self,
+        base_url=None,
+        timeout=None,
+        retries=None,
+        breaker=None,
+        backoff_base=0.05,
+        backoff_cap=1.0,
+        max_connections=20,
+        transport=None,
+        clock=time.monotonic,
+    ):
+        self.base_url = base_url or settings.AI_SERVICE_URL
+        self.timeout = timeout if timeout is not None else settings.AI_SERVICE_TIMEOUT
+        self.retries = retries if retries is not None else settings.AI_SERVICE_RETRIES
+        self.clock = clock
+        self.breaker = breaker or CircuitBreaker(
+            settings.AI_SERVICE_BREAKER_THRESHOLD, settings.AI_SERVICE_BREAKER_RESET, clock
+        )
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # An httpx.MockTransport in tests
+        self.transport = transport
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._async_inflight = weakref.WeakKeyDictionary()
+
+    # ---- connection pools ----
+
+    def _sync_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=self.base_url, limits=self.limits, transport=self.transport
+                    )
+        return self._client
+
+    def _async_client(self):
+        # An AsyncClient's connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url, limits=self.limits, transport=self.transport
+            )
+        return client
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # ---- calls ----
+
+    def _backoff(self, attempt):
+        # Full jitter, so clients that failed together do not retry in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _key(self, path, payload):
+        return path, json.dumps(payload, sort_keys=True)
+
+    def post(self, path, payload, deadline=None):
+        """POST ``payload`` as JSON and return the decoded response within ``deadline`` seconds."""
+        deadline = deadline if deadline is not None else self.timeout
+        key = self._key(path, payload)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            try:
+                return future.result(timeout=deadline)
+            except FutureTimeout:
+                raise AIServiceUnavailable(f"{path}: deadline exceeded") from None
+        try:
+            result = self._post(path, payload, deadline)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def delete(self, path, deadline=None):
+        """DELETE ``path``; ``None`` if the service has nothing there, else the decoded response."""
+        response = self._send("DELETE", path, None, deadline if deadline is not None else self.timeout)
+        return None if response.status_code == 404 else _decode(path, response)
+
+    def _post(self, path, payload, deadline):
+        return _decode(path, self._send("POST", path, payload, deadline))
+
+    def _send(self, method, path, payload, deadline):
+        if not self.breaker.allow():
+            raise AIServiceUnavailable(f"{path}: circuit open")
+        end = self.clock() + deadline
+        ok = False
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    response = self._sync_client().request(
+                        method, path, json=payload, timeout=max(end - self.clock(), 0.001)
+                    )
+                except httpx.TransportError as exc:
+                    error = repr(exc)
+                else:
+                    if not _retryable(response):
+                        # The service answered; a 4xx is our bug, not an outage
+                        ok = True
+                        return response
+                    error = f"HTTP {response.status_code}"
+                pause = self._backoff(attempt)
+                if attempt == self.retries or self.clock() + pause >= end:
+                    break
+                time.sleep(pause)
+            raise AIServiceUnavailable(f"{path}: {error}")
+        finally:
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    async def apost(self, path, payload, deadline=None):
+        """Async ``post``. Cancelling one waiter does not cancel a call others share."""
+        deadline = deadline if deadline is not None else self.timeout
+        loop = asyncio.get_running_loop()
+        inflight = self._async_inflight.setdefault(loop, {})
+        key = self._key(path, payload)
+        task = inflight.get(key)
+        if task is None:
+            task = inflight[key] = loop.create_task(self._apost(path, payload, deadline))
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline)
+        except asyncio.TimeoutError:
+            raise AIServiceUnavailable(f"{path}: deadline exceeded") from None
+
+    async def _apost(self, path, payload, deadline):
+        if not self.breaker.allow():
+            raise AIServiceUnavailable(f"{path}: circuit open")
+        end = self.clock() + deadline
+        ok = False
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self._async_client().post(
+                        path, json=payload, timeout=max(end - self.clock(), 0.001)
+                    )
+                except httpx.TransportError as exc:
+                    error = repr(exc)
+                else:
+                    if not _retryable(response):
+                        ok = True
+                        return _decode(path, response)
+                    error = f"HTTP {response.status_code}"
+                pause = self._backoff(attempt)
+                if attempt == self.retries or self.clock() + pause >= end:
+                    break
+                await asyncio.sleep(pause)
+            raise AIServiceUnavailable(f"{path}: {error}")
+        finally:
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    # ---- recommendations ----
+
+    def recommend(self, target_skill, top_k=5, user=None, deadline=None):
+        """``{"mentors": [...], "next_skills": [...], "source": "ai" | "cache"}`` for ``target_skill``.
+
+        Falls back to stored recommendations (``user``'s when given) if the service is
+        unavailable.
+        """
+        try:
+            return _recommendation(self.post("/recommend", {"target_skill": target_skill, "top_k": top_k}, deadline))
+        except AIServiceUnavailable as exc:
+            logger.warning("AI service unavailable, using stored recommendations: %s", exc)
+            return cached_recommendations(top_k, user)
+
+    async def arecommend(self, target_skill, top_k=5, user=None, deadline=None):
+        try:
+            data = await self.apost("/recommend", {"target_skill": target_skill, "top_k": top_k}, deadline)
+            return _recommendation(data)
+        except AIServiceUnavailable as exc:
+            logger.warning("AI service unavailable, using stored recommendations: %s", exc)
+            return await sync_to_async(cached_recommendations)(top_k, user)
+
+
+def cached_recommendations(top_k=5, user=None):
+    rows = Recommendation.objects.all()
+    if user is not None:
+        rows = rows.filter(user=user)
+    names = (
+        rows.values("suggested_skill__name")
+        .annotate(score=Max("confidence_score"))
+        .order_by("-score", "suggested_skill__name")
+        .values_list("suggested_skill__name", flat=True)[:top_k]
+    )
+    return {"mentors": [], "next_skills": list(names), "source": "cache"}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client, configured from settings on first use."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = AIServiceClient()
+    return _default
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        # signals connects receivers; media, skillgraph and uploads register their job handlers
+        from . import media, signals, skillgraph, uploads  # noqa: F401
@@ -0,0 +1,185 @@
+"""Async versions of the hottest read endpoints, under ``/api/async/``.
+
+DRF views are sync-only, so under an ASGI server (``uvicorn peerverse.asgi:application``)
+every DRF request holds a thread while it waits on the database. These plain Django
+async views query with the async ORM (``aget``, ``async for``) instead and return the
+same bodies as their sync counterparts:
+
+- ``sessions/`` and ``sessions/<id>/`` (``?skill=``, ``?created_by=``)
+- ``dashboard/`` (its two independent queries gathered, same per-user cache)
+- ``wishlist/mine/``
+- ``skills/`` (same ETag and rendered-body LRU as ``core.httpcache``)
+
+They authenticate the JWT bearer themselves and page forward only, by keyset:
+``?cursor=`` comes from the previous page's ``next``. Rows are fully loaded (including
+prefetches) before the shared serializers render them, so a relation left unloaded
+raises ``SynchronousOnlyOperation`` instead of querying in the event loop. ``?search=``
+stays on the sync views.
+"""
+import base64
+import json
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import dashboard, httpcache
+from .models import Session, Skill, Wishlist
+from .serializers import SessionSerializer, SkillSerializer, WishlistSerializer
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` with the user looked up through the async ORM."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return await self.aget_user(self.get_validated_token(raw_token))
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+authentication = AsyncJWTAuthentication()
+
+
+def _unauthorized(request, detail):
+    response = JsonResponse({"detail": detail}, status=401)
+    response["WWW-Authenticate"] = authentication.authenticate_header(request)
+    return response
+
+
+def read_view(login_required=False):
+    """GET-only async view receiving ``request.api_user`` (``None`` when anonymous)."""
+
+    def decorate(view):
+        @require_GET
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                request.api_user = await authentication.aauthenticate(request)
+            except AuthenticationFailed as exc:
+                return _unauthorized(request, exc.detail)
+            if login_required and request.api_user is None:
+                return _unauthorized(request, "Authentication credentials were not provided.")
+            return await view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def _after(ordering, values):
+    """Rows strictly after ``values`` in ``ordering`` (``-field`` for descending)."""
+    condition, equal = Q(), Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        condition |= equal & Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+async def paginate(request, queryset, ordering, serializer_class):
+    """One keyset page of ``queryset``, rendered like ``core.pagination.KeysetPagination``."""
+    params = request.GET
+    try:
+        page_size = min(max(int(params.get("page_size", settings.REST_FRAMEWORK["PAGE_SIZE"])), 1), 100)
+        if params.get("cursor"):
+            values = json.loads(base64.urlsafe_b64decode(params["cursor"].encode()))
+            queryset = queryset.filter(_after(ordering, values))
+        rows = [row async for row in queryset.order_by(*ordering)[:page_size + 1]]
+    except (ValueError, TypeError, ValidationError):
+        return JsonResponse({"detail": "Invalid cursor."}, status=400)
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = [getattr(rows[-1], field.lstrip("-")) for field in ordering]
+        # Exact values: DjangoJSONEncoder would cut datetimes to milliseconds
+        encoded = json.dumps([v.isoformat() if hasattr(v, "isoformat") else str(v) for v in last])
+        cursor = base64.urlsafe_b64encode(encoded.encode()).decode()
+        next_url = replace_query_param(request.build_absolute_uri(), "cursor", cursor)
+    results = serializer_class(rows, many=True, context={"request": request}).data
+    return JsonResponse({"next": next_url, "previous": None, "results": results})
+
+
+SESSIONS = Session.objects.select_related("skill", "created_by").prefetch_related("participants")
+
+
+@read_view()
+async def session_list(request):
+    sessions = SESSIONS
+    try:
+        if request.GET.get("skill"):
+            sessions = sessions.filter(skill_id=uuid.UUID(request.GET["skill"]))
+        if request.GET.get("created_by"):
+            sessions = sessions.filter(created_by_id=uuid.UUID(request.GET["created_by"]))
+    except ValueError:
+        return JsonResponse({"detail": "Invalid skill or created_by."}, status=400)
+    return await paginate(request, sessions, ("start_time", "id"), SessionSerializer)
+
+
+@read_view()
+async def session_detail(request, pk):
+    try:
+        session = await SESSIONS.aget(pk=pk)
+    except Session.DoesNotExist:
+        return JsonResponse({"detail": "No Session matches the given query."}, status=404)
+    return JsonResponse(SessionSerializer(session, context={"request": request}).data)
+
+
+@read_view(login_required=True)
+async def dashboard_view(request):
+    payload, hit = await dashboard.aget_payload(request.api_user.pk)
+    response = JsonResponse(payload)
+    response["X-Cache"] = "HIT" if hit else "MISS"
+    return response
+
+
+@read_view(login_required=True)
+async def wishlist_mine(request):
+    wishlist = Wishlist.objects.select_related("session", "session__created_by").filter(user=request.api_user)
+    return await paginate(request, wishlist, ("-created_at", "id"), WishlistSerializer)
+
+
+@read_view()
+async def skill_list(request):
+    table = Skill._meta.db_table
+    etag = f'"{table}-{await httpcache.aversion(table)}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        key = (table, etag, request.get_full_path())
+        cached = httpcache.responses.get(key)
+        if cached is None:
+            response = await paginate(request, Skill.objects.all(), ("name",), SkillSerializer)
+            if response.status_code != 200:
+                return response
+            cached = (response["Content-Type"], response.content)
+            httpcache.responses.set(key, *cached, ttl=settings.CATALOG_CACHE_TTL)
+        response = HttpResponse(cached[1], content_type=cached[0])
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
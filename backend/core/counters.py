@@ -0,0 +1,88 @@
+"""Denormalised counters on ``CustomUser`` and ``Session``, kept by ``core.signals``.
+
+``CustomUser``: ``sessions_created_count``, ``sessions_joined_count``, ``mentee_count``.
+``Session``: ``participant_count``, ``rating_count``, ``rating_sum``, ``wishlist_count``.
+
+Each write applies its delta with an ``F()`` update, so concurrent writers never lose
+an increment and reads are plain column lookups. ``mentee_count`` is a distinct count
+(a mentee may join several of a mentor's sessions); ``core.mentorship`` moves it as
+mentor -> mentee edges appear and go. Full saves of existing rows leave these columns alone
+(``models.CounterFieldsMixin``). Bulk writes (``bulk_create``, ``QuerySet.update``,
+raw SQL) send no signals; ``manage.py reconcile_counters`` finds and repairs the drift.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import CustomUser, Feedback, Session, Wishlist
+
+Participants = Session.participants.through
+
+USER_FIELDS = ("sessions_created_count", "sessions_joined_count", "mentee_count")
+SESSION_FIELDS = Session.counter_fields
+
+
+def _correlated(qs, group, aggregate):
+    values = qs.order_by().values(group).annotate(n=aggregate).values("n")[:1]
+    return Coalesce(Subquery(values, output_field=IntegerField()), 0)
+
+
+def expected_user_counters():
+    """``{field: expression}`` recomputing each user counter from the source rows."""
+    return {
+        "sessions_created_count": _correlated(Session.objects.filter(created_by=OuterRef("pk")), "created_by", Count("*")),
+        "sessions_joined_count": _correlated(Participants.objects.filter(customuser=OuterRef("pk")), "customuser", Count("*")),
+        "mentee_count": _correlated(
+            Participants.objects.filter(session__created_by=OuterRef("pk")),
+            "session__created_by",
+            Count("customuser", distinct=True),
+        ),
+    }
+
+
+def expected_session_counters():
+    """``{field: expression}`` recomputing each session counter from the source rows."""
+    ratings = Feedback.objects.filter(session=OuterRef("pk"))
+    return {
+        "participant_count": _correlated(Participants.objects.filter(session=OuterRef("pk")), "session", Count("*")),
+        "rating_count": _correlated(ratings, "session", Count("*")),
+        "rating_sum": _correlated(ratings, "session", Sum("rating")),
+        "wishlist_count": _correlated(Wishlist.objects.filter(session=OuterRef("pk")), "session", Count("*")),
+    }
+
+
+def add(model, deltas):
+    """Apply ``{pk: {field: delta}}`` with one ``F()`` update per distinct set of deltas."""
+    groups = {}
+    for pk, changes in deltas.items():
+        changes = tuple(sorted((field, n) for field, n in changes.items() if n))
+        if changes:
+            groups.setdefault(changes, []).append(pk)
+    for changes, pks in groups.items():
+        model.objects.filter(pk__in=pks).update(**{field: F(field) + n for field, n in changes})
+
+
+def participations_changed(rows, sign):
+    """``rows`` of ``(session_id, user_id)`` were added (``sign=1``) or removed (``-1``)."""
+    rows = list(rows)
+    if not rows:
+        return
+    per_session = Counter(session_id for session_id, _ in rows)
+    per_user = Counter(user_id for _, user_id in rows)
+    add(Session, {pk: {"participant_count": sign * n} for pk, n in per_session.items()})
+    add(CustomUser, {pk: {"sessions_joined_count": sign * n} for pk, n in per_user.items()})
+
+
+def sessions_created(owner_ids, sign):
+    add(CustomUser, {pk: {"sessions_created_count": sign * n} for pk, n in Counter(owner_ids).items() if pk})
+
+
+def rating_changed(session_id, rating, sign):
+    if session_id is not None and rating is not None:
+        add(Session, {session_id: {"rating_count": sign, "rating_sum": sign * rating}})
+
+
+def wishlist_changed(session_id, sign):
+    if session_id is not None:
+        add(Session, {session_id: {"wishlist_count": sign}})
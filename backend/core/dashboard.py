@@ -0,0 +1,119 @@
+import asyncio
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Value
+
+from .models import Badge, CustomUser, Skill
+
+
+def cache_key(user_id):
+    return f"dashboard:{user_id}"
+
+
+def invalidate(*user_ids):
+    keys = [cache_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        # After commit, so the next miss reads the committed rows. A miss that read them
+        # before the commit can still store its payload after this delete; that entry
+        # lives until DASHBOARD_CACHE_TIMEOUT.
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+COUNTER_FIELDS = ("role", "points", "sessions_created_count", "sessions_joined_count", "mentee_count")
+
+
+def _names(user_id):
+    """One query for the names of the user's badges, known and wanted skills."""
+    return (
+        Badge.objects.filter(users_with_badge=user_id)
+        .annotate(kind=Value("badge"))
+        .values_list("kind", "id", "name")
+        .union(
+            Skill.objects.filter(users_who_know=user_id).annotate(kind=Value("known")).values_list("kind", "id", "name"),
+            Skill.objects.filter(users_who_want=user_id).annotate(kind=Value("want")).values_list("kind", "id", "name"),
+            all=True,
+        )
+        .order_by("kind", "name")
+    )
+
+
+def _payload(counters, names):
+    badges, skills_known, skills_to_learn = [], [], []
+    for kind, pk, name in names:
+        if kind == "badge":
+            badges.append({"id": pk, "name": name})
+        elif kind == "known":
+            skills_known.append(name)
+        else:
+            skills_to_learn.append(name)
+
+    # Simple sample stats for charts
+    stats = {
+        "weekly_learning_hours": [
+            {"day": "Mon", "hours": 1.5},
+            {"day": "Tue", "hours": 0.5},
+            {"day": "Wed", "hours": 2.0},
+            {"day": "Thu", "hours": 1.0},
+            {"day": "Fri", "hours": 0.0},
+            {"day": "Sat", "hours": 2.5},
+            {"day": "Sun", "hours": 1.0},
+        ],
+        "top_skills": [
+            {"skill": s, "value": 1} for s in skills_known[:5]
+        ],
+    }
+
+    return {
+        "role": counters["role"],
+        "points": counters["points"],
+        "badges": badges,
+        "sessions_created": counters["sessions_created_count"],
+        "sessions_joined": counters["sessions_joined_count"],
+        "total_mentees": counters["mentee_count"],
+        "skills_known": skills_known,
+        "skills_to_learn": skills_to_learn,
+        "stats": stats,
+    }
+
+
+def build_payload(user_id):
+    """Dashboard data for one user in two queries: one for counters, one for names."""
+    # Counters are columns kept by core.counters
+    counters = CustomUser.objects.filter(pk=user_id).values(*COUNTER_FIELDS).get()
+    return _payload(counters, _names(user_id))
+
+
+async def abuild_payload(user_id):
+    """``build_payload`` on the async ORM, with its two independent queries gathered."""
+
+    async def names():
+        return [row async for row in _names(user_id)]
+
+    counters, rows = await asyncio.gather(
+        CustomUser.objects.filter(pk=user_id).values(*COUNTER_FIELDS).aget(),
+        names(),
+    )
+    return _payload(counters, rows)
+
+
+def get_payload(user_id):
+    """Return ``(payload, hit)`` using the per-user dashboard cache."""
+    key = cache_key(user_id)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload, True
+    payload = build_payload(user_id)
+    cache.set(key, payload, settings.DASHBOARD_CACHE_TIMEOUT)
+    return payload, False
+
+
+async def aget_payload(user_id):
+    key = cache_key(user_id)
+    payload = await cache.aget(key)
+    if payload is not None:
+        return payload, True
+    payload = await abuild_payload(user_id)
+    await cache.aset(key, payload, settings.DASHBOARD_CACHE_TIMEOUT)
+    return payload, False
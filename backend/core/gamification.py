@@ -0,0 +1,228 @@
+"""Points and badges, driven by events recorded from ``core.signals``.
+
+Each event (``session_created``, ``session_joined``, ``feedback_given``,
+``certificate_issued``) adds ``GAMIFICATION_POINTS[event]`` to ``CustomUser.points``
+with an ``F()`` update. Deleting the source row records the event with ``delta=-1``.
+The session events are counted by the ``CustomUser.sessions_created_count`` and
+``sessions_joined_count`` columns (``core.counters``), whose signal handlers record
+them here; the others bump the user's ``UserCounter`` of that name.
+
+``Badge.criteria`` is a small expression over those counters and ``points``::
+
+    session_joined >= 5
+    session_created >= 3 and feedback_given >= 10
+    (certificate_issued >= 1 or points >= 500) and session_joined >= 2
+
+Criteria are compiled once per change to the badge table. After an event only the
+badges that mention its counter (or ``points``) are checked, against the affected
+users' current counters, so history is never rescanned. Badges are awarded, never
+revoked. Criteria that do not parse (free text) mark manually awarded badges.
+``manage.py backfill_gamification`` rebuilds everything from existing rows.
+"""
+import operator
+import re
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import dashboard, httpcache, leaderboard
+from .models import Badge, CustomUser, UserCounter
+
+EVENTS = ("session_created", "session_joined", "feedback_given", "certificate_issued")
+# Events counted by core.counters columns rather than UserCounter rows
+COLUMNS = {"session_created": "sessions_created_count", "session_joined": "sessions_joined_count"}
+UserBadges = CustomUser.badges.through
+
+
+class CriteriaError(ValueError):
+    pass
+
+
+# ---- criteria ----
+
+TOKEN_RE = re.compile(r"\s*(?:(\d+)|(>=|<=|==|!=|>|<)|([A-Za-z_]+)|(\(|\)))")
+OPERATORS = {">=": operator.ge, "<=": operator.le, "==": operator.eq, "!=": operator.ne, ">": operator.gt, "<": operator.lt}
+NAMES = set(EVENTS) | {"points"}
+
+
+class Criteria:
+    """A compiled criteria expression: ``criteria(counters) -> bool``; ``names`` it reads."""
+
+    def __init__(self, predicate, names):
+        self.predicate = predicate
+        self.names = frozenset(names)
+
+    def __call__(self, counters):
+        return self.predicate(counters)
+
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if match is None or match.end() == pos:
+            raise CriteriaError(f"Unexpected {text[pos:pos + 10]!r}")
+        number, op, word, paren = match.groups()
+        if number is not None:
+            tokens.append(("num", int(number)))
+        elif op is not None:
+            tokens.append(("op", op))
+        elif word is not None:
+            tokens.append(("kw", word.lower()) if word.lower() in ("and", "or") else ("name", word))
+        else:
+            tokens.append((paren, paren))
+        pos = match.end()
+    return tokens
+
+
+def compile_criteria(text):
+    """Compile ``text`` into a ``Criteria``; raises ``CriteriaError`` if it does not parse."""
+    tokens = _tokenize(text)
+    names = set()
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else (None, None)
+
+    def take(kind):
+        nonlocal pos
+        token = peek()
+        if token[0] != kind:
+            raise CriteriaError(f"Expected {kind}, got {token[1]!r}")
+        pos += 1
+        return token[1]
+
+    def any_of():
+        terms = [all_of()]
+        while peek() == ("kw", "or"):
+            take("kw")
+            terms.append(all_of())
+        return terms[0] if len(terms) == 1 else lambda c: any(t(c) for t in terms)
+
+    def all_of():
+        terms = [comparison()]
+        while peek() == ("kw", "and"):
+            take("kw")
+            terms.append(comparison())
+        return terms[0] if len(terms) == 1 else lambda c: all(t(c) for t in terms)
+
+    def comparison():
+        if peek()[0] == "(":
+            take("(")
+            inner = any_of()
+            take(")")
+            return inner
+        name = take("name")
+        if name not in NAMES:
+            raise CriteriaError(f"Unknown counter {name!r}; expected one of {sorted(NAMES)}")
+        compare = OPERATORS[take("op")]
+        threshold = take("num")
+        names.add(name)
+        return lambda c: compare(c.get(name, 0), threshold)
+
+    if not tokens:
+        raise CriteriaError("Empty criteria")
+    predicate = any_of()
+    if pos != len(tokens):
+        raise CriteriaError(f"Unexpected {peek()[1]!r}")
+    return Criteria(predicate, names)
+
+
+_rules = (None, {})
+
+
+def rules():
+    """``{badge_id: Criteria}`` for every badge with parseable criteria, compiled once per
+    change to the badge table."""
+    global _rules
+    version = httpcache.version(Badge._meta.db_table)
+    if _rules[0] != version:
+        compiled = {}
+        for badge_id, text in Badge.objects.values_list("pk", "criteria"):
+            try:
+                compiled[badge_id] = compile_criteria(text)
+            except CriteriaError:
+                pass
+        _rules = (version, compiled)
+    return _rules[1]
+
+
+# ---- events ----
+
+def _add_to_counters(user_ids, name, delta):
+    rows = UserCounter.objects.filter(user_id__in=user_ids, name=name)
+    # Decrements never create a row: the user may be mid-cascade-delete
+    if rows.update(value=F("value") + delta) == len(user_ids) or delta < 0:
+        return
+    missing = set(user_ids) - set(rows.values_list("user_id", flat=True))
+    try:
+        with transaction.atomic():
+            UserCounter.objects.bulk_create([UserCounter(user_id=pk, name=name, value=delta) for pk in missing])
+    except IntegrityError:
+        # Some created concurrently: fall back to one at a time
+        for user_id in missing:
+            if not UserCounter.objects.filter(user_id=user_id, name=name).update(value=F("value") + delta):
+                with transaction.atomic():
+                    UserCounter.objects.create(user_id=user_id, name=name, value=delta)
+
+
+def record(event, user_ids, delta=1):
+    """Apply ``delta`` occurrences of ``event`` to each of ``user_ids``.
+
+    For ``COLUMNS`` events, call after ``core.counters`` has moved the column.
+    """
+    user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id is not None]
+    if not user_ids:
+        return
+    points = settings.GAMIFICATION_POINTS.get(event, 0) * delta
+    if event not in COLUMNS:
+        _add_to_counters(user_ids, event, delta)
+    if points:
+        CustomUser.objects.filter(pk__in=user_ids).update(points=F("points") + points)
+        dashboard.invalidate(*user_ids)
+        leaderboard.users_changed(*user_ids)
+    if delta > 0:
+        award(user_ids, {event, "points"} if points else {event})
+
+
+def counters_for(user_ids):
+    """``{user_id: {counter: value}}``, ``points`` included."""
+    result = {user_id: {} for user_id in user_ids}
+    columns = ("pk", "points", *COLUMNS.values())
+    for user_id, points, *values in CustomUser.objects.filter(pk__in=user_ids).values_list(*columns):
+        result[user_id] = {"points": points, **dict(zip(COLUMNS, values))}
+    stored = UserCounter.objects.filter(user_id__in=user_ids).exclude(name__in=COLUMNS)
+    for user_id, name, value in stored.values_list("user_id", "name", "value"):
+        result[user_id][name] = value
+    return result
+
+
+def award(user_ids, changed=None):
+    """Give ``user_ids`` the badges whose criteria they now meet.
+
+    Only badges reading one of the ``changed`` counters are checked (all when ``None``).
+    Returns the number of badges awarded.
+    """
+    candidates = {
+        badge_id: criteria for badge_id, criteria in rules().items()
+        if changed is None or criteria.names & changed
+    }
+    if not candidates:
+        return 0
+    held = set(
+        UserBadges.objects.filter(customuser_id__in=user_ids, badge_id__in=candidates)
+        .values_list("customuser_id", "badge_id")
+    )
+    earned = [
+        UserBadges(customuser_id=user_id, badge_id=badge_id)
+        for user_id, counters in counters_for(user_ids).items()
+        for badge_id, criteria in candidates.items()
+        if (user_id, badge_id) not in held and criteria(counters)
+    ]
+    if earned:
+        # bulk_create sends no m2m_changed, so invalidate here
+        UserBadges.objects.bulk_create(earned, ignore_conflicts=True)
+        dashboard.invalidate(*{row.customuser_id for row in earned})
+    return len(earned)
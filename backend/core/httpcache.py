@@ -0,0 +1,133 @@
+"""HTTP caching for small, read-heavy catalog lists (skills, badges).
+
+Each cached table has a ``TableVersion`` row, restamped by ``core.signals`` whenever a
+row is saved or deleted (call ``bump`` after bulk writes, which send no signals). A
+list response is stamped with ``ETag: "<table>-<version>"``:
+
+- ``If-None-Match`` with the current tag gets a ``304`` straight away.
+- Otherwise the rendered JSON body is looked up in an in-process LRU keyed by
+  ``(table, version, full path)``; a hit is returned as stored bytes.
+
+Either way the only query is the version lookup by primary key, and no serializer
+runs. Entries expire after ``CATALOG_CACHE_TTL`` seconds and the LRU evicts the oldest
+ones beyond ``CATALOG_CACHE_MAX_BYTES``. A bump makes every older entry unreachable, so
+nothing has to be purged.
+
+The version lives in the database, so every web and worker process sees a bump as
+soon as the write commits, with or without ``REDIS_URL``. ``bump`` writes it in the
+writer's transaction: a reader that still sees the old version also still sees the
+old rows. Versions are ``time.time_ns()`` stamps rather than counters, so a rolled
+back bump never hands a later write a version that earlier entries were cached under.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import TableVersion
+
+
+def version(name):
+    """Current version of ``name`` (a table, or a key such as ``calendar:<user id>``)."""
+    return TableVersion.objects.filter(pk=name).values_list("version", flat=True).first() or 0
+
+
+async def aversion(name):
+    return await TableVersion.objects.filter(pk=name).values_list("version", flat=True).afirst() or 0
+
+
+def bump(name):
+    """Invalidate everything cached under the current version of ``name``."""
+    stamp = time.time_ns()
+    if TableVersion.objects.filter(pk=name).update(version=stamp):
+        return
+    try:
+        with transaction.atomic():
+            TableVersion.objects.create(name=name, version=stamp)
+    except IntegrityError:
+        # Created concurrently
+        TableVersion.objects.filter(pk=name).update(version=stamp)
+
+
+class ResponseLRU:
+    """Thread-safe LRU of ``key -> (expires_at, content_type, body)`` bounded by total body size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key, content_type, body, ttl):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, content_type, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _drop(self, key):
+        self.size -= len(self._entries.pop(key)[2])
+
+
+responses = ResponseLRU(settings.CATALOG_CACHE_MAX_BYTES)
+
+
+class CachedListMixin:
+    """Serve ``list`` from the ETag/LRU layer above. Set ``cache_table`` on the viewset.
+
+    Only JSON responses are cached; the browsable API is rendered per user.
+    """
+
+    cache_table = None
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return super().list(request, *args, **kwargs)
+        etag = f'"{self.cache_table}-{version(self.cache_table)}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._stamp(not_modified, etag)
+
+        key = (self.cache_table, etag, request.get_full_path())
+        cached = responses.get(key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            body = response.rendered_content
+            cached = (response["Content-Type"], body)
+            responses.set(key, *cached, ttl=settings.CATALOG_CACHE_TTL)
+        return self._stamp(HttpResponse(cached[1], content_type=cached[0]), etag)
+
+    def _stamp(self, response, etag):
+        response["ETag"] = etag
+        # Clients may keep the body but must revalidate it
+        patch_cache_control(response, no_cache=True)
+        return response
@@ -0,0 +1,138 @@
+"""A small database-backed job queue.
+
+Jobs are ``core.models.Job`` rows; ``manage.py run_worker`` claims and runs them, so
+nothing beyond the database is needed. Handlers are registered per ``kind``::
+
+    @jobs.handler("poster", on_failure=mark_failed)
+    def make_poster(payload): ...
+
+    jobs.enqueue("poster", session=str(session.pk))
+
+A job is claimed with a conditional ``UPDATE ... WHERE status = 'queued'`` so several
+workers can poll the same table without double-running anything. Failures are
+retried with exponential backoff until ``max_attempts``. While a job runs, its worker
+refreshes ``locked_at`` every ``HEARTBEAT``, however long the handler takes. A worker
+that dies mid-job leaves a ``running`` row whose lock goes stale; after ``LOCK_TIMEOUT``
+it is re-queued, or failed if it has used up its attempts.
+"""
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# kind -> (handler, on_failure); on_failure(payload) runs once the last attempt failed
+HANDLERS = {}
+# A running job's worker refreshes its lock this often...
+HEARTBEAT = timedelta(minutes=1)
+# ...so a lock older than this means the worker is gone
+LOCK_TIMEOUT = timedelta(minutes=10)
+RETRY_BASE = timedelta(seconds=30)
+
+
+def handler(kind, on_failure=None):
+    def register(fn):
+        HANDLERS[kind] = (fn, on_failure)
+        return fn
+
+    return register
+
+
+def enqueue(kind, delay=None, max_attempts=3, **payload):
+    run_after = timezone.now() + delay if delay else timezone.now()
+    return Job.objects.create(kind=kind, payload=payload, run_after=run_after, max_attempts=max_attempts)
+
+
+def claim(worker_id, kinds=None):
+    """Lock and return the oldest due job, or ``None`` when there is nothing to do."""
+    now = timezone.now()
+    due = Job.objects.filter(status="queued", run_after__lte=now)
+    if kinds:
+        due = due.filter(kind__in=kinds)
+    for pk in due.order_by("run_after").values_list("pk", flat=True)[:10]:
+        claimed = Job.objects.filter(pk=pk, status="queued").update(
+            status="running", locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Run a claimed job and record the outcome. Returns ``True`` on success.
+
+    Handlers run outside a transaction: they may take minutes (ffmpeg) and should
+    commit their own writes as they go.
+    """
+    fn, on_failure = HANDLERS.get(job.kind, (None, None))
+    try:
+        if fn is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}")
+        with _heartbeat(job):
+            fn(job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        if fn is None or job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(status="failed", last_error=error, locked_at=None)
+            if on_failure is not None:
+                on_failure(job.payload)
+        else:
+            backoff = RETRY_BASE * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status="queued", last_error=error, locked_at=None, run_after=timezone.now() + backoff
+            )
+        job.refresh_from_db()
+        return False
+    Job.objects.filter(pk=job.pk).update(status="done", last_error="", locked_at=None)
+    job.refresh_from_db()
+    return True
+
+
+@contextmanager
+def _heartbeat(job):
+    """Refresh ``job``'s lock every ``HEARTBEAT`` from a thread while the block runs."""
+    finished = threading.Event()
+
+    def beat():
+        try:
+            while not finished.wait(HEARTBEAT.total_seconds()):
+                Job.objects.filter(pk=job.pk, status="running", locked_by=job.locked_by).update(
+                    locked_at=timezone.now()
+                )
+        finally:
+            # The thread's own connection
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"job-{job.pk}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        finished.set()
+        thread.join()
+
+
+def requeue_abandoned():
+    """Put back jobs whose worker stopped without finishing them, and fail those that
+    have no attempts left. Returns the number re-queued."""
+    abandoned = Job.objects.filter(status="running", locked_at__lt=timezone.now() - LOCK_TIMEOUT)
+    for job in abandoned.filter(attempts__gte=F("max_attempts")):
+        # Conditional, so two workers never both fail it
+        failed = Job.objects.filter(pk=job.pk, status="running", locked_at=job.locked_at).update(
+            status="failed", last_error=f"Abandoned by {job.locked_by} on attempt {job.attempts}", locked_at=None
+        )
+        if failed:
+            logger.error("Job %s (%s) abandoned on its last attempt", job.pk, job.kind)
+            on_failure = HANDLERS.get(job.kind, (None, None))[1]
+            if on_failure is not None:
+                on_failure(job.payload)
+    return abandoned.filter(attempts__lt=F("max_attempts")).update(status="queued", locked_at=None)
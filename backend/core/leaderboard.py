@@ -0,0 +1,180 @@
+"""In-process leaderboards by ``CustomUser.points``, global and per skill (``skills_known``).
+
+Each board is a ``RankIndex``: one sorted list of ``(-points, user_id)``. A user's rank
+(1 + users with more points) is a binary search, a top-N page is a slice, and memory
+is one entry per user whatever the scores. An update is a binary search plus a list
+insert and delete, which move at most the list's length in pointers.
+
+Boards are built from two queries on first use and then kept current incrementally:
+``core.signals`` and ``core.gamification`` call ``users_changed``, which re-reads just
+those users after commit. Writes made by other processes are picked up by a full
+rebuild once the boards are ``LEADERBOARD_REFRESH`` seconds old.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import CustomUser
+
+SkillsKnown = CustomUser.skills_known.through
+
+
+class RankIndex:
+    """Users ranked by score, highest first, ties by user id. Negative scores rank as 0."""
+
+    def __init__(self):
+        self._order = []
+        self._scores = {}
+
+    @classmethod
+    def from_scores(cls, scores):
+        """Index ``{user_id: score}`` with one sort."""
+        index = cls()
+        index._scores = {user_id: max(int(score), 0) for user_id, score in scores.items()}
+        index._order = sorted((-score, user_id) for user_id, score in index._scores.items())
+        return index
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def _above(self, score):
+        """Users with more than ``score``; ``(-score,)`` sorts before every ``(-score, user_id)``."""
+        return bisect_left(self._order, (-score,))
+
+    def set(self, user_id, score):
+        score = max(int(score), 0)
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self.remove(user_id)
+        self._scores[user_id] = score
+        insort(self._order, (-score, user_id))
+
+    def remove(self, user_id):
+        score = self._scores.pop(user_id, None)
+        if score is not None:
+            del self._order[bisect_left(self._order, (-score, user_id))]
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def rank(self, user_id):
+        """1-based competition rank (equal scores share a rank), or ``None``."""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._above(score) + 1
+
+    def top(self, limit, offset=0):
+        """``[(rank, user_id, score)]`` for positions ``offset`` .. ``offset + limit - 1``."""
+        result, ranks = [], {}
+        for negative, user_id in self._order[offset:offset + limit]:
+            if negative not in ranks:
+                ranks[negative] = self._above(-negative) + 1
+            result.append((ranks[negative], user_id, -negative))
+        return result
+
+
+class Leaderboards:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._building = threading.Lock()
+        self.built_at = None
+        # Users changed while a build reads the database, replayed once it is in place
+        self._pending = None
+        self.everyone = RankIndex()
+        self.by_skill = {}
+        self._skills = {}
+
+    def build(self):
+        with self.lock:
+            self._pending = set()
+        try:
+            self._build()
+        finally:
+            with self.lock:
+                replay, self._pending = self._pending, None
+        self.update(replay)
+
+    def _build(self):
+        points = dict(CustomUser.objects.values_list("pk", "points").iterator(chunk_size=10000))
+        members, skills = defaultdict(dict), defaultdict(set)
+        for user_id, skill_id in SkillsKnown.objects.values_list("customuser_id", "skill_id").iterator(chunk_size=10000):
+            if user_id in points:
+                members[skill_id][user_id] = points[user_id]
+                skills[user_id].add(skill_id)
+        everyone = RankIndex.from_scores(points)
+        by_skill = {skill_id: RankIndex.from_scores(scores) for skill_id, scores in members.items()}
+        with self.lock:
+            self.everyone, self.by_skill, self._skills = everyone, by_skill, dict(skills)
+            self.built_at = time.monotonic()
+
+    def fresh(self):
+        """Rebuild if never built or older than ``LEADERBOARD_REFRESH``; returns ``self``.
+
+        Readers keep using the old boards while one thread rebuilds.
+        """
+        if self._stale():
+            with self._building:
+                if self._stale():
+                    self.build()
+        return self
+
+    def _stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > settings.LEADERBOARD_REFRESH
+
+    def board(self, skill_id=None):
+        return self.everyone if skill_id is None else self.by_skill.get(skill_id, RankIndex())
+
+    @property
+    def active(self):
+        """Built, or being built: changes must be applied."""
+        return self.built_at is not None or self._pending is not None
+
+    def update(self, user_ids):
+        """Re-read ``user_ids``' points and known skills into every board."""
+        user_ids = set(user_ids)
+        with self.lock:
+            if self._pending is not None:
+                # The build in progress may have read these users before the change
+                self._pending |= user_ids
+            if self.built_at is None or not user_ids:
+                return
+        points = dict(CustomUser.objects.filter(pk__in=user_ids).values_list("pk", "points"))
+        skills = defaultdict(set)
+        for user_id, skill_id in SkillsKnown.objects.filter(customuser_id__in=points).values_list("customuser_id", "skill_id"):
+            skills[user_id].add(skill_id)
+        with self.lock:
+            for user_id in user_ids:
+                old_skills = self._skills.pop(user_id, set())
+                if user_id not in points:
+                    self.everyone.remove(user_id)
+                    for skill_id in old_skills:
+                        self.by_skill.get(skill_id, RankIndex()).remove(user_id)
+                    continue
+                score = points[user_id]
+                self.everyone.set(user_id, score)
+                for skill_id in old_skills - skills[user_id]:
+                    self.by_skill.get(skill_id, RankIndex()).remove(user_id)
+                for skill_id in skills[user_id]:
+                    self.by_skill.setdefault(skill_id, RankIndex()).set(user_id, score)
+                if skills[user_id]:
+                    self._skills[user_id] = skills[user_id]
+
+
+boards = Leaderboards()
+
+
+def users_changed(*user_ids):
+    """Refresh ``user_ids`` on every board once the current transaction commits."""
+    ids = {user_id for user_id in user_ids if user_id is not None}
+    if ids and boards.active:
+        transaction.on_commit(lambda: boards.update(ids))
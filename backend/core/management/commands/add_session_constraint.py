@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+
+from core.schedule import EXCLUSION_CONSTRAINT, PERIOD_SQL
+
+
+class Command(BaseCommand):
+    help = (
+        f"Add the {EXCLUSION_CONSTRAINT} exclusion constraint on PostgreSQL, which migration 0010 "
+        "skips while a creator owns overlapping sessions. Lists the overlaps instead if any remain; "
+        "safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=50, help="Overlapping pairs listed.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write(f"{connection.vendor}: overlaps are checked by core.schedule, nothing to add")
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_constraint WHERE conname = %s", [EXCLUSION_CONSTRAINT])
+            if cursor.fetchone():
+                self.stdout.write(f"{EXCLUSION_CONSTRAINT} already exists")
+                return
+            cursor.execute(
+                "SELECT a.created_by_id, a.id, b.id FROM core_session a JOIN core_session b "
+                "ON a.created_by_id = b.created_by_id AND a.id < b.id "
+                f"AND {PERIOD_SQL.format(table='a')} && {PERIOD_SQL.format(table='b')} "
+                "ORDER BY a.created_by_id, a.start_time LIMIT %s",
+                [options["limit"]],
+            )
+            overlaps = cursor.fetchall()
+            if overlaps:
+                for user_id, first, second in overlaps:
+                    self.stdout.write(f"user {user_id}: session {first} overlaps session {second}")
+                raise CommandError("Resolve the overlapping sessions above, then run this command again.")
+            try:
+                with transaction.atomic():
+                    cursor.execute(
+                        f"ALTER TABLE core_session ADD CONSTRAINT {EXCLUSION_CONSTRAINT} "
+                        f"EXCLUDE USING gist (created_by_id WITH =, {PERIOD_SQL.format(table='core_session')} WITH &&)"
+                    )
+            except IntegrityError:
+                raise CommandError(
+                    "A session overlapping another was saved meanwhile; run this command again."
+                ) from None
+        self.stdout.write(self.style.SUCCESS(f"Added {EXCLUSION_CONSTRAINT}"))
@@ -0,0 +1,82 @@
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from core import dashboard, gamification, leaderboard
+from core.models import Certificate, CustomUser, Feedback, Session, UserCounter
+
+Participants = Session.participants.through
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay existing sessions, participations, feedback and certificates into "
+        "gamification counters and points, then award every badge whose criteria are met. "
+        "Counters and points of every user are replaced; badges already held are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        started = time.monotonic()
+        sources = {
+            "session_created": (Session.objects.all(), "created_by"),
+            "session_joined": (Participants.objects.all(), "customuser"),
+            "feedback_given": (Feedback.objects.filter(given_by__isnull=False), "given_by"),
+            "certificate_issued": (Certificate.objects.all(), "user"),
+        }
+        # One GROUP BY per event instead of walking each user's history
+        counts = defaultdict(dict)
+        for event, (qs, field) in sources.items():
+            for user_id, n in qs.order_by().values(field).annotate(n=Count("*")).values_list(field, "n"):
+                counts[user_id][event] = n
+        self.stdout.write(f"Counted events for {len(counts)} users in {time.monotonic() - started:.1f}s")
+
+        weights = settings.GAMIFICATION_POINTS
+        users = CustomUser.objects.order_by("pk")
+        total = users.count()
+        done = awarded = 0
+        last_pk = None
+        while True:
+            page = users if last_pk is None else users.filter(pk__gt=last_pk)
+            user_ids = list(page.values_list("pk", flat=True)[:chunk_size])
+            if not user_ids:
+                break
+            last_pk = user_ids[-1]
+            counters = [
+                UserCounter(user_id=user_id, name=event, value=n)
+                for user_id in user_ids
+                for event, n in counts.get(user_id, {}).items()
+                if event not in gamification.COLUMNS
+            ]
+            users_page = [
+                CustomUser(
+                    pk=user_id,
+                    points=sum(weights.get(e, 0) * n for e, n in counts.get(user_id, {}).items()),
+                    **{column: counts.get(user_id, {}).get(e, 0) for e, column in gamification.COLUMNS.items()},
+                )
+                for user_id in user_ids
+            ]
+            with transaction.atomic():
+                UserCounter.objects.filter(user_id__in=user_ids).delete()
+                UserCounter.objects.bulk_create(counters, batch_size=chunk_size)
+                CustomUser.objects.bulk_update(
+                    users_page, ["points", *gamification.COLUMNS.values()], batch_size=chunk_size
+                )
+                awarded += gamification.award(user_ids)
+                dashboard.invalidate(*user_ids)
+                leaderboard.users_changed(*user_ids)
+
+            done += len(user_ids)
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{done}/{total} users, {awarded} badges awarded, {done / elapsed:.0f} users/s")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {done} users and awarded {awarded} badges in {time.monotonic() - started:.1f}s"
+        ))
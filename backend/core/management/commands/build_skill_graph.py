@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import skillgraph
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the skill co-occurrence graph from skills_known and session participation, "
+        "publish it to SKILL_GRAPH_PATH and recompute Skill.popularity_score."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Also queue the recurring skills.graph job for run_worker.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        graph, changed = skillgraph.refresh(options["chunk_size"])
+        self.stdout.write(
+            f"{len(graph.skills)} skills, {len(graph.indices) // 2} co-occurring pairs "
+            f"over {graph.baskets} users; {changed} popularity scores changed"
+        )
+        if options["schedule"]:
+            skillgraph.reschedule()
+            self.stdout.write(f"Next rebuild queued in {settings.SKILL_GRAPH_REFRESH}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {settings.SKILL_GRAPH_PATH} in {time.monotonic() - started:.1f}s"
+        ))
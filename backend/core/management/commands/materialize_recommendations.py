@@ -0,0 +1,90 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.models import CustomUser, Recommendation
+from core import skillgraph
+from core.recommender import SkillsKnown, SkillsToLearn, score_user, skills_by_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Recommendation rows from users' skills_known/skills_to_learn and the published "
+        "skill graph (built first if there is none). Existing recommendations of every processed user "
+        "are replaced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Only users whose skills changed at or after this ISO date/datetime.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--limit", type=int, default=5, help="Recommendations kept per user.")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        users = CustomUser.objects.order_by("pk")
+        if options["since"]:
+            users = users.filter(skills_updated_at__gte=self._parse_since(options["since"]))
+
+        total = users.count()
+        started = time.monotonic()
+        graph = skillgraph.current()
+        if graph is None:
+            graph, _ = skillgraph.refresh()
+            self.stdout.write(f"Built the skill graph in {time.monotonic() - started:.1f}s")
+        self.stdout.write(
+            f"Using the skill graph of {len(graph.skills)} skills built at {graph.built_at:%Y-%m-%d %H:%M}"
+        )
+
+        done = written = 0
+        last_pk = None
+        while True:
+            page = users if last_pk is None else users.filter(pk__gt=last_pk)
+            user_ids = list(page.values_list("pk", flat=True)[:chunk_size])
+            if not user_ids:
+                break
+            last_pk = user_ids[-1]
+            known = skills_by_user(SkillsKnown, user_ids)
+            to_learn = skills_by_user(SkillsToLearn, user_ids)
+            rows = [
+                Recommendation(user_id=user_id, suggested_skill_id=skill_id, confidence_score=score)
+                for user_id in user_ids
+                for skill_id, score in score_user(
+                    known.get(user_id, set()), to_learn.get(user_id, set()), graph, options["limit"]
+                )
+            ]
+            with transaction.atomic():
+                Recommendation.objects.filter(user_id__in=user_ids).delete()
+                Recommendation.objects.bulk_create(rows, batch_size=chunk_size)
+
+            done += len(user_ids)
+            written += len(rows)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{done}/{total} users, {written} recommendations, {done / elapsed:.0f} users/s"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized {written} recommendations for {done} users in {time.monotonic() - started:.1f}s"
+        ))
+
+    def _parse_since(self, value):
+        try:
+            # Both return None for text that is not a date, but raise for impossible ones
+            since = parse_datetime(value)
+            day = parse_date(value) if since is None else None
+        except ValueError as exc:
+            raise CommandError(f"Invalid --since value: {value!r} ({exc})") from None
+        if since is None:
+            if day is None:
+                raise CommandError(f"Invalid --since value: {value!r}")
+            since = datetime(day.year, day.month, day.day)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
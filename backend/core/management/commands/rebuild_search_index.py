@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Repopulate the SQLite FTS5 search tables, e.g. after bulk_create/update "
+        "bypassed the signals that keep them in sync. PostgreSQL indexes need no rebuild."
+    )
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write("No FTS5 tables on this database; nothing to rebuild.")
+            return
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
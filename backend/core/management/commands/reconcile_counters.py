@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from core import counters, dashboard, mentorship
+from core.models import CustomUser, Session
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the mentor -> mentee edges and the denormalised counters on users and "
+        "sessions from their source rows, and repair every row that has drifted (e.g. after "
+        "bulk writes that sent no signals)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without repairing it.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        chunk_size, dry_run = options["chunk_size"], options["dry_run"]
+        # Edges first: rebuilding them moves mentee_count, which is checked below
+        edges = 0
+        for mentor_ids in self.pages(CustomUser, chunk_size):
+            with transaction.atomic():
+                edges += mentorship.rebuild(mentor_ids, dry_run=dry_run)
+        self.stdout.write(f"mentorships: {'found' if dry_run else 'repaired'} {edges} drifted")
+        for model, expected in (
+            (CustomUser, counters.expected_user_counters()),
+            (Session, counters.expected_session_counters()),
+        ):
+            checked, drifted = self.reconcile(model, expected, chunk_size, dry_run)
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: checked {checked}, "
+                f"{'found' if dry_run else 'repaired'} {drifted} drifted"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.monotonic() - started:.1f}s"))
+
+    def reconcile(self, model, expected, chunk_size, dry_run):
+        # Compare stored and recomputed values in the database, one keyset page at a time
+        annotated = {f"expected_{field}": expression for field, expression in expected.items()}
+        drift = Q()
+        for field in expected:
+            drift |= ~Q(**{field: F(f"expected_{field}")})
+        checked = drifted = 0
+        for pks in self.pages(model, chunk_size):
+            checked += len(pks)
+            stale = list(
+                model.objects.filter(pk__in=pks).annotate(**annotated).filter(drift)
+                .values("pk", *expected, *annotated)
+            )
+            drifted += len(stale)
+            for row in stale[:5]:
+                changes = ", ".join(
+                    f"{field} {row[field]} -> {row[f'expected_{field}']}"
+                    for field in expected if row[field] != row[f"expected_{field}"]
+                )
+                self.stdout.write(f"  {model.__name__} {row['pk']}: {changes}")
+            if stale and not dry_run:
+                stale_pks = [row["pk"] for row in stale]
+                with transaction.atomic():
+                    # Recompute in the UPDATE itself so writes since the check are not lost
+                    model.objects.filter(pk__in=stale_pks).update(**expected)
+                    if model is CustomUser:
+                        dashboard.invalidate(*stale_pks)
+        return checked, drifted
+
+    def pages(self, model, chunk_size):
+        """Primary keys of ``model`` in keyset pages of ``chunk_size``."""
+        rows = model.objects.order_by("pk")
+        last_pk = None
+        while True:
+            page = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+            pks = list(page.values_list("pk", flat=True)[:chunk_size])
+            if not pks:
+                return
+            last_pk = pks[-1]
+            yield pks
@@ -0,0 +1,49 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (recording processing etc.) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when no job is due instead of polling.")
+        parser.add_argument("--kind", action="append", dest="kinds", help="Only run jobs of this kind (repeatable).")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        # Finish the current job on SIGTERM/SIGINT, then exit
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        worker_id = options["worker_id"]
+        self.stdout.write(f"Worker {worker_id} started")
+        ran = 0
+        while not self.stopping:
+            close_old_connections()
+            requeued = jobs.requeue_abandoned()
+            if requeued:
+                self.stdout.write(f"Re-queued {requeued} abandoned job(s)")
+            job = jobs.claim(worker_id, options["kinds"])
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll"])
+                continue
+            started = time.monotonic()
+            ok = jobs.run(job)
+            ran += 1
+            outcome = self.style.SUCCESS("done") if ok else self.style.ERROR(job.status)
+            self.stdout.write(f"{job.kind} {job.pk}: {outcome} in {time.monotonic() - started:.1f}s")
+        self.stdout.write(f"Worker {worker_id} stopped after {ran} job(s)")
+
+    def _stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import mentor_index
+from core.ai_client import AIServiceUnavailable
+from core.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Send every user who can mentor, with their skills_known, to the AI service's mentor "
+        "index. Later changes are synced by mentor_index.sync jobs; run this for a new or "
+        "emptied service."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        started = time.monotonic()
+        mentors = CustomUser.objects.exclude(role="learner").order_by("pk").values_list("pk", flat=True)
+        done, last = 0, None
+        while True:
+            page = mentors.filter(pk__gt=last) if last is not None else mentors
+            user_ids = list(page[:chunk_size])
+            if not user_ids:
+                break
+            try:
+                upserted, _ = mentor_index.push(user_ids)
+            except AIServiceUnavailable as exc:
+                raise CommandError(f"Stopped after {done} users: {exc}") from None
+            done += upserted
+            last = user_ids[-1]
+            self.stdout.write(f"  {done} indexed")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {done} mentors in {time.monotonic() - started:.1f}s"))
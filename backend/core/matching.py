@@ -0,0 +1,352 @@
+"""In-process mentor matching: for a learner, the users who know what they want to learn.
+
+Two sparse user x skill relations are held in memory, ``known`` (``skills_known``) and
+``wanted`` (``skills_to_learn``). Mentor ``m`` scores for learner ``l``::
+
+    coverage(wanted[l], known[m]) + MATCHING_RECIPROCITY * coverage(known[l], wanted[m])
+
+where ``coverage(S, T)`` is the IDF-weighted share of ``S`` found in ``T``: a rare skill
+counts for more than one everybody knows. Only users covering at least one wanted
+skill, other than the learner and not in the ``learner`` role, are ranked.
+
+Each relation keeps a base snapshot in CSR (rows: a user's skills) and CSC (postings:
+a skill's users) numpy arrays, plus per-user overrides for users changed since.
+A query sums the postings of the learner's few wanted skills, patches in the overridden
+users from a small delta index, and picks the top k with ``argpartition``. Short
+postings are merged by sorting (``O(postings)``); once they reach ``SPARSE_BELOW`` of
+all users a dense ``bincount`` pass is cheaper, and mentors that cannot reach the top k
+are dropped before reciprocity is computed. Overrides are merged into the base once there are more
+than ``COMPACT_AT`` of them.
+
+The engine is built from the through tables on first use and kept current by
+``core.signals``, which calls ``users_changed`` on skill m2m changes and user saves.
+Changes made by other processes are picked up by a full rebuild once the engine is
+``MATCHING_REFRESH`` seconds old.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import CustomUser, Skill
+
+SkillsKnown = CustomUser.skills_known.through
+SkillsToLearn = CustomUser.skills_to_learn.through
+EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def _compress(keys, values, size):
+    """``(ptr, values)`` grouping ``values`` by ``keys`` in ``0 .. size - 1``, each group sorted."""
+    order = np.lexsort((values, keys))
+    ptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=ptr[1:])
+    return ptr, values[order].astype(np.int32, copy=False)
+
+
+def _gather(ptr, postings, cols, weights):
+    """The postings of ``cols`` concatenated, with each entry's column weight."""
+    inside = cols < len(ptr) - 1
+    cols, weights = cols[inside], weights[inside]
+    if not len(cols):
+        return EMPTY, np.zeros(0)
+    lengths = ptr[cols + 1] - ptr[cols]
+    return np.concatenate([postings[ptr[c]:ptr[c + 1]] for c in cols]), np.repeat(weights, lengths)
+
+
+def _sum_postings(ptr, postings, cols, weights):
+    """Users holding any of ``cols`` with the summed ``weights`` of those they hold,
+    as ``(positions, scores)`` sorted by position."""
+    positions, weights = _gather(ptr, postings, cols, weights)
+    users, inverse = np.unique(positions, return_inverse=True)
+    return users.astype(np.int32, copy=False), np.bincount(inverse, weights=weights, minlength=len(users))
+
+
+class SkillRelation:
+    """A sparse users x skills 0/1 matrix: a base snapshot plus per-user overrides."""
+
+    def __init__(self, users, skills, size, n_skills):
+        self.size = size
+        self.n_skills = n_skills
+        self.row_ptr, self.row_cols = _compress(users, skills, size)
+        self.col_ptr, self.col_users = _compress(skills, users, n_skills)
+        self.df = np.diff(self.col_ptr)
+        self.overrides = {}
+        self._delta = None
+
+    def row(self, pos):
+        if pos in self.overrides:
+            return self.overrides[pos]
+        if pos >= len(self.row_ptr) - 1:
+            return EMPTY
+        return self.row_cols[self.row_ptr[pos]:self.row_ptr[pos + 1]]
+
+    def set_row(self, pos, cols):
+        cols = np.unique(np.asarray(cols, dtype=np.int32))
+        self.size = max(self.size, pos + 1)
+        if len(cols) and cols[-1] >= len(self.df):
+            self.df = np.concatenate([self.df, np.zeros(cols[-1] + 1 - len(self.df), dtype=self.df.dtype)])
+        np.subtract.at(self.df, self.row(pos), 1)
+        np.add.at(self.df, cols, 1)
+        self.overrides[pos] = cols
+        self._delta = None
+
+    def _delta_index(self):
+        """Postings of the overridden rows, and those rows' positions (sorted)."""
+        if self._delta is None:
+            dirty = np.fromiter(self.overrides, dtype=np.int32, count=len(self.overrides))
+            rows = [self.overrides[pos] for pos in dirty]
+            users = np.repeat(dirty, [len(r) for r in rows]).astype(np.int32)
+            skills = np.concatenate(rows).astype(np.int32) if rows else EMPTY
+            ptr, postings = _compress(skills, users, len(self.df))
+            self._delta = (np.sort(dirty), ptr, postings)
+        return self._delta
+
+    def postings_length(self, cols):
+        cols = cols[cols < len(self.col_ptr) - 1]
+        return int((self.col_ptr[cols + 1] - self.col_ptr[cols]).sum())
+
+    def overlap(self, cols, weights):
+        """``(positions, scores)``: per user, the summed ``weights`` of the ``cols`` it holds."""
+        users, scores = _sum_postings(self.col_ptr, self.col_users, cols, weights)
+        if not self.overrides:
+            return users, scores
+        dirty, ptr, postings = self._delta_index()
+        stale = np.isin(users, dirty, assume_unique=True)
+        patched, patched_scores = _sum_postings(ptr, postings, cols, weights)
+        users = np.concatenate([users[~stale], patched])
+        scores = np.concatenate([scores[~stale], patched_scores])
+        order = np.argsort(users, kind="stable")
+        return users[order], scores[order]
+
+    def overlap_dense(self, cols, weights, size):
+        """As ``overlap``, as one score per position ``0 .. size - 1``.
+
+        For long postings one ``bincount`` pass is cheaper than sorting them.
+        """
+        scores = np.bincount(*_gather(self.col_ptr, self.col_users, cols, weights), minlength=size)
+        if self.overrides:
+            dirty, ptr, postings = self._delta_index()
+            scores[dirty] = 0
+            patched, patched_scores = _sum_postings(ptr, postings, cols, weights)
+            scores[patched] += patched_scores
+        return scores
+
+    def compact(self):
+        """Merge the overrides into a new base snapshot."""
+        counts = np.diff(self.row_ptr)
+        users = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        keep = ~np.isin(users, np.fromiter(self.overrides, dtype=np.int32, count=len(self.overrides)))
+        users, skills = [users[keep]], [self.row_cols[keep]]
+        for pos, cols in self.overrides.items():
+            users.append(np.full(len(cols), pos, dtype=np.int32))
+            skills.append(cols)
+        users, skills = np.concatenate(users), np.concatenate(skills).astype(np.int32)
+        self.__init__(users, skills, self.size, max(self.n_skills, len(self.df)))
+
+
+class Matcher:
+    # Overrides merged into the base snapshot beyond this many changed users
+    COMPACT_AT = 4096
+    # Score by sorting postings below this fraction of all users, by a dense pass above
+    SPARSE_BELOW = 1 / 16
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._building = threading.Lock()
+        self.built_at = None
+        self._ids, self._pos = [], {}
+        self._skill_ids, self._skill_cols = [], {}
+        self.can_mentor = np.zeros(0, dtype=bool)
+        self.known, self.wanted = SkillRelation(EMPTY, EMPTY, 0, 0), SkillRelation(EMPTY, EMPTY, 0, 0)
+
+    def __contains__(self, user_id):
+        return user_id in self._pos
+
+    def build(self):
+        ids, roles = [], []
+        for user_id, role in CustomUser.objects.order_by("pk").values_list("pk", "role").iterator(chunk_size=10000):
+            ids.append(user_id)
+            roles.append(role)
+        skill_ids = list(Skill.objects.order_by("pk").values_list("pk", flat=True))
+        pos = {user_id: i for i, user_id in enumerate(ids)}
+        cols = {skill_id: i for i, skill_id in enumerate(skill_ids)}
+        relations = []
+        for through in (SkillsKnown, SkillsToLearn):
+            users, skills = [], []
+            for user_id, skill_id in through.objects.values_list("customuser_id", "skill_id").iterator(chunk_size=10000):
+                if user_id in pos and skill_id in cols:
+                    users.append(pos[user_id])
+                    skills.append(cols[skill_id])
+            relations.append(SkillRelation(
+                np.asarray(users, dtype=np.int32), np.asarray(skills, dtype=np.int32), len(ids), len(skill_ids),
+            ))
+        can_mentor = np.asarray([role != "learner" for role in roles], dtype=bool)
+        with self.lock:
+            self._ids, self._pos = ids, pos
+            self._skill_ids, self._skill_cols = skill_ids, cols
+            self.known, self.wanted = relations
+            self.can_mentor = can_mentor
+            self.built_at = time.monotonic()
+
+    def fresh(self):
+        """Rebuild if never built or older than ``MATCHING_REFRESH``; returns ``self``."""
+        if self._stale():
+            with self._building:
+                if self._stale():
+                    self.build()
+        return self
+
+    def _stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > settings.MATCHING_REFRESH
+
+    def _col(self, skill_id):
+        col = self._skill_cols.get(skill_id)
+        if col is None:
+            col = self._skill_cols[skill_id] = len(self._skill_ids)
+            self._skill_ids.append(skill_id)
+        return col
+
+    def update(self, user_ids):
+        """Re-read ``user_ids``' role and skills."""
+        if self.built_at is None:
+            return
+        user_ids = set(user_ids)
+        roles = dict(CustomUser.objects.filter(pk__in=user_ids).values_list("pk", "role"))
+        rows = {}
+        for name, through in (("known", SkillsKnown), ("wanted", SkillsToLearn)):
+            for user_id, skill_id in through.objects.filter(customuser_id__in=roles).values_list("customuser_id", "skill_id"):
+                rows.setdefault((name, user_id), []).append(skill_id)
+        with self.lock:
+            for user_id in user_ids:
+                pos = self._pos.get(user_id)
+                if pos is None:
+                    if user_id not in roles:
+                        continue
+                    pos = self._pos[user_id] = len(self._ids)
+                    self._ids.append(user_id)
+                    if pos >= len(self.can_mentor):
+                        self.can_mentor = np.concatenate([self.can_mentor, np.zeros(max(pos + 1, 1024), dtype=bool)])
+                # Deleted users keep their position with no skills until the next rebuild
+                self.can_mentor[pos] = user_id in roles and roles[user_id] != "learner"
+                for name in ("known", "wanted"):
+                    cols = [self._col(skill_id) for skill_id in rows.get((name, user_id), ())]
+                    getattr(self, name).set_row(pos, cols)
+            for relation in (self.known, self.wanted):
+                if len(relation.overrides) > self.COMPACT_AT:
+                    relation.compact()
+
+    def _weights(self, cols):
+        """IDF of each skill in ``cols`` over ``known``, normalised to sum to 1."""
+        df = self.known.df
+        counts = np.zeros(len(cols))
+        inside = cols < len(df)
+        counts[inside] = df[cols[inside]]
+        idf = np.log((1 + len(self._ids)) / (1 + counts)) + 1
+        return idf / idf.sum()
+
+    def matches(self, user_id, limit=10):
+        """``[(mentor_id, score, [skill_id, ...])]`` best first; the skills are the learner's
+        wanted skills the mentor knows. ``None`` if ``user_id`` is not indexed."""
+        with self.lock:
+            pos = self._pos.get(user_id)
+            if pos is None:
+                return None
+            return self._rank(pos, self.wanted.row(pos), self.known.row(pos), limit)
+
+    def matches_for(self, wanted_skill_ids, known_skill_ids, limit=10):
+        """As ``matches``, for a learner the engine does not hold, from their skill ids.
+
+        Leaves the engine as it is: skills it has not seen get throwaway columns.
+        """
+        with self.lock:
+            extra = len(self._skill_ids)
+            cols = {}
+            for skill_id in {*wanted_skill_ids, *known_skill_ids}:
+                cols[skill_id] = self._skill_cols.get(skill_id)
+                if cols[skill_id] is None:
+                    cols[skill_id], extra = extra, extra + 1
+            wanted = np.array([cols[s] for s in set(wanted_skill_ids)], dtype=np.int32)
+            known = np.array([cols[s] for s in set(known_skill_ids)], dtype=np.int32)
+            return self._rank(-1, wanted, known, limit)
+
+    def _rank(self, pos, wanted, known, limit):
+        wanted = np.sort(wanted)
+        if not len(wanted):
+            return []
+        known = np.sort(known)
+        reciprocity = settings.MATCHING_RECIPROCITY if len(known) else 0
+        size = len(self.can_mentor)
+        if self.known.postings_length(wanted) < size * self.SPARSE_BELOW:
+            users, scores = self._sparse_candidates(pos, wanted, known, reciprocity)
+        else:
+            users, scores = self._dense_candidates(pos, wanted, known, reciprocity, limit, size)
+
+        if limit < len(users):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            # argpartition keeps arbitrary members of a tie at the limit-th score; keep
+            # the earliest positions instead, as ai_service's top_k_indices does
+            kth = scores[top].min()
+            above = np.flatnonzero(scores > kth)
+            tied = np.flatnonzero(scores == kth)
+            tied = tied[np.argsort(users[tied], kind="stable")][:limit - len(above)]
+            top = np.concatenate([above, tied])
+        else:
+            top = np.arange(len(users))
+        # Best first, ties by position (user id order as of the last build)
+        top = top[np.lexsort((users[top], -scores[top]))]
+        wanted_set = set(wanted.tolist())
+        return [
+            (
+                self._ids[users[i]],
+                float(scores[i]),
+                [self._skill_ids[c] for c in self.known.row(int(users[i])).tolist() if c in wanted_set],
+            )
+            for i in top
+        ]
+
+    def _sparse_candidates(self, pos, wanted, known, reciprocity):
+        """Every mentor covering a wanted skill, from sorted postings (rare skills)."""
+        users, scores = self.known.overlap(wanted, self._weights(wanted))
+        keep = (users != pos) & self.can_mentor[users]
+        users, scores = users[keep], scores[keep]
+        if reciprocity and len(users):
+            back, back_scores = self.wanted.overlap(known, self._weights(known))
+            if len(back):
+                at = np.minimum(np.searchsorted(back, users), len(back) - 1)
+                hit = back[at] == users
+                scores[hit] += reciprocity * back_scores[at[hit]]
+        return users, scores
+
+    def _dense_candidates(self, pos, wanted, known, reciprocity, limit, size):
+        """Only the mentors that can still reach the top ``limit`` (popular skills).
+
+        Reciprocity adds at most ``reciprocity``, so anyone more than that below the
+        ``limit``-th best wanted-skill coverage is dropped before it is computed.
+        """
+        scores = self.known.overlap_dense(wanted, self._weights(wanted), size)
+        scores *= self.can_mentor
+        if pos >= 0:
+            scores[pos] = 0
+        users = np.flatnonzero(scores > 0)
+        scores = scores[users]
+        if limit < len(users):
+            kth = np.partition(scores, len(users) - limit)[len(users) - limit]
+            if kth > reciprocity:
+                keep = scores >= kth - reciprocity
+                users, scores = users[keep], scores[keep]
+        users = users.astype(np.int32)
+        if reciprocity and len(users):
+            scores += reciprocity * self.wanted.overlap_dense(known, self._weights(known), size)[users]
+        return users, scores
+
+
+matcher = Matcher()
+
+
+def users_changed(*user_ids):
+    """Refresh ``user_ids`` in the matcher once the current transaction commits."""
+    ids = {user_id for user_id in user_ids if user_id is not None}
+    if ids and matcher.built_at is not None:
+        transaction.on_commit(lambda: matcher.update(ids))
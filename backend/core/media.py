@@ -0,0 +1,206 @@
+"""Derived media for session recordings, produced by background jobs (core.jobs).
+
+When a recording is uploaded, ``enqueue_processing`` queues two jobs and returns:
+
+- ``media.poster``: a JPEG poster frame.
+- ``media.renditions``: H.264/AAC MP4s for each ``MEDIA_RENDITIONS`` height below the
+  source's, with fixed keyframe intervals. On success it queues ``media.hls``.
+- ``media.hls``: repackages the renditions (stream copy, no re-encode) into HLS
+  segments plus a master playlist.
+
+Outputs go to ``recordings/<session>/<source hash>/`` and their storage names are merged
+into ``Session.renditions``. ``Session.processing_status`` moves from ``pending`` through
+``processing`` to ``ready`` (poster and HLS present) or ``failed``. Every job carries
+the source file name; if the session has since received another upload, its results
+are dropped.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from . import jobs
+from .models import Job, Session
+
+KINDS = ("media.poster", "media.renditions", "media.hls")
+AUDIO_KBPS = 128
+
+
+def enqueue_processing(session):
+    """Queue processing of ``session.recording_file``. Only inserts rows; never blocks on ffmpeg."""
+    session_id = str(session.pk)
+    source = session.recording_file.name
+    # Queued work for an earlier upload of this session is obsolete
+    Job.objects.filter(kind__in=KINDS, status="queued", payload__session=session_id).delete()
+    Session.objects.filter(pk=session.pk).update(processing_status="pending", renditions={})
+    session.processing_status, session.renditions = "pending", {}
+    jobs.enqueue("media.poster", session=session_id, source=source)
+    jobs.enqueue("media.renditions", session=session_id, source=source)
+
+
+# ---- ffmpeg ----
+
+def ffmpeg(*args):
+    _run([settings.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", *args])
+
+
+def probe(path):
+    """``(width, height)`` of the first video stream."""
+    out = _run([
+        settings.FFPROBE_BINARY, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height", "-of", "json", path,
+    ])
+    stream = json.loads(out)["streams"][0]
+    return int(stream["width"]), int(stream["height"])
+
+
+def _run(cmd):
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{os.path.basename(cmd[0])} exited {result.returncode}: {result.stderr[-2000:]}")
+    return result.stdout
+
+
+# ---- storage ----
+
+def _storage():
+    return Session._meta.get_field("recording_file").storage
+
+
+def output_prefix(session_id, source):
+    # Per-source directory, so a re-upload never mixes segments with the old ones
+    return f"recordings/{session_id}/{hashlib.sha1(source.encode()).hexdigest()[:10]}"
+
+
+@contextmanager
+def local_file(name):
+    """A local filesystem path for a storage name, downloading it for remote storages."""
+    storage = _storage()
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        path = None
+    if path:
+        yield path
+        return
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(name)[1]) as tmp:
+        with storage.open(name, "rb") as src:
+            shutil.copyfileobj(src, tmp, 1024 * 1024)
+        tmp.flush()
+        yield tmp.name
+
+
+def publish(workdir, prefix):
+    """Save every file under ``workdir`` to storage at ``prefix``, keeping relative names
+    (HLS playlists refer to their segments by them)."""
+    storage = _storage()
+    for root, _, files in os.walk(workdir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = f"{prefix}/{os.path.relpath(path, workdir).replace(os.sep, '/')}"
+            if storage.exists(name):
+                storage.delete(name)
+            with open(path, "rb") as fh:
+                storage.save(name, File(fh))
+
+
+def _merge(payload, outputs=None, status=None):
+    """Record outputs and status on the session unless it is gone or has a newer recording."""
+    with transaction.atomic():
+        session = (
+            Session.objects.select_for_update()
+            .only("recording_file", "renditions", "processing_status")
+            .filter(pk=payload["session"])
+            .first()
+        )
+        if session is None or session.recording_file.name != payload["source"]:
+            return None
+        renditions = {**session.renditions, **(outputs or {})}
+        if status is None and session.processing_status == "failed":
+            # Another step already gave up; keep whatever this one produced
+            status = "failed"
+        elif status is None:
+            status = "ready" if {"poster", "hls"} <= renditions.keys() else "processing"
+        Session.objects.filter(pk=session.pk).update(renditions=renditions, processing_status=status)
+        return renditions
+
+
+def mark_failed(payload):
+    _merge(payload, status="failed")
+
+
+# ---- handlers ----
+
+@jobs.handler("media.poster", on_failure=mark_failed)
+def make_poster(payload):
+    if _merge(payload) is None:
+        return
+    prefix = output_prefix(payload["session"], payload["source"])
+    with local_file(payload["source"]) as src, tempfile.TemporaryDirectory() as workdir:
+        # thumbnail picks a representative frame rather than a black first one
+        ffmpeg("-i", src, "-vf", "thumbnail,scale=640:-2", "-frames:v", "1", os.path.join(workdir, "poster.jpg"))
+        publish(workdir, prefix)
+    _merge(payload, {"poster": f"{prefix}/poster.jpg"})
+
+
+@jobs.handler("media.renditions", on_failure=mark_failed)
+def make_renditions(payload):
+    if _merge(payload) is None:
+        return
+    prefix = output_prefix(payload["session"], payload["source"])
+    outputs = {}
+    with local_file(payload["source"]) as src, tempfile.TemporaryDirectory() as workdir:
+        _, source_height = probe(src)
+        ladder = [(h, kbps) for h, kbps in settings.MEDIA_RENDITIONS if h < source_height]
+        # Always produce at least the smallest rendition, even from a tiny source
+        for height, kbps in ladder or settings.MEDIA_RENDITIONS[:1]:
+            ffmpeg(
+                "-i", src, "-map", "0:v:0", "-map", "0:a:0?",
+                "-vf", f"scale=-2:{min(height, source_height)}",
+                "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main",
+                "-b:v", f"{kbps}k", "-maxrate", f"{int(kbps * 1.5)}k", "-bufsize", f"{kbps * 2}k",
+                # Fixed GOP so HLS segments cut on keyframes at the same times in every rendition
+                "-g", "48", "-keyint_min", "48", "-sc_threshold", "0",
+                "-c:a", "aac", "-b:a", f"{AUDIO_KBPS}k", "-ac", "2",
+                "-movflags", "+faststart",
+                os.path.join(workdir, f"{height}p.mp4"),
+            )
+            outputs[f"{height}p"] = f"{prefix}/{height}p.mp4"
+        publish(workdir, prefix)
+    if _merge(payload, outputs) is not None:
+        jobs.enqueue("media.hls", session=payload["session"], source=payload["source"])
+
+
+@jobs.handler("media.hls", on_failure=mark_failed)
+def make_hls(payload):
+    renditions = _merge(payload)
+    if renditions is None:
+        return
+    prefix = output_prefix(payload["session"], payload["source"])
+    bitrates = dict(settings.MEDIA_RENDITIONS)
+    variants = sorted((int(key[:-1]), name) for key, name in renditions.items() if key.endswith("p"))
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    with tempfile.TemporaryDirectory() as workdir:
+        for height, name in variants:
+            os.makedirs(os.path.join(workdir, f"{height}p"))
+            with local_file(name) as src:
+                width, actual_height = probe(src)
+                ffmpeg(
+                    "-i", src, "-c", "copy", "-f", "hls",
+                    "-hls_time", str(settings.HLS_SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+                    "-hls_segment_filename", os.path.join(workdir, f"{height}p", "seg_%04d.ts"),
+                    os.path.join(workdir, f"{height}p", "index.m3u8"),
+                )
+            bandwidth = (int(bitrates.get(height, 0) * 1.5) + AUDIO_KBPS) * 1000
+            lines += [f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{actual_height}", f"{height}p/index.m3u8"]
+        with open(os.path.join(workdir, "master.m3u8"), "w") as fh:
+            fh.write("\n".join(lines) + "\n")
+        publish(workdir, prefix)
+    _merge(payload, {"hls": f"{prefix}/master.m3u8"})
@@ -0,0 +1,56 @@
+"""Keeps the AI service's mentor index (``/index/users``) in step with the database.
+
+``/recommend`` calls without a ``users`` list, such as
+``GET /api/recommendations/for-skill/``, score only what the service has indexed.
+``core.signals`` calls ``users_changed`` whenever a user's role or ``skills_known`` may
+have moved. After commit, that queues a ``mentor_index.sync`` job. The job sends the
+current profiles of users who can mentor (any role but ``learner``) and removes
+everyone else. A job that fails is retried by the queue, so changes made while the
+service is down reach it when it comes back. ``manage.py sync_mentor_index`` pushes
+every mentor, e.g. for a fresh service.
+"""
+from django.db import transaction
+
+from . import ai_client, jobs
+from .models import CustomUser
+
+JOB = "mentor_index.sync"
+
+SkillsKnown = CustomUser.skills_known.through
+
+
+def profiles(user_ids):
+    """``{"id", "skills_known"}`` for those of ``user_ids`` who can mentor."""
+    mentors = {
+        user_id: []
+        for user_id in CustomUser.objects.filter(pk__in=user_ids).exclude(role="learner").values_list("pk", flat=True)
+    }
+    rows = SkillsKnown.objects.filter(customuser_id__in=mentors).values_list("customuser_id", "skill__name")
+    for user_id, name in rows.order_by("customuser_id", "skill__name"):
+        mentors[user_id].append(name)
+    return [{"id": str(user_id), "skills_known": skills} for user_id, skills in mentors.items()]
+
+
+def push(user_ids):
+    """Upsert the mentors among ``user_ids`` and unindex the rest. Returns ``(upserted, removed)``."""
+    client = ai_client.get_client()
+    found = profiles(user_ids)
+    if found:
+        client.post("/index/users", found)
+    indexed = {profile["id"] for profile in found}
+    gone = [user_id for user_id in map(str, user_ids) if user_id not in indexed]
+    for user_id in gone:
+        client.delete(f"/index/users/{user_id}")
+    return len(found), len(gone)
+
+
+@jobs.handler(JOB)
+def sync(payload):
+    push(payload["users"])
+
+
+def users_changed(*user_ids):
+    """Queue a sync of ``user_ids`` once the current transaction commits."""
+    ids = sorted({str(user_id) for user_id in user_ids if user_id is not None})
+    if ids:
+        transaction.on_commit(lambda: jobs.enqueue(JOB, users=ids))
@@ -0,0 +1,98 @@
+"""Mentor -> mentee edges: one ``Mentorship`` row per mentor and distinct participant.
+
+The edges materialise ``CustomUser.objects.filter(sessions_joined__created_by=mentor)
+.distinct()`` with each pair's session count and first/last session start, so a
+mentor's mentees are an index range scan on ``(mentor, ...)`` in any of the supported
+orders, and ``CustomUser.mentee_count`` moves by one whenever an edge appears or goes.
+
+``core.signals`` calls ``refresh`` with the pairs touched by participant changes,
+session deletes and changes to a session's creator or start time; each pair is
+recomputed from the participant rows, so repeated or overlapping refreshes are
+harmless. ``manage.py reconcile_counters`` rebuilds every mentor's edges.
+"""
+from collections import Counter
+
+from django.db.models import Count, Max, Min, Q
+
+from . import counters
+from .models import CustomUser, Mentorship, Session
+
+Participants = Session.participants.through
+EDGE_FIELDS = ("session_count", "first_session_at", "last_session_at")
+
+
+def _stats(participants):
+    """``{(mentor_id, mentee_id): (session_count, first_session_at, last_session_at)}``."""
+    rows = (
+        participants.order_by()
+        .values("session__created_by", "customuser")
+        .annotate(n=Count("*"), first=Min("session__start_time"), last=Max("session__start_time"))
+        .values_list("session__created_by", "customuser", "n", "first", "last")
+    )
+    return {(mentor_id, mentee_id): (n, first, last) for mentor_id, mentee_id, n, first, last in rows}
+
+
+def _pair_filter(pairs, mentor="mentor", mentee="mentee"):
+    # One IN list per mentor: a session's participants all share its creator
+    by_mentor = {}
+    for mentor_id, mentee_id in pairs:
+        by_mentor.setdefault(mentor_id, []).append(mentee_id)
+    condition = Q()
+    for mentor_id, mentee_ids in by_mentor.items():
+        condition |= Q(**{mentor: mentor_id, f"{mentee}__in": mentee_ids})
+    return condition
+
+
+def _apply(current, expected, pairs, dry_run=False):
+    """Make the stored edges for ``pairs`` match ``expected``; returns the number changed."""
+    gone = [pair for pair in pairs if pair in current and pair not in expected]
+    changed = [pair for pair in pairs if pair in expected and current.get(pair) != expected[pair]]
+    if dry_run:
+        return len(gone) + len(changed)
+    if gone:
+        Mentorship.objects.filter(_pair_filter(gone)).delete()
+    if changed:
+        Mentorship.objects.bulk_create(
+            [
+                Mentorship(mentor_id=mentor_id, mentee_id=mentee_id, **dict(zip(EDGE_FIELDS, expected[mentor_id, mentee_id])))
+                for mentor_id, mentee_id in changed
+            ],
+            update_conflicts=True,
+            unique_fields=["mentor", "mentee"],
+            update_fields=list(EDGE_FIELDS),
+        )
+    deltas = Counter()
+    for mentor_id, _ in gone:
+        deltas[mentor_id] -= 1
+    for pair in changed:
+        if pair not in current:
+            deltas[pair[0]] += 1
+    counters.add(CustomUser, {mentor_id: {"mentee_count": n} for mentor_id, n in deltas.items()})
+    return len(gone) + len(changed)
+
+
+def refresh(pairs):
+    """Recompute the edges of ``(mentor_id, mentee_id)`` pairs from the participant rows."""
+    pairs = {(mentor_id, mentee_id) for mentor_id, mentee_id in pairs if mentor_id and mentee_id}
+    if not pairs:
+        return 0
+    expected = _stats(Participants.objects.filter(_pair_filter(pairs, "session__created_by", "customuser")))
+    current = {
+        (mentor_id, mentee_id): tuple(values)
+        for mentor_id, mentee_id, *values in Mentorship.objects.filter(_pair_filter(pairs))
+        .values_list("mentor_id", "mentee_id", *EDGE_FIELDS)
+    }
+    return _apply(current, expected, pairs)
+
+
+def rebuild(mentor_ids, dry_run=False):
+    """Recompute every edge of ``mentor_ids``; returns the number of edges changed (or,
+    with ``dry_run``, that would change)."""
+    mentor_ids = list(mentor_ids)
+    expected = _stats(Participants.objects.filter(session__created_by__in=mentor_ids))
+    current = {
+        (mentor_id, mentee_id): tuple(values)
+        for mentor_id, mentee_id, *values in Mentorship.objects.filter(mentor__in=mentor_ids)
+        .values_list("mentor_id", "mentee_id", *EDGE_FIELDS)
+    }
+    return _apply(current, expected, set(current) | set(expected), dry_run)
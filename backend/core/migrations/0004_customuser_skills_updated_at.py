@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_wishlist"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="skills_updated_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("core", "0004_customuser_skills_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="certificate",
+            index=models.Index(
+                fields=["user", "skill"], name="certificate_user_skill_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="certificate",
+            index=models.Index(
+                fields=["user", "-issue_date", "id"], name="certificate_user_issued_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                fields=["role", "username"], name="user_role_username_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedback",
+            index=models.Index(
+                fields=["session", "rating"], name="feedback_session_rating_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recommendation",
+            index=models.Index(
+                fields=["user", "-confidence_score"], name="rec_user_score_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recommendation",
+            index=models.Index(
+                fields=["-confidence_score", "id"], name="rec_score_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="session",
+            index=models.Index(fields=["start_time", "id"], name="session_start_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="session",
+            index=models.Index(
+                fields=["created_by", "start_time", "id"],
+                name="session_owner_start_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="session",
+            index=models.Index(
+                fields=["skill", "start_time", "id"], name="session_skill_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="wishlist",
+            index=models.Index(
+                fields=["user", "-created_at", "id"], name="wishlist_user_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+import uuid
+
+from django.db import OperationalError, migrations
+
+# Frozen from core.search as of this migration
+SEARCH_CONFIG = "english"
+FTS_TABLES = {
+    "session": ("core_session_fts", ("title", "description", "skill_name")),
+    "skill": ("core_skill_fts", ("name", "description", "category")),
+}
+
+
+def session_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector("title", weight="A", config=SEARCH_CONFIG) + SearchVector(
+        "description", weight="B", config=SEARCH_CONFIG
+    )
+
+
+def skill_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("category", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def fill_fts_table(cursor, index, rows):
+    table, columns = FTS_TABLES[index]
+    placeholders = ", ".join(["%s"] * (len(columns) + 2))
+    cursor.executemany(
+        f"INSERT INTO {table} (rowid, id, {', '.join(columns)}) VALUES ({placeholders})",
+        # rowid derived from the UUID, as core.search.fts_rowid does
+        [(uuid.UUID(str(pk)).int >> 68, uuid.UUID(str(pk)).hex, *values) for pk, *values in rows],
+    )
+
+
+def create_search_indexes(apps, schema_editor):
+    Session = apps.get_model("core", "Session")
+    Skill = apps.get_model("core", "Skill")
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.indexes import GinIndex
+
+        schema_editor.add_index(Session, GinIndex(session_vector(), name="session_search_idx"))
+        schema_editor.add_index(Skill, GinIndex(skill_vector(), name="skill_search_idx"))
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            try:
+                for table, columns in FTS_TABLES.values():
+                    cursor.execute(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(id UNINDEXED, {', '.join(columns)})"
+                    )
+            except OperationalError:
+                # SQLite built without FTS5: search falls back to icontains
+                return
+            fill_fts_table(cursor, "session", Session.objects.values_list("pk", "title", "description", "skill__name"))
+            fill_fts_table(cursor, "skill", Skill.objects.values_list("pk", "name", "description", "category"))
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.indexes import GinIndex
+
+        Session = apps.get_model("core", "Session")
+        Skill = apps.get_model("core", "Skill")
+        schema_editor.remove_index(Session, GinIndex(session_vector(), name="session_search_idx"))
+        schema_editor.remove_index(Skill, GinIndex(skill_vector(), name="skill_search_idx"))
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            for table, _ in FTS_TABLES.values():
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_query_pattern_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
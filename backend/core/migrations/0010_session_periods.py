@@ -0,0 +1,47 @@
+import logging
+
+from django.db import IntegrityError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# Frozen copies of core.schedule.PERIOD_SQL and EXCLUSION_CONSTRAINT
+PERIOD = "tstzrange(core_session.start_time, greatest(core_session.start_time, core_session.end_time), '[)')"
+EXCLUSION_CONSTRAINT = "session_owner_no_overlap"
+
+
+def create_period_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        # Other databases use core.schedule.IntervalTree
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(f"CREATE INDEX session_period_idx ON core_session USING gist ({PERIOD})")
+    try:
+        with transaction.atomic():
+            schema_editor.execute(
+                f"ALTER TABLE core_session ADD CONSTRAINT {EXCLUSION_CONSTRAINT} "
+                f"EXCLUDE USING gist (created_by_id WITH =, {PERIOD} WITH &&)"
+            )
+    except IntegrityError:
+        # Existing overlaps: new writes are still checked by core.schedule
+        logger.warning(
+            "Skipped %s: some creators already own overlapping sessions. Run "
+            "`manage.py add_session_constraint` to list them, and again once resolved to add it.",
+            EXCLUSION_CONSTRAINT,
+        )
+
+
+def drop_period_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"ALTER TABLE core_session DROP CONSTRAINT IF EXISTS {EXCLUSION_CONSTRAINT}")
+    schema_editor.execute("DROP INDEX IF EXISTS session_period_idx")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0009_user_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_period_indexes, drop_period_indexes),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:07
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count(qs, group, aggregate=None):
+    values = qs.order_by().values(group).annotate(n=aggregate or Count("*")).values("n")[:1]
+    return Coalesce(Subquery(values, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    CustomUser = apps.get_model("core", "CustomUser")
+    Session = apps.get_model("core", "Session")
+    Feedback = apps.get_model("core", "Feedback")
+    Wishlist = apps.get_model("core", "Wishlist")
+    Participants = Session.participants.through
+    CustomUser.objects.update(
+        sessions_created_count=count(Session.objects.filter(created_by=OuterRef("pk")), "created_by"),
+        sessions_joined_count=count(Participants.objects.filter(customuser=OuterRef("pk")), "customuser"),
+        mentee_count=count(
+            Participants.objects.filter(session__created_by=OuterRef("pk")),
+            "session__created_by",
+            Count("customuser", distinct=True),
+        ),
+    )
+    ratings = Feedback.objects.filter(session=OuterRef("pk"))
+    Session.objects.update(
+        participant_count=count(Participants.objects.filter(session=OuterRef("pk")), "session"),
+        rating_count=count(ratings, "session"),
+        rating_sum=count(ratings, "session", Sum("rating")),
+        wishlist_count=count(Wishlist.objects.filter(session=OuterRef("pk")), "session"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_session_periods"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="mentee_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="sessions_created_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="sessions_joined_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="session",
+            name="participant_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="session",
+            name="rating_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="session",
+            name="rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="session",
+            name="wishlist_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def fill_mentorships(apps, schema_editor):
+    Session = apps.get_model("core", "Session")
+    Mentorship = apps.get_model("core", "Mentorship")
+    pairs = (
+        Session.participants.through.objects.order_by()
+        .values("session__created_by", "customuser")
+        .annotate(n=Count("*"), first=Min("session__start_time"), last=Max("session__start_time"))
+        .values_list("session__created_by", "customuser", "n", "first", "last")
+    )
+    Mentorship.objects.bulk_create(
+        (
+            Mentorship(mentor_id=mentor_id, mentee_id=mentee_id, session_count=n, first_session_at=first, last_session_at=last)
+            for mentor_id, mentee_id, n, first, last in pairs.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_denormalized_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Mentorship",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_session_at", models.DateTimeField()),
+                ("last_session_at", models.DateTimeField()),
+                ("session_count", models.IntegerField(default=0)),
+                (
+                    "mentee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mentor_links",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "mentor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mentee_links",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["mentor", "-last_session_at", "mentee"],
+                        name="mentorship_recent_idx",
+                    ),
+                    models.Index(
+                        fields=["mentor", "-session_count", "mentee"],
+                        name="mentorship_engaged_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("mentor", "mentee"), name="mentorship_pair_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_mentorships, migrations.RunPython.noop),
+    ]
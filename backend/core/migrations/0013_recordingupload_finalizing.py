@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_mentorships"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recordingupload",
+            name="finalizing",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_recordingupload_finalizing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="feedback",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="feedback",
+            index=models.Index(fields=["-created_at", "id"], name="feedback_created_idx"),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:40
+
+from django.db import migrations
+
+# core.gamification now reads these from CustomUser columns kept by core.counters
+COLUMNS = {"session_created": "sessions_created_count", "session_joined": "sessions_joined_count"}
+
+
+def drop_session_counters(apps, schema_editor):
+    apps.get_model("core", "UserCounter").objects.filter(name__in=COLUMNS).delete()
+
+
+def restore_session_counters(apps, schema_editor):
+    CustomUser = apps.get_model("core", "CustomUser")
+    UserCounter = apps.get_model("core", "UserCounter")
+    for name, column in COLUMNS.items():
+        UserCounter.objects.bulk_create(
+            (
+                UserCounter(user_id=user_id, name=name, value=value)
+                for user_id, value in CustomUser.objects.filter(**{f"{column}__gt": 0}).values_list("pk", column).iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0015_tableversion"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_session_counters, restore_session_counters),
+    ]
@@ -5,7 +5,26 @@ from django.conf import settings
 import uuid
 
 
-class CustomUser(AbstractUser):
+class CounterFieldsMixin:
+    """Leaves ``counter_fields`` out of full saves of existing rows.
+
+    core.counters (and core.gamification, for ``points``) moves them with ``F()`` updates,
+    so the values on an instance loaded earlier are stale and writing them back would
+    undo concurrent increments.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not (args or self._state.adding or kwargs.get("force_insert") or kwargs.get("update_fields") is not None):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class CustomUser(CounterFieldsMixin, AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     username = models.CharField(max_length=150, unique=True)
     email = models.EmailField(unique=True)
@@ -19,10 +38,23 @@ class CustomUser(AbstractUser):
     points = models.IntegerField(default=0)
     profile_picture = models.ImageField(upload_to="profiles/", blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
+    # Bumped by core.signals whenever skills_known/skills_to_learn change
+    skills_updated_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    # Maintained by core.counters; repair drift with `manage.py reconcile_counters`
+    sessions_created_count = models.IntegerField(default=0)
+    sessions_joined_count = models.IntegerField(default=0)
+    mentee_count = models.IntegerField(default=0)
+    counter_fields = ("points", "sessions_created_count", "sessions_joined_count", "mentee_count")
 
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email"]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # UserViewSet ?role= filter, paged by username
+            models.Index(fields=["role", "username"], name="user_role_username_idx"),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -55,7 +87,7 @@ CustomUser.add_to_class("skills_to_learn", models.ManyToManyField(Skill, related
 CustomUser.add_to_class("badges", models.ManyToManyField(Badge, related_name="users_with_badge", blank=True))
 
 
-class Session(models.Model):
+class Session(CounterFieldsMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -69,10 +101,97 @@ class Session(models.Model):
     recording_file = models.FileField(upload_to="recordings/", blank=True, null=True)
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="sessions_joined", blank=True)
 
+    PROCESSING_CHOICES = (
+        ("none", "None"),
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    )
+    # Set by core.media as the recording's jobs move through the queue
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_CHOICES, default="none")
+    # Storage names of the derived files: {"360p": ..., "720p": ..., "hls": ..., "poster": ...}
+    renditions = models.JSONField(default=dict, blank=True)
+    # Maintained by core.counters; repair drift with `manage.py reconcile_counters`
+    participant_count = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    wishlist_count = models.IntegerField(default=0)
+    counter_fields = ("participant_count", "rating_count", "rating_sum", "wishlist_count")
+
+    class Meta:
+        indexes = [
+            # Cursor pagination key, plus the ?created_by= / ?skill= / mine filters on it
+            models.Index(fields=["start_time", "id"], name="session_start_idx"),
+            models.Index(fields=["created_by", "start_time", "id"], name="session_owner_start_idx"),
+            models.Index(fields=["skill", "start_time", "id"], name="session_skill_start_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.skill.name})"
 
 
+class RecordingUpload(models.Model):
+    """A resumable upload of a session recording, assembled chunk by chunk (see core.uploads)."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="recording_uploads")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="recording_uploads")
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    # Bytes received so far; the next chunk must start here
+    offset = models.BigIntegerField(default=0)
+    # Claimed by one finalize call (core.uploads.finalize)
+    finalizing = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.offset}/{self.size})"
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by ``manage.py run_worker`` (see core.jobs)."""
+
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Claim query: oldest due job first
+            models.Index(fields=["status", "run_after"], name="job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
+
+
+class TableVersion(models.Model):
+    """Change stamp of a cached table or calendar, kept by core.httpcache."""
+
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name}@{self.version}"
+
+
 class Certificate(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="certificates")
@@ -82,6 +201,12 @@ class Certificate(models.Model):
     pdf_url = models.URLField(blank=True, null=True)
     qr_code_url = models.URLField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "skill"], name="certificate_user_skill_idx"),
+            models.Index(fields=["user", "-issue_date", "id"], name="certificate_user_issued_idx"),
+        ]
+
     def __str__(self):
         return f"Certificate {self.certificate_id}"
 
@@ -92,17 +217,70 @@ class Feedback(models.Model):
     given_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="feedback_given")
     rating = models.IntegerField()
     comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["session", "rating"], name="feedback_session_rating_idx"),
+            models.Index(fields=["-created_at", "id"], name="feedback_created_idx"),
+        ]
 
     def __str__(self):
         return f"Feedback {self.rating} for {self.session.title}"
 
 
+class UserCounter(models.Model):
+    """Running count of one gamification event for a user, kept by core.gamification."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="counters")
+    name = models.CharField(max_length=50)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "name"], name="usercounter_user_name_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.name}={self.value}"
+
+
+class Mentorship(models.Model):
+    """A mentor and someone who joined at least one of their sessions, kept by core.mentorship."""
+
+    mentor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="mentee_links")
+    mentee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="mentor_links")
+    # Start times of the earliest and latest of the mentor's sessions the mentee joined
+    first_session_at = models.DateTimeField()
+    last_session_at = models.DateTimeField()
+    session_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["mentor", "mentee"], name="mentorship_pair_uniq"),
+        ]
+        indexes = [
+            # MenteeViewSet.mine ?ordering=recent / engaged
+            models.Index(fields=["mentor", "-last_session_at", "mentee"], name="mentorship_recent_idx"),
+            models.Index(fields=["mentor", "-session_count", "mentee"], name="mentorship_engaged_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.mentor} -> {self.mentee} ({self.session_count})"
+
+
 class Recommendation(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="recommendations")
     suggested_skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name="recommendations")
     confidence_score = models.FloatField(default=0.0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-confidence_score"], name="rec_user_score_idx"),
+            models.Index(fields=["-confidence_score", "id"], name="rec_score_idx"),
+        ]
+
     def __str__(self):
         return f"Rec {self.user} -> {self.suggested_skill} ({self.confidence_score})"
 
@@ -115,6 +293,9 @@ class Wishlist(models.Model):
 
     class Meta:
         unique_together = ("user", "session")
+        indexes = [
+            models.Index(fields=["user", "-created_at", "id"], name="wishlist_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.session.title}"
@@ -0,0 +1,29 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over each view's ``cursor_ordering``.
+
+    The cursor holds only the first ordering field: pages are fetched with
+    ``WHERE first_key > last_seen`` rather than ``OFFSET``, and rows sharing the last
+    value are skipped with an offset, so no ``COUNT(*)`` is issued and deep pages cost
+    the same as the first as long as first-field ties are few. Views order by an
+    indexed, meaningful key and end with a unique column to settle ties, e.g.
+    ``("start_time", "id")`` or ``("-confidence_score", "id")``.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("id",)
+
+    def get_ordering(self, request, queryset, view):
+        # Filters may impose their own order, e.g. relevance for ?search=
+        for backend in getattr(view, "filter_backends", ()):
+            if hasattr(backend, "get_ordering"):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return tuple(ordering)
+        ordering = getattr(view, "cursor_ordering", None)
+        if ordering:
+            return tuple(ordering)
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,152 @@
+"""Playback of session recordings with HTTP range and conditional request support.
+
+``recording_response`` answers ``GET /api/sessions/<id>/recording/``:
+
+- ``ETag``/``Last-Modified`` come from the file's size and mtime, so revalidation is a
+  ``stat()`` and a ``304`` without opening the file.
+- A single ``Range: bytes=...`` (honouring ``If-Range``) gets a ``206`` with just that
+  slice; unsatisfiable ranges get a ``416``. Multi-range requests get the whole file.
+- The body is a ``FileResponse`` over the open file, so servers with a
+  ``wsgi.file_wrapper`` (gunicorn, uWSGI) can hand it to ``sendfile``.
+- With ``RECORDING_ACCEL_REDIRECT`` set, only headers are produced and nginx serves
+  the bytes (and ranges) from an ``internal`` location, so no worker holds the transfer.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.negotiation import BaseContentNegotiation
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class IgnoreAcceptNegotiation(BaseContentNegotiation):
+    """Media elements send ``Accept: video/*``; the file response ignores DRF renderers,
+    but errors still render as JSON."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class _FileRange:
+    """Read-only view of ``length`` bytes of ``fh`` from ``start``.
+
+    The underlying file is left positioned at ``start`` and ``fileno()`` is exposed, so
+    a sendfile-capable file wrapper sends ``Content-Length`` bytes from there.
+    """
+
+    def __init__(self, fh, start, length):
+        fh.seek(start)
+        self._fh = fh
+        self._left = length
+
+    def read(self, size=-1):
+        if self._left <= 0:
+            return b""
+        if size is None or size < 0 or size > self._left:
+            size = self._left
+        data = self._fh.read(size)
+        self._left -= len(data)
+        return data
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def close(self):
+        self._fh.close()
+
+
+def parse_range(header, size):
+    """``(start, end)`` inclusive for a single satisfiable range, ``None`` to send the whole
+    file, or ``False`` when the range cannot be satisfied."""
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match:
+        # Malformed or multiple ranges: ignoring the header is allowed
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return False
+    return start, end
+
+
+def recording_response(request, session):
+    field = session.recording_file
+    if not field:
+        raise Http404("Session has no recording.")
+    try:
+        path = field.storage.path(field.name)
+    except NotImplementedError:
+        # Remote storage serves its own URLs (with their own range support)
+        return HttpResponse(status=302, headers={"Location": field.url})
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("Recording file is missing.")
+
+    size = st.st_size
+    etag = f'"{size:x}-{st.st_mtime_ns:x}"'
+    last_modified = int(st.st_mtime)
+    content_type = mimetypes.guess_type(field.name)[0] or "application/octet-stream"
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "private, max-age=0, must-revalidate",
+    }
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified.headers.setdefault(name, value)
+        return not_modified
+
+    prefix = getattr(settings, "RECORDING_ACCEL_REDIRECT", "")
+    if prefix:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(field.name)
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(range_header, size)
+    if byte_range is False:
+        return HttpResponse(status=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    fh = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type, headers=headers)
+        response["Content-Length"] = str(size)
+        return response
+    start, end = byte_range
+    response = FileResponse(_FileRange(fh, start, end - start + 1), status=206, content_type=content_type, headers=headers)
+    response["Content-Length"] = str(end - start + 1)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def _if_range_matches(request, etag, last_modified):
+    validator = request.headers.get("If-Range")
+    if not validator:
+        return True
+    if validator.startswith(('"', "W/")):
+        return validator == etag
+    return parse_http_date_safe(validator) == last_modified
@@ -0,0 +1,33 @@
+from collections import defaultdict
+
+from .models import CustomUser
+
+SkillsKnown = CustomUser.skills_known.through
+SkillsToLearn = CustomUser.skills_to_learn.through
+
+
+def skills_by_user(through, user_ids):
+    """Map each of ``user_ids`` to the set of skill ids it has in ``through``."""
+    result = defaultdict(set)
+    rows = through.objects.filter(customuser_id__in=user_ids).values_list("customuser_id", "skill_id")
+    for user_id, skill_id in rows:
+        result[user_id].add(skill_id)
+    return result
+
+
+def score_user(known, to_learn, graph, limit=5):
+    """Top ``limit`` (skill_id, confidence) suggestions for one user.
+
+    Each known skill votes for its co-occurring skills in ``graph`` (a
+    ``core.skillgraph.SkillGraph``) and every skill the user wants to learn gets a
+    full vote; skills already known are never suggested. Confidence is the vote
+    total over the maximum possible, so it lies in [0, 1].
+    """
+    scores = defaultdict(float, graph.cooccurring(known))
+    for skill_id in to_learn:
+        scores[skill_id] += 1.0
+    for skill_id in known:
+        scores.pop(skill_id, None)
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))[:limit]
+    total = len(known) + 1
+    return [(skill_id, min(1.0, score / total)) for skill_id, score in ranked]
@@ -0,0 +1,206 @@
+"""Scheduling conflicts between sessions.
+
+A user's calendar is the sessions they created plus those they joined; two sessions
+conflict when their ``[start_time, end_time)`` periods overlap. ``SessionSerializer``
+and ``SessionViewSet.join`` reject conflicting writes with ``SessionConflict`` (409),
+and ``free_slots`` lists the gaps of a calendar.
+
+Overlap lookups go through an interval index instead of scanning a calendar:
+
+- PostgreSQL: GiST indexes on ``tstzrange(start_time, end_time)`` (migration 0010),
+  plus an exclusion constraint so one creator cannot own overlapping sessions.
+- Other databases: an ``IntervalTree`` per user, built from one query and cached in
+  the process until ``core.signals`` bumps the user's calendar version (a
+  ``TableVersion`` row, see ``core.httpcache``).
+
+Either way the lookup may miss a write that has not committed yet, so writes also
+call ``recheck`` inside their transaction: it locks the affected users' rows and reads
+their calendars from the database.
+"""
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import BooleanField, F, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import httpcache
+from .models import CustomUser, Session
+
+Participants = Session.participants.through
+# Must match the indexed expression; a session ending before it starts has an empty period
+PERIOD_SQL = "tstzrange({table}.start_time, greatest({table}.start_time, {table}.end_time), '[)')"
+EXCLUSION_CONSTRAINT = "session_owner_no_overlap"
+# Calendars kept as interval trees on databases without range types
+MAX_TREES = 1024
+
+
+class SessionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The session overlaps another session on the calendar."
+    default_code = "session_conflict"
+
+    def __init__(self, user, session_ids, detail=None):
+        super().__init__(detail)
+        self.detail = {
+            "detail": self.detail,
+            "user": str(user.pk),
+            "conflicts": [str(pk) for pk in session_ids],
+        }
+
+
+def uses_ranges():
+    return connection.vendor == "postgresql"
+
+
+class IntervalTree:
+    """Static index of half-open ``(start, end, key)`` intervals.
+
+    Intervals are sorted by start, with a segment tree of the greatest end over each
+    range of them; a query visits only subtrees that can still hold an overlap, so it
+    costs ``O(log n)`` plus the matches.
+    """
+
+    def __init__(self, intervals):
+        self.items = sorted((i for i in intervals if i[1] > i[0]), key=lambda i: i[:2])
+        self.starts = [start for start, _, _ in self.items]
+        self.size = 1
+        while self.size < len(self.items):
+            self.size *= 2
+        self.max_end = [None] * (2 * self.size)
+        for i, (_, end, _) in enumerate(self.items):
+            self.max_end[self.size + i] = end
+        for node in range(self.size - 1, 0, -1):
+            ends = [e for e in (self.max_end[2 * node], self.max_end[2 * node + 1]) if e is not None]
+            self.max_end[node] = max(ends) if ends else None
+
+    def __len__(self):
+        return len(self.items)
+
+    def overlapping(self, start, end):
+        """Intervals meeting ``[start, end)``, ordered by start."""
+        limit = bisect_left(self.starts, end)
+        found = []
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            longest = self.max_end[node]
+            if lo >= limit or longest is None or longest <= start:
+                continue
+            if hi - lo == 1:
+                found.append(self.items[lo])
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return found
+
+
+_trees = OrderedDict()
+_trees_lock = threading.Lock()
+
+
+def calendar(user_id):
+    return Session.objects.filter(
+        Q(created_by_id=user_id) | Q(pk__in=Participants.objects.filter(customuser_id=user_id).values("session_id"))
+    )
+
+
+def calendar_changed(*user_ids):
+    if uses_ranges():
+        return
+    for user_id in {user_id for user_id in user_ids if user_id is not None}:
+        httpcache.bump(f"calendar:{user_id}")
+
+
+def _scan(user_id, start, end, exclude=None):
+    rows = calendar(user_id).filter(
+        Q(start_time__lt=end, end_time__gt=start) & Q(end_time__gt=F("start_time"))
+    )
+    return list(rows.exclude(pk=exclude).order_by("start_time").values_list("start_time", "end_time", "pk"))
+
+
+def _tree(user_id):
+    version = httpcache.version(f"calendar:{user_id}")
+    with _trees_lock:
+        cached = _trees.get(user_id)
+        if cached is not None and cached[0] == version:
+            _trees.move_to_end(user_id)
+            return cached[1]
+    tree = IntervalTree(calendar(user_id).values_list("start_time", "end_time", "pk"))
+    with _trees_lock:
+        _trees[user_id] = (version, tree)
+        _trees.move_to_end(user_id)
+        while len(_trees) > MAX_TREES:
+            _trees.popitem(last=False)
+    return tree
+
+
+def busy(user_id, start, end, exclude=None):
+    """``[(start_time, end_time, session_id)]`` on ``user_id``'s calendar meeting ``[start, end)``."""
+    if uses_ranges():
+        table = connection.ops.quote_name(Session._meta.db_table)
+        overlaps = RawSQL(
+            f"{PERIOD_SQL.format(table=table)} && tstzrange(%s, %s, '[)')", (start, end), output_field=BooleanField()
+        )
+        rows = calendar(user_id).filter(overlaps).exclude(pk=exclude).order_by("start_time")
+        return list(rows.values_list("start_time", "end_time", "pk"))
+    return [row for row in _tree(user_id).overlapping(start, end) if row[2] != exclude]
+
+
+def check(users, start, end, exclude=None):
+    """Raise ``SessionConflict`` if ``[start, end)`` overlaps any of ``users``' sessions."""
+    if end <= start:
+        return
+    for user in users:
+        clashes = busy(user.pk, start, end, exclude=exclude)
+        if clashes:
+            raise SessionConflict(user, [pk for _, _, pk in clashes])
+
+
+def recheck(users, session):
+    """``check`` ``users`` against the saved ``session`` again, from the database.
+
+    Call inside the write's transaction. ``check`` may have missed a concurrent write,
+    e.g. the same participant joining an overlapping session. Locking the users' rows
+    makes a second such write wait until the first commits and then see it; SQLite
+    lets one transaction write at a time, which has the same effect.
+    """
+    if session.end_time <= session.start_time or not users:
+        return
+    # Locked in one statement, in pk order, so two writers cannot deadlock here
+    list(CustomUser.objects.select_for_update().filter(pk__in=[u.pk for u in users]).order_by("pk").values_list("pk"))
+    for user in users:
+        clashes = _scan(user.pk, session.start_time, session.end_time, exclude=session.pk)
+        if clashes:
+            raise SessionConflict(user, [pk for _, _, pk in clashes])
+
+
+@contextmanager
+def owner_constraint(owner):
+    """Report a violation of the creator exclusion constraint (a concurrent write got
+    there first) as ``SessionConflict``."""
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if EXCLUSION_CONSTRAINT not in str(exc):
+            raise
+        raise SessionConflict(owner, []) from None
+
+
+def free_slots(user_id, start, end, min_length):
+    """Gaps of at least ``min_length`` in ``user_id``'s calendar within ``[start, end)``."""
+    slots = []
+    cursor = start
+    for busy_start, busy_end, _ in busy(user_id, start, end):
+        if busy_start - cursor >= min_length:
+            slots.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if end - cursor >= min_length:
+        slots.append((cursor, end))
+    return slots
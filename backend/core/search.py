@@ -0,0 +1,235 @@
+"""Full-text search for the catalog viewsets.
+
+``FullTextSearchFilter`` keeps DRF's ``?search=`` parameter and delegates to a backend
+picked from the database vendor (or ``settings.SEARCH_BACKEND``):
+
+- PostgreSQL: weighted ``SearchVector`` expressions backed by GIN expression indexes,
+  ranked with ``SearchRank``.
+- SQLite: FTS5 tables (``core_session_fts``, ``core_skill_fts``) kept in sync by
+  ``core.signals``, ranked with ``bm25``. Every match is returned; past the best
+  ``max_results`` they share the lowest rank and follow in id order.
+- Anything else, or SQLite built without FTS5: DRF's ``icontains`` scan, unranked.
+
+Ranked backends annotate ``search_rank`` (higher is better); the keyset paginator then
+orders by it instead of the view's ``cursor_ordering``.
+"""
+import re
+import uuid
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+SEARCH_CONFIG = "english"
+
+# FTS5 table and indexed columns per search index; "id" holds the row's hex UUID,
+# the FTS rowid is derived from it (see fts_rowid)
+FTS_TABLES = {
+    "session": ("core_session_fts", ("title", "description", "skill_name")),
+    "skill": ("core_skill_fts", ("name", "description", "category")),
+}
+# bm25 column weights, in FTS_TABLES column order
+FTS_WEIGHTS = {
+    "session": (10.0, 2.0, 5.0),
+    "skill": (10.0, 2.0, 5.0),
+}
+
+
+def session_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector("title", weight="A", config=SEARCH_CONFIG) + SearchVector(
+        "description", weight="B", config=SEARCH_CONFIG
+    )
+
+
+def skill_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("category", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+class IContainsSearchBackend:
+    """DRF's ``SearchFilter`` behaviour: OR-ed ``icontains`` over ``search_fields``."""
+
+    def search(self, request, queryset, view, index):
+        return filters.SearchFilter().filter_queryset(request, queryset, view)
+
+
+class PostgresSearchBackend:
+    def search(self, request, queryset, view, index):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        text = request.query_params.get(filters.SearchFilter.search_param, "")
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        if index == "skill":
+            return (
+                queryset.annotate(search_document=skill_vector())
+                .filter(search_document=query)
+                .annotate(search_rank=SearchRank(F("search_document"), query))
+            )
+
+        from .models import Skill
+
+        # A session also matches through its skill, using the skill GIN index
+        matching_skills = Skill.objects.annotate(search_document=skill_vector()).filter(search_document=query)
+        skill_rank = matching_skills.filter(pk=OuterRef("skill_id")).annotate(
+            rank=SearchRank(F("search_document"), query)
+        ).values("rank")[:1]
+        return (
+            queryset.annotate(search_document=session_vector())
+            .filter(Q(search_document=query) | Q(skill__in=matching_skills.values("pk")))
+            .annotate(
+                search_rank=SearchRank(F("search_document"), query)
+                + Coalesce(Subquery(skill_rank, output_field=FloatField()), 0.0)
+            )
+        )
+
+
+class SQLiteFTSSearchBackend:
+    # Relevance ordering is materialised for this many matches; the rest rank 0
+    max_results = 500
+
+    def search(self, request, queryset, view, index):
+        if not fts_available():
+            return IContainsSearchBackend().search(request, queryset, view, index)
+        text = request.query_params.get(filters.SearchFilter.search_param, "")
+        match = fts5_query(text)
+        if not match:
+            return queryset
+        table, _ = FTS_TABLES[index]
+        weights = ", ".join(str(w) for w in (0.0,) + FTS_WEIGHTS[index])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, -bm25({table}, {weights}) AS score FROM {table} "
+                f"WHERE {table} MATCH %s ORDER BY score DESC LIMIT %s",
+                [match, self.max_results],
+            )
+            hits = [(uuid.UUID(pk), score) for pk, score in cursor.fetchall()]
+        if not hits:
+            return queryset.none()
+        if len(hits) < self.max_results:
+            matches = [pk for pk, _ in hits]
+        else:
+            matches = RawSQL(f"SELECT id FROM {table} WHERE {table} MATCH %s", [match])
+        # -bm25 is positive for every match, so unranked matches sort after ranked ones
+        return queryset.filter(pk__in=matches).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(score)) for pk, score in hits],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+
+BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteFTSSearchBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, "SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    return BACKENDS.get(connection.vendor, IContainsSearchBackend)()
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """``?search=`` over the view's ``search_index`` with relevance ordering."""
+
+    def filter_queryset(self, request, queryset, view):
+        if not self.get_search_terms(request):
+            return queryset
+        index = getattr(view, "search_index", None)
+        backend = get_backend() if index else IContainsSearchBackend()
+        return backend.search(request, queryset, view, index)
+
+    def get_ordering(self, request, queryset, view):
+        # Consulted by KeysetPagination; only ranked results override cursor_ordering
+        if "search_rank" in queryset.query.annotations:
+            return ("-search_rank", "id")
+        return None
+
+
+# ---- SQLite FTS5 maintenance ----
+
+def fts5_query(text):
+    """Turn free text into an FTS5 query: every word, as a quoted prefix, must match."""
+    words = re.findall(r"\w+", text)
+    return " ".join('"{}"*'.format(w.replace('"', '""')) for w in words)
+
+
+def fts_available(using=None):
+    conn = connection if using is None else using
+    if conn.vendor != "sqlite":
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLES["session"][0]])
+        return cursor.fetchone() is not None
+
+
+def create_fts_tables(conn):
+    with conn.cursor() as cursor:
+        for table, columns in FTS_TABLES.values():
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(id UNINDEXED, {', '.join(columns)})")
+
+
+def drop_fts_tables(conn):
+    with conn.cursor() as cursor:
+        for table, _ in FTS_TABLES.values():
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def fts_rowid(pk):
+    # FTS5 rows are keyed by integer rowid; derive a stable one from the UUID
+    return uuid.UUID(str(pk)).int >> 68
+
+
+def _replace_rows(index, rows, conn=None):
+    """Upsert ``(id, *columns)`` rows into an FTS table."""
+    conn = conn or connection
+    table, columns = FTS_TABLES[index]
+    rows = [(fts_rowid(pk), uuid.UUID(str(pk)).hex, *values) for pk, *values in rows]
+    if not rows:
+        return
+    placeholders = ", ".join(["%s"] * (len(columns) + 2))
+    with conn.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {table} (rowid, id, {', '.join(columns)}) VALUES ({placeholders})", rows
+        )
+
+
+def index_sessions(sessions, conn=None):
+    _replace_rows("session", sessions.values_list("pk", "title", "description", "skill__name"), conn)
+
+
+def index_skills(skills, conn=None):
+    _replace_rows("skill", skills.values_list("pk", "name", "description", "category"), conn)
+
+
+def unindex(index, pks):
+    table, _ = FTS_TABLES[index]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(fts_rowid(pk),) for pk in pks])
+
+
+def rebuild(conn=None, sessions=None, skills=None):
+    """Repopulate both FTS tables from the given (or all) rows."""
+    from .models import Session, Skill
+
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        for table, _ in FTS_TABLES.values():
+            cursor.execute(f"DELETE FROM {table}")
+    index_sessions(sessions if sessions is not None else Session.objects.all(), conn)
+    index_skills(skills if skills is not None else Skill.objects.all(), conn)
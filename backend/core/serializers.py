@@ -1,5 +1,8 @@
+from django.db.models import Prefetch
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from . import counters, schedule
 from .models import Skill, Badge, Session, Certificate, Feedback, Recommendation, CustomUser, Wishlist
 
 
@@ -35,16 +38,100 @@ class UserSerializer(serializers.ModelSerializer):
             "skills_known",
             "skills_to_learn",
             "badges",
+            "sessions_created_count",
+            "sessions_joined_count",
+            "mentee_count",
         ]
-        read_only_fields = ["id", "points"]
+        read_only_fields = ["id", "points", "sessions_created_count", "sessions_joined_count", "mentee_count"]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Prefetch the nested relations so a page of users costs a fixed number of queries."""
+        # Load only the columns the nested serializers render
+        skill_fields = list(SkillSerializer().fields)
+        badge_fields = list(BadgeSerializer().fields)
+        return queryset.prefetch_related(
+            Prefetch("skills_known", queryset=Skill.objects.only(*skill_fields)),
+            Prefetch("skills_to_learn", queryset=Skill.objects.only(*skill_fields)),
+            Prefetch("badges", queryset=Badge.objects.only(*badge_fields)),
+        )
+
+
+class MenteeSerializer(UserSerializer):
+    """A mentee with their Mentorship edge to the requesting mentor, annotated by the view."""
+
+    first_session_at = serializers.DateTimeField(read_only=True)
+    last_session_at = serializers.DateTimeField(read_only=True)
+    session_count = serializers.IntegerField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ["first_session_at", "last_session_at", "session_count"]
 
 
 class SessionSerializer(serializers.ModelSerializer):
     created_by_username = serializers.CharField(source="created_by.username", read_only=True)
+    # Range-capable player URL for recording_file (see core.playback)
+    playback_url = serializers.SerializerMethodField()
+    # Filled in by the background processing jobs (core.media)
+    renditions = serializers.SerializerMethodField()
+    # From the rating_count/rating_sum columns kept by core.counters
+    average_rating = serializers.SerializerMethodField()
 
     class Meta:
         model = Session
         fields = "__all__"
+        read_only_fields = ["processing_status", *counters.SESSION_FIELDS]
+
+    def validate(self, attrs):
+        instance = self.instance
+        start = attrs.get("start_time", getattr(instance, "start_time", None))
+        end = attrs.get("end_time", getattr(instance, "end_time", None))
+        owner = attrs.get("created_by", getattr(instance, "created_by", None))
+        if instance is None:
+            users = [owner, *attrs.get("participants", [])]
+        elif start != instance.start_time or end != instance.end_time:
+            users = [owner, *attrs.get("participants", instance.participants.all())]
+        else:
+            # Same period: only people new to the session need checking
+            current = {p.pk for p in instance.participants.all()}
+            users = [p for p in attrs.get("participants", []) if p.pk not in current]
+            if owner.pk != instance.created_by_id:
+                users.append(owner)
+        # Checked again by create/update once the session is written
+        self._calendar_users = list({user.pk: user for user in users if user is not None}.values())
+        schedule.check(self._calendar_users, start, end, exclude=getattr(instance, "pk", None))
+        return attrs
+
+    def create(self, validated_data):
+        with schedule.owner_constraint(validated_data["created_by"]):
+            session = super().create(validated_data)
+            schedule.recheck(self._calendar_users, session)
+            return session
+
+    def update(self, instance, validated_data):
+        with schedule.owner_constraint(validated_data.get("created_by", instance.created_by)):
+            session = super().update(instance, validated_data)
+            schedule.recheck(self._calendar_users, session)
+            return session
+
+    def get_average_rating(self, obj):
+        return round(obj.rating_sum / obj.rating_count, 2) if obj.rating_count else None
+
+    def get_renditions(self, obj):
+        storage = obj.recording_file.storage
+        request = self.context.get("request")
+        urls = {}
+        for key, name in (obj.renditions or {}).items():
+            url = storage.url(name)
+            urls[key] = request.build_absolute_uri(url) if request else url
+        return urls
+
+    def get_playback_url(self, obj):
+        if not obj.recording_file:
+            return None
+        url = reverse("session-recording", args=[obj.pk])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
 
 
 class CertificateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,377 @@
+from collections import Counter, defaultdict
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import (
+    counters, dashboard, gamification, httpcache, leaderboard, matching, mentor_index, mentorship, schedule, search,
+)
+from .models import Badge, Certificate, CustomUser, Feedback, Mentorship, Session, Skill, Wishlist
+
+Participants = Session.participants.through
+
+
+@receiver(m2m_changed, sender=CustomUser.skills_known.through)
+@receiver(m2m_changed, sender=CustomUser.skills_to_learn.through)
+def touch_skills_updated_at(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == "pre_clear":
+        # Reverse clear from a Skill: the affected users are gone by post_clear
+        related = "users_who_know" if sender is CustomUser.skills_known.through else "users_who_want"
+        instance._cleared_user_ids = list(getattr(instance, related).values_list("pk", flat=True))
+        return
+    elif action == "post_clear":
+        user_ids = getattr(instance, "_cleared_user_ids", [])
+    else:
+        user_ids = list(pk_set or [])
+    if action in {"post_add", "post_remove", "post_clear"} and user_ids:
+        CustomUser.objects.filter(pk__in=user_ids).update(skills_updated_at=timezone.now())
+        dashboard.invalidate(*user_ids)
+        matching.users_changed(*user_ids)
+        if sender is CustomUser.skills_known.through:
+            leaderboard.users_changed(*user_ids)
+            mentor_index.users_changed(*user_ids)
+
+
+# ---- dashboard cache invalidation ----
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_dashboard(sender, instance, **kwargs):
+    dashboard.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(pre_delete, sender=Skill)
+def invalidate_skill_holders(sender, instance, **kwargs):
+    user_ids = set(instance.users_who_know.values_list("pk", flat=True))
+    user_ids.update(instance.users_who_want.values_list("pk", flat=True))
+    dashboard.invalidate(*user_ids)
+
+
+@receiver(post_save, sender=Badge)
+@receiver(pre_delete, sender=Badge)
+def invalidate_badge_holders(sender, instance, **kwargs):
+    dashboard.invalidate(*instance.users_with_badge.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=CustomUser.badges.through)
+def invalidate_on_badges_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in {"post_add", "post_remove", "post_clear"}:
+            dashboard.invalidate(instance.pk)
+    elif action == "pre_clear":
+        dashboard.invalidate(*instance.users_with_badge.values_list("pk", flat=True))
+    elif action in {"post_add", "post_remove"}:
+        dashboard.invalidate(*pk_set)
+
+
+@receiver(post_save, sender=Session)
+def invalidate_session_owner(sender, instance, created, **kwargs):
+    dashboard.invalidate(instance.created_by_id)
+
+
+@receiver(pre_delete, sender=Session)
+def invalidate_session_members(sender, instance, **kwargs):
+    # Participants are still readable before the cascade removes them
+    dashboard.invalidate(instance.created_by_id, *instance.participants.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=Session.participants.through)
+def invalidate_on_participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in {"pre_clear", "post_add", "post_remove"}:
+        return
+    if reverse:
+        # instance is a user joining/leaving sessions
+        sessions = Session.objects.filter(pk__in=pk_set) if pk_set else instance.sessions_joined.all()
+        owners = sessions.values_list("created_by_id", flat=True)
+        dashboard.invalidate(instance.pk, *owners)
+    else:
+        members = pk_set if pk_set else instance.participants.values_list("pk", flat=True)
+        dashboard.invalidate(instance.created_by_id, *members)
+
+
+# ---- gamification events (session events are recorded with their counters below) ----
+
+@receiver(post_save, sender=Feedback)
+def feedback_given(sender, instance, created, **kwargs):
+    if created:
+        gamification.record("feedback_given", [instance.given_by_id])
+
+
+@receiver(post_delete, sender=Feedback)
+def feedback_deleted(sender, instance, **kwargs):
+    gamification.record("feedback_given", [instance.given_by_id], delta=-1)
+
+
+@receiver(post_save, sender=Certificate)
+def certificate_issued(sender, instance, created, **kwargs):
+    if created:
+        gamification.record("certificate_issued", [instance.user_id])
+
+
+@receiver(post_delete, sender=Certificate)
+def certificate_revoked(sender, instance, **kwargs):
+    gamification.record("certificate_issued", [instance.user_id], delta=-1)
+
+
+# ---- denormalised counters and mentor edges (core.counters, core.mentorship) ----
+
+def _previous(instance, update_fields, *fields):
+    """The stored values of ``fields`` before this save, or ``None`` for inserts and
+    saves that leave them alone."""
+    if instance._state.adding:
+        return None
+    if update_fields is not None and not {*fields, *(f"{field}_id" for field in fields)} & set(update_fields):
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _sessions_created(owner_ids, sign):
+    counters.sessions_created(owner_ids, sign)
+    gamification.record("session_created", owner_ids, delta=sign)
+
+
+def _participations_changed(rows, sign):
+    """``rows`` of ``(session_id, user_id)``: move the counters, then the points and badges."""
+    rows = list(rows)
+    counters.participations_changed(rows, sign)
+    by_count = defaultdict(list)
+    for user_id, n in Counter(user_id for _, user_id in rows).items():
+        by_count[n].append(user_id)
+    for n, user_ids in by_count.items():
+        gamification.record("session_joined", user_ids, delta=sign * n)
+
+
+@receiver(pre_save, sender=Session)
+def remember_session_owner(sender, instance, update_fields=None, **kwargs):
+    instance._counted_owner = _previous(instance, update_fields, "created_by", "start_time")
+
+
+@receiver(post_save, sender=Session)
+def count_session_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        _sessions_created([instance.created_by_id], 1)
+        return
+    previous = getattr(instance, "_counted_owner", None)
+    if not previous or previous == (instance.created_by_id, instance.start_time):
+        return
+    owners = {previous[0], instance.created_by_id}
+    if previous[0] != instance.created_by_id:
+        _sessions_created([previous[0]], -1)
+        _sessions_created([instance.created_by_id], 1)
+        dashboard.invalidate(previous[0])
+    mentee_ids = list(instance.participants.values_list("pk", flat=True))
+    mentorship.refresh((owner_id, mentee_id) for owner_id in owners for mentee_id in mentee_ids)
+
+
+@receiver(pre_delete, sender=Session)
+def count_session_participants_released(sender, instance, **kwargs):
+    # The cascade removes participant rows without m2m_changed
+    rows = list(Participants.objects.filter(session=instance).values_list("session_id", "customuser_id"))
+    _participations_changed(rows, -1)
+    instance._released_mentees = [user_id for _, user_id in rows]
+
+
+@receiver(post_delete, sender=Session)
+def count_session_deleted(sender, instance, **kwargs):
+    _sessions_created([instance.created_by_id], -1)
+    mentee_ids = instance.__dict__.pop("_released_mentees", [])
+    mentorship.refresh((instance.created_by_id, mentee_id) for mentee_id in mentee_ids)
+
+
+@receiver(m2m_changed, sender=Session.participants.through)
+def count_participants(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in {"pre_remove", "pre_clear"}:
+        # pk_set may name rows that do not exist; count only those about to go
+        rows = Participants.objects.filter(**{"customuser" if reverse else "session": instance})
+        if action == "pre_remove":
+            rows = rows.filter(**{"session__in" if reverse else "customuser__in": pk_set})
+        instance._released_participations = list(
+            rows.values_list("session_id", "customuser_id", "session__created_by_id")
+        )
+        return
+    if action in {"post_remove", "post_clear"}:
+        rows = instance.__dict__.pop("_released_participations", [])
+        sign = -1
+    elif action == "post_add" and pk_set:
+        if reverse:
+            owners = dict(Session.objects.filter(pk__in=pk_set).values_list("pk", "created_by_id"))
+            rows = [(session_id, instance.pk, owners[session_id]) for session_id in pk_set]
+        else:
+            rows = [(instance.pk, user_id, instance.created_by_id) for user_id in pk_set]
+        sign = 1
+    else:
+        return
+    _participations_changed([(session_id, user_id) for session_id, user_id, _ in rows], sign)
+    mentorship.refresh((owner_id, user_id) for _, user_id, owner_id in rows)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def count_user_participations_released(sender, instance, **kwargs):
+    # The cascade removes the user's participant rows and mentor edges without signals
+    rows = Participants.objects.filter(customuser=instance).values_list("session_id", "customuser_id")
+    counters.participations_changed(rows, -1)
+    mentor_ids = list(Mentorship.objects.filter(mentee=instance).exclude(mentor=instance).values_list("mentor_id", flat=True))
+    counters.add(CustomUser, {mentor_id: {"mentee_count": -1} for mentor_id in mentor_ids})
+    dashboard.invalidate(*mentor_ids)
+
+
+@receiver(pre_save, sender=Feedback)
+def remember_feedback_rating(sender, instance, update_fields=None, **kwargs):
+    instance._counted_rating = _previous(instance, update_fields, "session", "rating")
+
+
+@receiver(post_save, sender=Feedback)
+def count_feedback_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_counted_rating", None)
+    if created or (previous and previous != (instance.session_id, instance.rating)):
+        if previous:
+            counters.rating_changed(*previous, -1)
+        counters.rating_changed(instance.session_id, instance.rating, 1)
+
+
+@receiver(post_delete, sender=Feedback)
+def count_feedback_deleted(sender, instance, **kwargs):
+    counters.rating_changed(instance.session_id, instance.rating, -1)
+
+
+@receiver(pre_save, sender=Wishlist)
+def remember_wishlist_session(sender, instance, update_fields=None, **kwargs):
+    instance._counted_session = _previous(instance, update_fields, "session")
+
+
+@receiver(post_save, sender=Wishlist)
+def count_wishlisted(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_counted_session", None)
+    if created or (previous and previous[0] != instance.session_id):
+        if previous:
+            counters.wishlist_changed(previous[0], -1)
+        counters.wishlist_changed(instance.session_id, 1)
+
+
+@receiver(post_delete, sender=Wishlist)
+def count_unwishlisted(sender, instance, **kwargs):
+    counters.wishlist_changed(instance.session_id, -1)
+
+
+# ---- leaderboards ----
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def update_leaderboards(sender, instance, **kwargs):
+    leaderboard.users_changed(instance.pk)
+
+
+@receiver(pre_delete, sender=Skill)
+def update_skill_leaderboard(sender, instance, **kwargs):
+    # Deleting the skill cascades through skills_known without m2m_changed
+    leaderboard.users_changed(*instance.users_who_know.values_list("pk", flat=True))
+
+
+# ---- mentor matching (core.matching) ----
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def update_matcher(sender, instance, **kwargs):
+    matching.users_changed(instance.pk)
+
+
+@receiver(pre_delete, sender=Skill)
+def update_skill_matches(sender, instance, **kwargs):
+    # Deleting the skill cascades through both skill relations without m2m_changed
+    matching.users_changed(
+        *instance.users_who_know.values_list("pk", flat=True),
+        *instance.users_who_want.values_list("pk", flat=True),
+    )
+
+
+# ---- the AI service's mentor index (core.mentor_index) ----
+
+@receiver(pre_save, sender=CustomUser)
+def remember_user_role(sender, instance, update_fields=None, **kwargs):
+    instance._indexed_role = _previous(instance, update_fields, "role")
+
+
+@receiver(post_save, sender=CustomUser)
+def reindex_on_role_change(sender, instance, created, raw=False, **kwargs):
+    # New users know no skills yet; adding some syncs them
+    previous = getattr(instance, "_indexed_role", None)
+    if not raw and previous and previous[0] != instance.role:
+        mentor_index.users_changed(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def unindex_user(sender, instance, **kwargs):
+    mentor_index.users_changed(instance.pk)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(pre_delete, sender=Skill)
+def reindex_skill_holders(sender, instance, created=False, **kwargs):
+    # The index holds skill names: a rename or a delete changes every holder's profile
+    if not created:
+        mentor_index.users_changed(*instance.users_who_know.values_list("pk", flat=True))
+
+
+# ---- calendars (core.schedule) ----
+
+@receiver(post_save, sender=Session)
+@receiver(pre_delete, sender=Session)
+def session_calendars_changed(sender, instance, **kwargs):
+    schedule.calendar_changed(instance.created_by_id, *instance.participants.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=Session.participants.through)
+def participant_calendars_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in {"pre_clear", "post_add", "post_remove"}:
+        return
+    if reverse:
+        schedule.calendar_changed(instance.pk)
+    else:
+        schedule.calendar_changed(*(pk_set or instance.participants.values_list("pk", flat=True)))
+
+
+# ---- catalog response cache ----
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=Badge)
+@receiver(post_delete, sender=Badge)
+def bump_catalog_version(sender, **kwargs):
+    httpcache.bump(sender._meta.db_table)
+
+
+# ---- SQLite full-text index sync ----
+
+@receiver(post_save, sender=Session)
+def index_session(sender, instance, **kwargs):
+    if search.fts_available():
+        search.index_sessions(Session.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Session)
+def unindex_session(sender, instance, **kwargs):
+    if search.fts_available():
+        search.unindex("session", [instance.pk])
+
+
+@receiver(post_save, sender=Skill)
+def index_skill(sender, instance, **kwargs):
+    if search.fts_available():
+        search.index_skills(Skill.objects.filter(pk=instance.pk))
+        # Sessions carry their skill's name in the session index
+        search.index_sessions(Session.objects.filter(skill=instance))
+
+
+@receiver(post_delete, sender=Skill)
+def unindex_skill(sender, instance, **kwargs):
+    if search.fts_available():
+        search.unindex("skill", [instance.pk])
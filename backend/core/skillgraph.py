@@ -0,0 +1,250 @@
+"""Skill co-occurrence graph: which skills go together, for "what to learn next" lookups.
+
+A user's basket is the skills they know (``skills_known``) plus the skills of the
+sessions they joined. ``build`` counts, for every pair of skills, the baskets holding
+both, reading one keyset page of users at a time, and keeps the symmetric counts as a
+CSR matrix alongside each skill's basket count (``df``). ``SkillGraph.save`` writes it
+to ``SKILL_GRAPH_PATH`` as an npz of plain arrays (``skills``, ``categories``, ``df``,
+``baskets``, ``built_at``, ``indptr``, ``indices``, ``data``).
+
+``next_skills`` scores each candidate by its cosine co-occurrence with the given skills
+(``count(a, b) / sqrt(df(a) * df(b))``, summed over the given skills and divided by
+their number), reading one CSR row per given skill. ``core.recommender`` reads the
+same sums through ``cooccurring``, and ``Skill.popularity_score`` is rewritten from
+the same data as the share of baskets holding the skill.
+
+The ``skills.graph`` job rebuilds both and queues its next run
+``SKILL_GRAPH_REFRESH`` seconds later; ``manage.py build_skill_graph --schedule``
+starts the cycle. Web processes reload the file whenever it changes on disk.
+"""
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import httpcache, jobs
+from .models import CustomUser, Job, Session, Skill
+
+SkillsKnown = CustomUser.skills_known.through
+Participants = Session.participants.through
+JOB = "skills.graph"
+# Pending pair counts merged once they hold this many entries
+MERGE_AT = 4_000_000
+
+
+def _basket_pairs(users, cols, n):
+    """Pair codes ``a * n + b`` (``a != b``) for every two skills in the same basket.
+
+    ``users`` and ``cols`` are the deduplicated basket entries, sorted by user.
+    """
+    sizes = np.bincount(users)
+    lengths = sizes[users]
+    starts = np.cumsum(sizes) - sizes
+    left = np.repeat(cols, lengths)
+    # Entry i pairs with every entry of its own basket, itself included
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    right = cols[np.repeat(starts[users], lengths) + offsets]
+    keep = left != right
+    return left[keep].astype(np.int64) * n + right[keep]
+
+
+def _merge(pending):
+    codes, counts = np.concatenate([c for c, _ in pending]), np.concatenate([n for _, n in pending])
+    codes, inverse = np.unique(codes, return_inverse=True)
+    return codes, np.bincount(inverse, weights=counts, minlength=len(codes))
+
+
+class SkillGraph:
+    def __init__(self, skills, categories, df, baskets, built_at, indptr, indices, data):
+        self.skills = skills
+        self.categories = categories
+        self.df = df
+        self.baskets = baskets
+        self.built_at = built_at
+        self.indptr, self.indices, self.data = indptr, indices, data
+        self._cols = {skill_id: i for i, skill_id in enumerate(skills)}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            return cls(
+                [uuid.UUID(s) for s in f["skills"].tolist()],
+                f["categories"].tolist(),
+                f["df"],
+                int(f["baskets"]),
+                datetime.fromtimestamp(float(f["built_at"]), tz=dt_timezone.utc),
+                f["indptr"],
+                f["indices"],
+                f["data"],
+            )
+
+    def save(self, path):
+        """Write to ``path`` atomically: readers see the old file or the new one."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    skills=np.array([str(s) for s in self.skills]),
+                    categories=np.array(self.categories),
+                    df=self.df,
+                    baskets=self.baskets,
+                    built_at=self.built_at.timestamp(),
+                    indptr=self.indptr,
+                    indices=self.indices,
+                    data=self.data,
+                )
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _votes(self, skill_ids):
+        """Graph columns of ``skill_ids``, and the co-occurring columns with their summed weights."""
+        cols = np.array(sorted({self._cols[s] for s in skill_ids if s in self._cols}), dtype=np.int64)
+        if not len(cols):
+            return cols, cols, np.zeros(0)
+        lengths = self.indptr[cols + 1] - self.indptr[cols]
+        rows = np.repeat(cols, lengths)
+        neighbours = np.concatenate([self.indices[self.indptr[c]:self.indptr[c + 1]] for c in cols])
+        counts = np.concatenate([self.data[self.indptr[c]:self.indptr[c + 1]] for c in cols])
+        weights = counts / np.sqrt(self.df[rows] * self.df[neighbours])
+        candidates, inverse = np.unique(neighbours, return_inverse=True)
+        return cols, candidates, np.bincount(inverse, weights=weights, minlength=len(candidates))
+
+    def cooccurring(self, skill_ids):
+        """``{skill_id: weight}`` summed over ``skill_ids``; each term lies in (0, 1]."""
+        _, candidates, scores = self._votes(skill_ids)
+        return {self.skills[c]: score for c, score in zip(candidates.tolist(), scores.tolist())}
+
+    def next_skills(self, skill_ids, limit=5, category=None):
+        """``[(skill_id, score)]`` best first for someone who has ``skill_ids``.
+
+        Scores lie in [0, 1]; the given skills are never suggested and ties go to the
+        skill in more baskets. ``category`` keeps only skills of that category.
+        """
+        cols, candidates, scores = self._votes(skill_ids)
+        if not len(cols):
+            return []
+        scores = scores / len(cols)
+        keep = ~np.isin(candidates, cols, assume_unique=True)
+        if category is not None:
+            keep &= np.array([self.categories[c] == category for c in candidates.tolist()], dtype=bool)
+        candidates, scores = candidates[keep], scores[keep]
+        top = np.lexsort((-self.df[candidates], -scores))[:limit]
+        return [(self.skills[candidates[i]], min(1.0, float(scores[i]))) for i in top]
+
+
+def build(chunk_size=5000):
+    """Count skill co-occurrence over every user's basket."""
+    skills = list(Skill.objects.order_by("pk").values_list("pk", "category"))
+    n = len(skills)
+    cols = {skill_id: i for i, (skill_id, _) in enumerate(skills)}
+    df = np.zeros(n, dtype=np.int64)
+    baskets = 0
+    pending, pending_size = [], 0
+    users = CustomUser.objects.order_by("pk")
+    last_pk = None
+    while True:
+        page = users if last_pk is None else users.filter(pk__gt=last_pk)
+        user_ids = list(page.values_list("pk", flat=True)[:chunk_size])
+        if not user_ids:
+            break
+        last_pk = user_ids[-1]
+        local = {user_id: i for i, user_id in enumerate(user_ids)}
+        rows = [
+            *SkillsKnown.objects.filter(customuser_id__in=user_ids).values_list("customuser_id", "skill_id"),
+            *Participants.objects.filter(customuser_id__in=user_ids).values_list("customuser_id", "session__skill"),
+        ]
+        # Sorted, one entry per (user, skill); skills created since the build began are left out
+        entries = np.unique(np.array([local[u] * n + cols[s] for u, s in rows if s in cols], dtype=np.int64))
+        if not len(entries):
+            continue
+        entry_users, entry_cols = entries // n, entries % n
+        df += np.bincount(entry_cols, minlength=n)
+        baskets += len(np.unique(entry_users))
+        pending.append(np.unique(_basket_pairs(entry_users, entry_cols, n), return_counts=True))
+        pending_size += len(pending[-1][0])
+        if pending_size > MERGE_AT:
+            pending = [_merge(pending)]
+            pending_size = len(pending[0][0])
+    codes, counts = _merge(pending) if pending else (np.zeros(0, dtype=np.int64), np.zeros(0))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes // n, minlength=n), out=indptr[1:])
+    return SkillGraph(
+        [skill_id for skill_id, _ in skills],
+        [category for _, category in skills],
+        df,
+        baskets,
+        timezone.now(),
+        indptr,
+        (codes % n).astype(np.int32),
+        counts.astype(np.int32),
+    )
+
+
+def recompute_popularity(graph, batch_size=1000):
+    """Set ``Skill.popularity_score`` to the share of baskets holding each skill.
+
+    Skills created since ``graph`` was built are left alone. Returns the number changed.
+    """
+    scores = dict(zip(graph.skills, (graph.df / max(graph.baskets, 1)).tolist()))
+    changed = []
+    for skill in Skill.objects.filter(pk__in=graph.skills).only("pk", "popularity_score").iterator(chunk_size=batch_size):
+        if skill.popularity_score != scores[skill.pk]:
+            skill.popularity_score = scores[skill.pk]
+            changed.append(skill)
+    Skill.objects.bulk_update(changed, ["popularity_score"], batch_size=batch_size)
+    if changed:
+        # bulk_update sends no signals
+        httpcache.bump(Skill._meta.db_table)
+    return len(changed)
+
+
+def refresh(chunk_size=5000):
+    """Rebuild the graph, publish it to ``SKILL_GRAPH_PATH`` and update popularity."""
+    graph = build(chunk_size)
+    graph.save(settings.SKILL_GRAPH_PATH)
+    return graph, recompute_popularity(graph)
+
+
+_current = None
+_current_stamp = None
+_lock = threading.Lock()
+
+
+def current():
+    """The published graph, reloaded when the file changes; ``None`` before the first build."""
+    global _current, _current_stamp
+    try:
+        stat = os.stat(settings.SKILL_GRAPH_PATH)
+    except FileNotFoundError:
+        return None
+    stamp = (settings.SKILL_GRAPH_PATH, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if stamp != _current_stamp:
+            _current, _current_stamp = SkillGraph.load(settings.SKILL_GRAPH_PATH), stamp
+        return _current
+
+
+def schedule(delay=None):
+    """Queue a rebuild unless one is already queued."""
+    if not Job.objects.filter(kind=JOB, status="queued").exists():
+        jobs.enqueue(JOB, delay=delay)
+
+
+def reschedule(payload=None):
+    schedule(timedelta(seconds=settings.SKILL_GRAPH_REFRESH))
+
+
+@jobs.handler(JOB, on_failure=reschedule)
+def rebuild(payload):
+    refresh()
+    reschedule()
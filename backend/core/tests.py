@@ -1,3 +1,1887 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import (
+    ai_client, counters, gamification, httpcache, jobs, leaderboard, matching, mentor_index, mentorship, recommender,
+    schedule, search, skillgraph, uploads, views,
+)
+from .models import (
+    Badge, Certificate, CustomUser, Feedback, Job, Mentorship, Recommendation, RecordingUpload, Session, Skill, TableVersion,
+    UserCounter, Wishlist,
+)
+from .pagination import KeysetPagination
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints must cost the same number of queries whatever the row count."""
+
+    def setUp(self):
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com", role="sharer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor)
+        self.batch = 0
+
+    def add_rows(self, n):
+        start = timezone.now()
+        for _ in range(n):
+            i = self.batch = self.batch + 1
+            skill = Skill.objects.create(name=f"skill-{i}", category="dev")
+            badge = Badge.objects.create(name=f"badge-{i}", criteria="-")
+            learner = CustomUser.objects.create(username=f"learner-{i}", email=f"learner-{i}@example.com")
+            learner.skills_known.add(skill)
+            learner.skills_to_learn.add(skill)
+            learner.badges.add(badge)
+            self.mentor.badges.add(badge)
+            session = Session.objects.create(
+                title=f"Session {i}",
+                description="",
+                created_by=self.mentor,
+                skill=skill,
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i, minutes=30),
+                meeting_link="https://example.com/meet",
+            )
+            session.participants.add(learner, self.mentor)
+            Certificate.objects.create(user=self.mentor, skill=skill)
+            Feedback.objects.create(session=session, given_by=learner, rating=5)
+            Recommendation.objects.create(user=learner, suggested_skill=skill)
+            Wishlist.objects.create(user=self.mentor, session=session)
+
+    def assert_fixed_queries(self, url):
+        for n in (2, 10):
+            self.add_rows(n)
+            with self.assertNumQueries(self.expected[url]):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    expected = {
+        # The catalog version lookup, then the page
+        "/api/skills/": 2,
+        "/api/badges/": 2,
+        "/api/badges/mine/": 1,
+        "/api/sessions/": 2,
+        "/api/sessions/mine/": 2,
+        "/api/certificates/": 1,
+        "/api/certificates/mine/": 1,
+        "/api/feedback/": 1,
+        "/api/recommendations/": 1,
+        "/api/users/": 4,
+        "/api/mentees/": 4,
+        "/api/mentees/mine/": 4,
+        "/api/wishlist/mine/": 1,
+    }
+
+    def test_list_endpoints_have_fixed_query_count(self):
+        for url in self.expected:
+            with self.subTest(url=url):
+                self.assert_fixed_queries(url)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        skill = Skill.objects.create(name="skill", category="dev")
+        start = timezone.now()
+        # Pairs of sessions share a start_time so the cursor has to break ties on id
+        Session.objects.bulk_create(
+            Session(
+                title=f"Session {i}",
+                description="",
+                created_by=self.mentor,
+                skill=skill,
+                start_time=start + timedelta(hours=i // 2),
+                end_time=start + timedelta(hours=i // 2, minutes=30),
+                meeting_link="https://example.com/meet",
+            )
+            for i in range(25)
+        )
+        self.client = APIClient()
+
+    def test_walks_every_session_once_in_start_time_order(self):
+        seen = []
+        url = "/api/sessions/?page_size=4"
+        while url:
+            body = self.client.get(url).json()
+            self.assertLessEqual(len(body["results"]), 4)
+            seen.extend(body["results"])
+            url = body["next"]
+        self.assertEqual(len({s["id"] for s in seen}), 25)
+        self.assertEqual([s["start_time"] for s in seen], sorted(s["start_time"] for s in seen))
+
+    def test_page_size_is_bounded(self):
+        with mock.patch.object(KeysetPagination, "max_page_size", 10):
+            body = self.client.get("/api/sessions/?page_size=1000").json()
+        self.assertEqual(len(body["results"]), 10)
+        self.assertNotIn("count", body)
+
+    def walk(self, url):
+        rows = []
+        while url:
+            body = self.client.get(url).json()
+            rows.extend(body["results"])
+            url = body["next"]
+        return rows
+
+    def test_recommendations_best_first_and_feedback_newest_first(self):
+        learner = CustomUser.objects.create(username="learner", email="learner@example.com")
+        skill = Skill.objects.get()
+        session = Session.objects.first()
+        Recommendation.objects.bulk_create(
+            Recommendation(user=learner, suggested_skill=skill, confidence_score=(i % 3) / 3) for i in range(7)
+        )
+        for i in range(7):
+            # One at a time so created_at differs; bulk_create skips the gamification signals
+            Feedback.objects.bulk_create([Feedback(session=session, given_by=learner, rating=5 - i % 5)])
+        scores = [r["confidence_score"] for r in self.walk("/api/recommendations/?page_size=2")]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        feedback = self.walk("/api/feedback/?page_size=2")
+        self.assertEqual(len(feedback), 7)
+        self.assertEqual(
+            [f["created_at"] for f in feedback], sorted((f["created_at"] for f in feedback), reverse=True)
+        )
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        self.python = Skill.objects.create(name="Python", category="Programming", description="General purpose")
+        design = Skill.objects.create(name="Figma", category="Design", description="Interface design")
+        start = timezone.now()
+
+        def session(title, description, skill):
+            return Session.objects.create(
+                title=title,
+                description=description,
+                created_by=mentor,
+                skill=skill,
+                start_time=start,
+                end_time=start + timedelta(hours=1),
+                meeting_link="https://example.com/meet",
+            )
+
+        self.title_hit = session("Python packaging", "Wheels and sdists", self.python)
+        self.body_hit = session("Weekly office hours", "Bring your python questions", design)
+        self.skill_hit = session("Decorators deep dive", "Closures and wrappers", self.python)
+        session("Prototyping", "Auto layout tips", design)
+        self.client = APIClient()
+
+    def search(self, url):
+        return [row["id"] for row in self.client.get(url).json()["results"]]
+
+    def test_sessions_ranked_by_relevance(self):
+        ids = self.search("/api/sessions/?search=python")
+        self.assertEqual(set(ids), {str(self.title_hit.pk), str(self.body_hit.pk), str(self.skill_hit.pk)})
+        self.assertEqual(ids[0], str(self.title_hit.pk))
+
+    def test_matches_past_max_results_are_kept(self):
+        with mock.patch.object(search.SQLiteFTSSearchBackend, "max_results", 2):
+            ids, url = [], "/api/sessions/?search=python&page_size=1"
+            while url:
+                page = self.client.get(url).json()
+                ids += [row["id"] for row in page["results"]]
+                url = page["next"]
+        self.assertEqual(ids[0], str(self.title_hit.pk))
+        self.assertEqual(sorted(ids), sorted([str(self.title_hit.pk), str(self.body_hit.pk), str(self.skill_hit.pk)]))
+
+    def test_index_follows_updates_and_deletes(self):
+        self.python.name = "Rust"
+        self.python.save()
+        self.assertEqual(set(self.search("/api/sessions/?search=rust")), {str(self.title_hit.pk), str(self.skill_hit.pk)})
+        self.title_hit.delete()
+        self.assertNotIn(str(self.title_hit.pk), self.search("/api/sessions/?search=python"))
+
+    def test_skills_prefix_search(self):
+        self.assertEqual(self.search("/api/skills/?search=prog"), [str(self.python.pk)])
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media, RECORDING_UPLOAD_DIR=f"{self.media}/uploads")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        start = timezone.now()
+        self.session = Session.objects.create(
+            title="Recorded",
+            description="",
+            created_by=self.mentor,
+            skill=Skill.objects.create(name="skill", category="dev"),
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            meeting_link="https://example.com/meet",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor)
+        self.data = bytes(range(256)) * 40
+
+    def put_chunk(self, url, offset, chunk, checksum=None):
+        return self.client.put(
+            url,
+            chunk,
+            content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest(),
+        )
+
+    def test_resumable_upload(self):
+        base = f"/api/sessions/{self.session.pk}/uploads/"
+        upload = self.client.post(base, {"filename": "talk.mp4", "size": len(self.data)}, format="json").json()
+        url = f"{base}{upload['id']}/"
+        first, rest = self.data[:4000], self.data[4000:]
+
+        self.assertEqual(self.put_chunk(url, 0, first).json()["offset"], 4000)
+        # A corrupted chunk is rejected and the upload stays where it was
+        self.assertEqual(self.put_chunk(url, 4000, rest, checksum="0" * 64).status_code, 400)
+        # So is one sent from the wrong offset, with the offset to resume from
+        response = self.put_chunk(url, 0, first)
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 4000))
+        self.assertEqual(self.client.post(f"{url}finalize/").status_code, 409)
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.is_recorded)
+
+        self.assertEqual(self.client.get(url).json()["offset"], 4000)
+        self.assertEqual(self.put_chunk(url, 4000, rest).json()["offset"], len(self.data))
+        self.assertTrue(self.client.post(f"{url}finalize/").json()["is_recorded"])
+
+        self.session.refresh_from_db()
+        self.assertTrue(self.session.recording_file.name.startswith("recordings/talk"))
+        with self.session.recording_file.open("rb") as fh:
+            self.assertEqual(fh.read(), self.data)
+        self.assertFalse(RecordingUpload.objects.exists())
+
+    def test_only_the_owner_may_upload(self):
+        other = CustomUser.objects.create(username="other", email="other@example.com")
+        self.client.force_authenticate(other)
+        response = self.client.post(
+            f"/api/sessions/{self.session.pk}/uploads/", {"filename": "talk.mp4", "size": 10}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_racing_finalize_gets_a_conflict(self):
+        base = f"/api/sessions/{self.session.pk}/uploads/"
+        upload = self.client.post(base, {"filename": "talk.mp4", "size": len(self.data)}, format="json").json()
+        self.put_chunk(f"{base}{upload['id']}/", 0, self.data)
+        # Both callers loaded the completed upload before either finalized it
+        first, second = RecordingUpload.objects.get(pk=upload["id"]), RecordingUpload.objects.get(pk=upload["id"])
+        uploads.finalize(first)
+        with self.assertRaises(uploads.OffsetMismatch) as raised:
+            uploads.finalize(second)
+        self.assertEqual(raised.exception.status_code, 409)
+        self.session.refresh_from_db()
+        self.assertTrue(self.session.is_recorded)
+
+    def test_stale_uploads_expire(self):
+        base = f"/api/sessions/{self.session.pk}/uploads/"
+        stale = self.client.post(base, {"filename": "old.mp4", "size": 10}, format="json").json()
+        fresh = self.client.post(base, {"filename": "new.mp4", "size": 10}, format="json").json()
+        self.assertEqual(Job.objects.filter(kind=uploads.EXPIRE_JOB, status="queued").count(), 1)
+        long_ago = timezone.now() - timedelta(days=2)
+        RecordingUpload.objects.filter(pk=stale["id"]).update(updated_at=long_ago)
+        orphan = os.path.join(f"{self.media}/uploads", f"{uuid.uuid4().hex}.part")
+        open(orphan, "wb").close()
+        os.utime(orphan, (long_ago.timestamp(), long_ago.timestamp()))
+
+        Job.objects.update(run_after=timezone.now())
+        call_command("run_worker", "--once", stdout=io.StringIO())
+        self.assertEqual(list(RecordingUpload.objects.values_list("pk", flat=True)), [uuid.UUID(fresh["id"])])
+        self.assertEqual(os.listdir(f"{self.media}/uploads"), [f"{uuid.UUID(fresh['id']).hex}.part"])
+        # Uploads remain, so the next run is queued
+        self.assertEqual(Job.objects.filter(kind=uploads.EXPIRE_JOB, status="queued").count(), 1)
+
+
+class RecordingPlaybackTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        start = timezone.now()
+        self.session = Session.objects.create(
+            title="Recorded",
+            description="",
+            created_by=mentor,
+            skill=Skill.objects.create(name="skill", category="dev"),
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            meeting_link="https://example.com/meet",
+        )
+        self.data = bytes(range(256)) * 8
+        self.session.recording_file.save("talk.mp4", ContentFile(self.data))
+        self.url = f"/api/sessions/{self.session.pk}/recording/"
+        self.client = APIClient()
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_and_ranged_responses(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="video/*")
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "video/mp4"))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self.body(response), self.data)
+
+        for header, (start, end) in (("bytes=100-199", (100, 199)), ("bytes=2000-", (2000, 2047)), ("bytes=-48", (2000, 2047))):
+            with self.subTest(range=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{len(self.data)}")
+                self.assertEqual(response["Content-Length"], str(end - start + 1))
+                self.assertEqual(self.body(response), self.data[start:end + 1])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, f"bytes */{len(self.data)}"))
+        # A stale If-Range validator falls back to the whole file
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_revalidation(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response["ETag"]), (304, etag))
+
+    def test_accel_redirect(self):
+        with override_settings(RECORDING_ACCEL_REDIRECT="/protected-media/"):
+            response = self.client.get(self.url, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.session.recording_file.name}")
+        self.assertEqual(response.content, b"")
+
+
+def fake_ffmpeg(*args):
+    # Write an empty file wherever ffmpeg would have, segment included for HLS
+    out = args[-1]
+    if "-hls_segment_filename" in args:
+        segment = args[args.index("-hls_segment_filename") + 1]
+        open(segment.replace("%04d", "0000"), "wb").close()
+    open(out, "wb").close()
+
+
+@mock.patch("core.media.probe", return_value=(1280, 720))
+@mock.patch("core.media.ffmpeg", side_effect=fake_ffmpeg)
+class RecordingProcessingTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        start = timezone.now()
+        self.session = Session.objects.create(
+            title="Recorded",
+            description="",
+            created_by=self.mentor,
+            skill=Skill.objects.create(name="skill", category="dev"),
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            meeting_link="https://example.com/meet",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor)
+
+    def upload(self):
+        video = ContentFile(b"not really a video", name="talk.mp4")
+        return self.client.post(f"/api/sessions/{self.session.pk}/upload_video/", {"video": video})
+
+    def work(self):
+        call_command("run_worker", "--once", stdout=io.StringIO())
+        self.session.refresh_from_db()
+
+    def test_upload_queues_jobs_and_worker_builds_renditions(self, ffmpeg, probe):
+        response = self.upload()
+        self.assertEqual(response.json()["processing_status"], "pending")
+        # Nothing was transcoded during the request
+        ffmpeg.assert_not_called()
+        self.assertEqual(set(Job.objects.values_list("kind", flat=True)), {"media.poster", "media.renditions"})
+
+        self.work()
+        self.assertEqual(self.session.processing_status, "ready")
+        # Heights at or above the 720p source are skipped
+        self.assertEqual(set(self.session.renditions), {"poster", "360p", "hls"})
+        self.assertFalse(Job.objects.exclude(status="done").exists())
+        with self.session.recording_file.storage.open(self.session.renditions["hls"]) as fh:
+            self.assertIn(b"360p/index.m3u8", fh.read())
+        self.assertTrue(os.path.exists(self.session.recording_file.storage.path(
+            self.session.renditions["hls"].replace("master.m3u8", "360p/seg_0000.ts")
+        )))
+
+        body = self.client.get(f"/api/sessions/{self.session.pk}/").json()
+        self.assertTrue(body["renditions"]["poster"].endswith("poster.jpg"))
+
+    def test_failures_retry_then_mark_the_session_failed(self, ffmpeg, probe):
+        ffmpeg.side_effect = RuntimeError("ffmpeg exited 1")
+        self.upload()
+        job = Job.objects.get(kind="media.poster")
+
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertFalse(jobs.run(jobs.claim("test", ["media.poster"])))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(attempts=job.max_attempts - 1, run_after=timezone.now())
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertFalse(jobs.run(jobs.claim("test", ["media.poster"])))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("ffmpeg exited 1", job.last_error)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.processing_status, "failed")
+
+    def test_abandoned_jobs_are_requeued_until_out_of_attempts(self, ffmpeg, probe):
+        self.upload()
+        stale = timezone.now() - jobs.LOCK_TIMEOUT - timedelta(seconds=1)
+        Job.objects.update(status="running", locked_by="gone", locked_at=stale, attempts=1)
+        Job.objects.filter(kind="media.poster").update(attempts=F("max_attempts"))
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.assertEqual(jobs.requeue_abandoned(), 1)
+        self.assertEqual(
+            dict(Job.objects.values_list("kind", "status")), {"media.poster": "failed", "media.renditions": "queued"}
+        )
+        self.assertIn("Abandoned by gone", Job.objects.get(kind="media.poster").last_error)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.processing_status, "failed")
+        # Nothing is left to requeue or fail
+        self.assertEqual(jobs.requeue_abandoned(), 0)
+
+    def test_reupload_supersedes_queued_jobs(self, ffmpeg, probe):
+        self.upload()
+        self.upload()
+        self.assertEqual(Job.objects.count(), 2)
+        self.work()
+        self.assertEqual(self.session.processing_status, "ready")
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    """The heartbeat thread writes from its own connection, so no test transaction may hold the table."""
+
+    def test_running_jobs_outlive_the_lock_timeout(self):
+        seen = []
+
+        def slow(payload):
+            started = Job.objects.get(kind="slow").locked_at
+            time.sleep(0.5)
+            seen.append((started, Job.objects.get(kind="slow").locked_at, jobs.requeue_abandoned()))
+
+        jobs.enqueue("slow")
+        handlers = mock.patch.dict(jobs.HANDLERS, {"slow": (slow, None)})
+        timing = mock.patch.multiple(jobs, HEARTBEAT=timedelta(seconds=0.05), LOCK_TIMEOUT=timedelta(seconds=0.2))
+        with handlers, timing:
+            self.assertTrue(jobs.run(jobs.claim("test")))
+        [(started, refreshed, requeued)] = seen
+        self.assertGreater(refreshed, started + timedelta(seconds=0.3))
+        self.assertEqual(requeued, 0)
+        self.assertEqual(Job.objects.get(kind="slow").status, "done")
+
+
+class StubAIService(BaseHTTPRequestHandler):
+    """/recommend stub: serves ``statuses`` in turn (then 200), each after ``delay`` seconds."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.hits += 1
+            server.peers.add(self.client_address)
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.delay)
+        payload = json.dumps({
+            "mentors": [{"user_id": "m1", "score": 0.9}],
+            "next_skills": [body["target_skill"] + "-advanced"],
+        }).encode() if status == 200 else b"{}"
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except ConnectionError:
+            # The client gave up at its deadline
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class AIServiceClientTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubAIService)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.hits, self.server.peers, self.server.statuses, self.server.delay = 0, set(), [], 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = ai_client.AIServiceClient(
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+            timeout=2.0,
+            retries=2,
+            breaker=ai_client.CircuitBreaker(threshold=2, reset_timeout=60),
+            backoff_base=0.01,
+        )
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(self.client.close)
+
+        learner = CustomUser.objects.create_user(username="learner", email="l@example.com", password="pw")
+        Recommendation.objects.create(
+            user=learner, suggested_skill=Skill.objects.create(name="Django", category="web"), confidence_score=0.8
+        )
+        self.learner = learner
+
+    def test_keep_alive_and_retries(self):
+        self.server.statuses = [503]
+        self.assertEqual(self.client.recommend("python")["source"], "ai")
+        result = self.client.recommend("rust")
+        self.assertEqual(result["next_skills"], ["rust-advanced"])
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(len(self.server.peers), 1)
+
+    def test_breaker_opens_and_falls_back_to_stored_recommendations(self):
+        self.server.statuses = [500] * 6
+        with self.assertLogs("core.ai_client", "WARNING"):
+            for _ in range(3):
+                result = self.client.recommend("python", user=self.learner)
+        self.assertEqual(result, {"mentors": [], "next_skills": ["Django"], "source": "cache"})
+        # Two calls of three attempts each opened the breaker; the third never went out
+        self.assertEqual(self.server.hits, 6)
+        self.assertEqual(self.client.breaker.state, "open")
+
+        self.client.breaker.opened_at -= 60
+        self.assertEqual(self.client.recommend("python")["source"], "ai")
+        self.assertEqual(self.client.breaker.state, "closed")
+
+    def test_deadline_bounds_a_slow_call(self):
+        self.server.delay = 1.0
+        started = time.monotonic()
+        with self.assertLogs("core.ai_client", "WARNING"):
+            result = self.client.recommend("python", deadline=0.2)
+        self.assertEqual(result["source"], "cache")
+        self.assertLess(time.monotonic() - started, 0.8)
+
+    def test_identical_concurrent_calls_share_one_request(self):
+        self.server.delay = 0.2
+        with ThreadPoolExecutor(5) as pool:
+            results = list(pool.map(lambda _: self.client.post("/recommend", {"target_skill": "go", "top_k": 5}), range(5)))
+        self.assertEqual(self.server.hits, 1)
+        self.assertEqual(results, [results[0]] * 5)
+
+        async def burst():
+            try:
+                return await asyncio.gather(*(self.client.arecommend("go") for _ in range(5)))
+            finally:
+                await self.client.aclose()
+
+        results = asyncio.run(burst())
+        self.assertEqual(self.server.hits, 2)
+        self.assertEqual({r["source"] for r in results}, {"ai"})
+
+    def test_for_skill_endpoint(self):
+        with mock.patch.object(ai_client, "get_client", return_value=self.client):
+            response = APIClient().get("/api/recommendations/for-skill/", {"skill": "python", "top_k": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["next_skills"], ["python-advanced"])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AIServiceClientUnitTests(TestCase):
+    """The client against ``httpx.MockTransport``, with time driven by ``FakeClock``."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.requests = []
+        self.handle = lambda request: httpx.Response(200, json={"mentors": [], "next_skills": ["go-advanced"]})
+        self.client = ai_client.AIServiceClient(
+            base_url="http://ai.test",
+            timeout=1.0,
+            retries=5,
+            breaker=ai_client.CircuitBreaker(threshold=2, reset_timeout=30, clock=self.clock),
+            backoff_base=0.001,
+            transport=httpx.MockTransport(self.transport),
+            clock=self.clock,
+        )
+        self.addCleanup(self.client.close)
+        learner = CustomUser.objects.create_user(username="learner", email="l@example.com", password="pw")
+        Recommendation.objects.create(
+            user=learner, suggested_skill=Skill.objects.create(name="Django", category="web"), confidence_score=0.8
+        )
+
+    def transport(self, request):
+        self.requests.append(request)
+        return self.handle(request)
+
+    BAD_ANSWERS = {
+        "4xx": lambda request: httpx.Response(422, json={"detail": "bad"}),
+        "invalid json": lambda request: httpx.Response(200, content=b"<html>"),
+        "wrong shape": lambda request: httpx.Response(200, json=["go"]),
+    }
+
+    def test_client_errors_and_bad_bodies_fall_back(self):
+        for name, handle in self.BAD_ANSWERS.items():
+            with self.subTest(name):
+                self.handle, self.requests = handle, []
+                with self.assertLogs("core.ai_client", "WARNING"):
+                    result = self.client.recommend("go")
+                self.assertEqual(result, {"mentors": [], "next_skills": ["Django"], "source": "cache"})
+                # Not retried, and the service is up as far as the breaker is concerned
+                self.assertEqual(len(self.requests), 1)
+                self.assertEqual(self.client.breaker.state, "closed")
+
+    async def test_async_client_errors_and_bad_bodies_fall_back(self):
+        try:
+            for name, handle in self.BAD_ANSWERS.items():
+                with self.subTest(name):
+                    self.handle, self.requests = handle, []
+                    with self.assertLogs("core.ai_client", "WARNING"):
+                        result = await self.client.arecommend("go")
+                    self.assertEqual(result["next_skills"], ["Django"])
+                    self.assertEqual(len(self.requests), 1)
+                    self.assertEqual(self.client.breaker.state, "closed")
+        finally:
+            await self.client.aclose()
+
+    def test_for_skill_falls_back_on_client_error(self):
+        self.handle = lambda request: httpx.Response(404)
+        with mock.patch.object(ai_client, "get_client", return_value=self.client), self.assertLogs("core.ai_client"):
+            response = APIClient().get("/api/recommendations/for-skill/", {"skill": "go"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["next_skills"], ["Django"])
+
+    def test_breaker_half_open_allows_one_trial(self):
+        breaker = self.client.breaker
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+
+        self.clock.now += 30
+        self.assertEqual(breaker.state, "half-open")
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+        self.clock.now += 29
+        self.assertFalse(breaker.allow())
+        self.clock.now += 1
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(breaker.failures, 0)
+
+    def test_open_breaker_fails_fast(self):
+        self.handle = lambda request: httpx.Response(503)
+        self.client.retries = 0
+        with self.assertLogs("core.ai_client", "WARNING"):
+            for _ in range(3):
+                self.client.recommend("go")
+        self.assertEqual(len(self.requests), 2)
+        with self.assertRaisesMessage(ai_client.AIServiceUnavailable, "circuit open"):
+            self.client.post("/recommend", {"target_skill": "go"})
+
+    def test_retries_stop_at_the_deadline(self):
+        def slow_outage(request):
+            self.clock.now += 0.4
+            return httpx.Response(503)
+
+        self.handle = slow_outage
+        with self.assertRaisesMessage(ai_client.AIServiceUnavailable, "HTTP 503"):
+            self.client.post("/recommend", {"target_skill": "go"}, deadline=1.0)
+        # Attempts at 0.0, 0.4 and 0.8; the third ends past the deadline
+        self.assertEqual(len(self.requests), 3)
+        for request, remaining in zip(self.requests, (1.0, 0.6, 0.2)):
+            self.assertAlmostEqual(request.extensions["timeout"]["read"], remaining)
+
+    def test_retry_recovers_within_the_deadline(self):
+        responses = iter([httpx.Response(503), httpx.Response(429)])
+        default = self.handle
+        self.handle = lambda request: next(responses, None) or default(request)
+        self.assertEqual(self.client.post("/recommend", {"target_skill": "go"})["next_skills"], ["go-advanced"])
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(self.client.breaker.failures, 0)
+
+    def test_identical_concurrent_calls_are_coalesced(self):
+        entered, release = threading.Event(), threading.Event()
+        default = self.handle
+
+        def blocking(request):
+            entered.set()
+            release.wait(5)
+            return default(request)
+
+        self.handle = blocking
+        with ThreadPoolExecutor(4) as pool:
+            payload = {"target_skill": "go", "top_k": 5}
+            futures = [pool.submit(self.client.post, "/recommend", payload) for _ in range(3)]
+            entered.wait(5)
+            other = pool.submit(self.client.post, "/recommend", {"target_skill": "rust", "top_k": 5})
+            time.sleep(0.1)
+            release.set()
+            results = [f.result() for f in futures]
+            other.result()
+        # One request for the three identical calls, one for the different one
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(results, [results[0]] * 3)
+
+        async def burst():
+            try:
+                calls = [self.client.apost("/recommend", {"target_skill": "go"}) for _ in range(5)]
+                return await asyncio.gather(*calls)
+            finally:
+                await self.client.aclose()
+
+        self.assertEqual(len(asyncio.run(burst())), 5)
+        self.assertEqual(len(self.requests), 3)
+
+
+class MentorIndexSyncTests(TestCase):
+    """Profile changes reach the service's mentor index, and for-skill answers from it."""
+
+    def setUp(self):
+        self.index, self.down = {}, False
+        self.client = ai_client.AIServiceClient(
+            base_url="http://ai.test", timeout=1.0, retries=0, transport=httpx.MockTransport(self.service)
+        )
+        self.addCleanup(self.client.close)
+        patcher = mock.patch.object(ai_client, "get_client", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.go = Skill.objects.create(name="Go", category="lang")
+        self.rust = Skill.objects.create(name="Rust", category="lang")
+
+    def service(self, request):
+        """The ``/index/users`` and ``/recommend`` endpoints of ai_service, over a dict."""
+        path = request.url.path
+        if self.down:
+            return httpx.Response(503)
+        if request.method == "POST" and path == "/index/users":
+            for profile in json.loads(request.content):
+                self.index[profile["id"]] = profile["skills_known"]
+            return httpx.Response(200, json={"indexed": len(self.index)})
+        if request.method == "DELETE":
+            found = self.index.pop(path.rsplit("/", 1)[1], None)
+            return httpx.Response(404 if found is None else 200, json={"indexed": len(self.index)})
+        target = json.loads(request.content)["target_skill"]
+        mentors = [{"user_id": user_id, "score": 1.0} for user_id, skills in sorted(self.index.items()) if target in skills]
+        return httpx.Response(200, json={"mentors": mentors, "next_skills": []})
+
+    def work(self):
+        call_command("run_worker", "--once", stdout=io.StringIO())
+
+    def mentors_for(self, skill):
+        response = APIClient().get("/api/recommendations/for-skill/", {"skill": skill})
+        return [mentor["user_id"] for mentor in response.json()["mentors"]]
+
+    def test_changes_are_synced_through_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mentor = CustomUser.objects.create_user(username="mentor", email="m@example.com", password="pw")
+            learner = CustomUser.objects.create_user(
+                username="learner", email="l@example.com", password="pw", role="learner"
+            )
+            mentor.skills_known.add(self.go)
+            learner.skills_known.add(self.go)
+        self.work()
+        self.assertEqual(self.index, {str(mentor.pk): ["Go"]})
+        self.assertEqual(self.mentors_for("Go"), [str(mentor.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.go.name = "Golang"
+            self.go.save()
+        self.work()
+        self.assertEqual(self.mentors_for("Golang"), [str(mentor.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mentor.role = "learner"
+            mentor.save()
+        self.work()
+        self.assertEqual(self.index, {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mentor.role = "sharer"
+            mentor.save(update_fields=["role"])
+            mentor.skills_known.add(self.rust)
+        self.work()
+        self.assertEqual(self.index, {str(mentor.pk): ["Golang", "Rust"]})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mentor.delete()
+        self.work()
+        self.assertEqual(self.index, {})
+        self.assertFalse(Job.objects.exclude(status="done").exists())
+
+    def test_failed_syncs_are_retried(self):
+        self.client.breaker = ai_client.CircuitBreaker(threshold=100, reset_timeout=1)
+        self.down = True
+        with self.captureOnCommitCallbacks(execute=True):
+            mentor = CustomUser.objects.create_user(username="mentor", email="m@example.com", password="pw")
+            mentor.skills_known.add(self.go)
+        with self.assertLogs("core.jobs", "ERROR"):
+            self.work()
+        self.assertEqual(self.index, {})
+        self.down = False
+        Job.objects.update(run_after=timezone.now())
+        self.work()
+        self.assertEqual(self.index, {str(mentor.pk): ["Go"]})
+
+    def test_sync_command_sends_every_mentor(self):
+        mentors = [
+            CustomUser.objects.create_user(username=f"mentor-{i}", email=f"m{i}@example.com", password="pw")
+            for i in range(5)
+        ]
+        CustomUser.objects.create_user(username="learner", email="l@example.com", password="pw", role="learner")
+        for mentor in mentors:
+            mentor.skills_known.add(self.rust)
+        call_command("sync_mentor_index", "--chunk-size", "2", stdout=io.StringIO())
+        self.assertEqual(self.index, {str(mentor.pk): ["Rust"] for mentor in mentors})
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        httpcache.responses.clear()
+        Skill.objects.create(name="Python", category="dev")
+        Badge.objects.create(name="Mentor", criteria="-")
+        self.client = APIClient()
+
+    def test_repeat_requests_only_read_the_version(self):
+        for url in ("/api/skills/", "/api/badges/"):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(2), mock.patch("rest_framework.generics.GenericAPIView.get_serializer") as ser:
+                    again = self.client.get(url)
+                    not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+                ser.assert_not_called()
+                self.assertEqual(again.content, first.content)
+                self.assertEqual(again["ETag"], first["ETag"])
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        first = self.client.get("/api/skills/")
+        skill = Skill.objects.create(name="Rust", category="dev")
+        second = self.client.get("/api/skills/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual([s["name"] for s in second.json()["results"]], ["Python", "Rust"])
+        skill.delete()
+        self.assertEqual([s["name"] for s in self.client.get("/api/skills/").json()["results"]], ["Python"])
+        # Query strings are cached separately
+        self.assertEqual(len(self.client.get("/api/skills/?page_size=1").json()["results"]), 1)
+
+    def test_bumps_from_other_processes_are_seen(self):
+        first = self.client.get("/api/skills/")
+        # What a bump in another worker leaves behind: only the shared version row changes
+        Skill.objects.bulk_create([Skill(name="Rust", category="dev")])
+        TableVersion.objects.filter(pk=Skill._meta.db_table).update(version=F("version") + 1)
+        second = self.client.get("/api/skills/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual([s["name"] for s in second.json()["results"]], ["Python", "Rust"])
+
+    def test_lru_evicts_by_size_and_expires(self):
+        lru = httpcache.ResponseLRU(max_bytes=10)
+        lru.set("a", "application/json", b"123456", ttl=60)
+        lru.set("b", "application/json", b"123456", ttl=60)
+        self.assertIsNone(lru.get("a"))
+        self.assertEqual(lru.get("b"), ("application/json", b"123456"))
+        lru.set("c", "application/json", b"1", ttl=-1)
+        self.assertIsNone(lru.get("c"))
+        self.assertEqual(lru.size, 6)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        self.learner = CustomUser.objects.create(username="learner", email="learner@example.com")
+        self.skill = Skill.objects.create(name="Python", category="dev")
+        self.clients = {}
+        for user in (self.mentor, self.learner):
+            self.clients[user.pk] = APIClient()
+            self.clients[user.pk].force_authenticate(user)
+
+    def session(self, owner=None, hours=1, start=None):
+        start = start or timezone.now() + timedelta(days=1)
+        return Session.objects.create(
+            title="Session", description="", created_by=owner or self.mentor, skill=self.skill,
+            start_time=start, end_time=start + timedelta(hours=hours), meeting_link="https://example.com/meet",
+        )
+
+    def dashboard(self, user):
+        response = self.clients[user.pk].get("/api/dashboard/")
+        return response["X-Cache"], response.json()
+
+    def test_changes_invalidate_the_cached_payload(self):
+        for user in (self.mentor, self.learner):
+            self.assertEqual(self.dashboard(user)[0], "MISS")
+            self.assertEqual(self.dashboard(user)[0], "HIT")
+        badge = Badge.objects.create(name="First steps", criteria="-")
+
+        def rename_badge():
+            badge.name = "Trailblazer"
+            badge.save()
+
+        changes = [
+            ("session created", lambda: self.session(), [self.mentor], lambda b: b["sessions_created"] == 1),
+            (
+                "participant added",
+                lambda: Session.objects.get().participants.add(self.learner),
+                [self.mentor, self.learner],
+                lambda b: b["sessions_joined"] == 1 or b["total_mentees"] == 1,
+            ),
+            ("badge awarded", lambda: self.learner.badges.add(badge), [self.learner], lambda b: b["badges"]),
+            ("badge renamed", rename_badge, [self.learner], lambda b: b["badges"][0]["name"] == "Trailblazer"),
+            (
+                "participant removed",
+                lambda: Session.objects.get().participants.remove(self.learner),
+                [self.mentor, self.learner],
+                lambda b: b["sessions_joined"] == 0 and b["total_mentees"] == 0,
+            ),
+            (
+                "session deleted",
+                lambda: Session.objects.get().delete(),
+                [self.mentor],
+                lambda b: b["sessions_created"] == 0,
+            ),
+        ]
+        for name, change, affected, check in changes:
+            with self.subTest(name):
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                for user in (self.mentor, self.learner):
+                    hit, body = self.dashboard(user)
+                    if user in affected:
+                        self.assertEqual(hit, "MISS", user.username)
+                        self.assertTrue(check(body), body)
+                    else:
+                        self.assertEqual(hit, "HIT", user.username)
+
+    def test_seconds_taught_matches_the_python_loop(self):
+        def loop(user):
+            # The per-session loop MentorMeView used before the aggregate
+            total = 0
+            for s in Session.objects.filter(created_by=user):
+                if s.start_time and s.end_time:
+                    total += max(0, int((s.end_time - s.start_time).total_seconds()))
+            return total
+
+        self.assertEqual(views.seconds_taught(self.mentor), 0)
+        start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        for i, hours in enumerate((1, 2.5, 0, -1, 0.75)):
+            self.session(hours=hours, start=start + timedelta(days=i))
+        self.session(owner=self.learner, hours=8)
+        self.assertEqual(views.seconds_taught(self.mentor), loop(self.mentor))
+        self.assertEqual(views.seconds_taught(self.mentor), 4.25 * 3600)
+        body = self.clients[self.mentor.pk].get("/api/mentors/me/").json()
+        self.assertEqual(body["total_hours_taught"], round(loop(self.mentor) / 3600))
+
+
+@override_settings(GAMIFICATION_POINTS={"session_created": 10, "session_joined": 5, "feedback_given": 2})
+class GamificationTests(TestCase):
+    def setUp(self):
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        self.learner = CustomUser.objects.create(username="learner", email="learner@example.com")
+        self.skill = Skill.objects.create(name="Python", category="dev")
+        self.regular = Badge.objects.create(name="Regular", criteria="session_joined >= 2")
+        self.helpful = Badge.objects.create(name="Helpful", criteria="feedback_given >= 1 and (points >= 14 or session_joined > 5)")
+        Badge.objects.create(name="Founder", criteria="Hand-picked by the team")
+
+    def session(self, i):
+        start = timezone.now() + timedelta(days=i)
+        return Session.objects.create(
+            title=f"Session {i}", description="", created_by=self.mentor, skill=self.skill,
+            start_time=start, end_time=start + timedelta(hours=1), meeting_link="https://example.com/meet",
+        )
+
+    def state(self, user):
+        user.refresh_from_db()
+        counters = {
+            name: value for name, value in gamification.counters_for([user.pk])[user.pk].items()
+            if value and name != "points"
+        }
+        return user.points, counters, set(user.badges.values_list("name", flat=True))
+
+    def test_criteria(self):
+        criteria = gamification.compile_criteria("feedback_given >= 1 and (points >= 14 or session_joined > 5)")
+        self.assertEqual(criteria.names, {"feedback_given", "points", "session_joined"})
+        self.assertTrue(criteria({"feedback_given": 1, "points": 14}))
+        self.assertFalse(criteria({"feedback_given": 1, "points": 13}))
+        for text in ("", "points >=", "badges > 1", "points > 1 and", "(points > 1", "rm -rf"):
+            with self.subTest(text=text), self.assertRaises(gamification.CriteriaError):
+                gamification.compile_criteria(text)
+
+    def test_events_award_points_and_badges(self):
+        first, second = self.session(1), self.session(2)
+        first.participants.add(self.learner)
+        self.assertEqual(self.state(self.learner), (5, {"session_joined": 1}, set()))
+        self.learner.sessions_joined.add(second)
+        Feedback.objects.create(session=first, given_by=self.learner, rating=5)
+        self.assertEqual(
+            self.state(self.learner),
+            (12, {"session_joined": 2, "feedback_given": 1}, {"Regular"}),
+        )
+        self.assertEqual(self.state(self.mentor), (20, {"session_created": 2}, set()))
+
+        second.delete()
+        self.assertEqual(self.state(self.learner), (7, {"session_joined": 1, "feedback_given": 1}, {"Regular"}))
+        self.session(3).participants.add(self.learner)
+        self.assertEqual(self.state(self.learner)[0], 12)
+        Feedback.objects.create(session=first, given_by=self.learner, rating=4)
+        self.assertIn("Helpful", self.state(self.learner)[2])
+
+    def test_reassigned_sessions_move_points_with_the_counters(self):
+        session = self.session(1)
+        session.created_by = self.learner
+        session.save()
+        self.assertEqual(self.state(self.mentor)[:2], (0, {}))
+        self.assertEqual(self.state(self.learner)[:2], (10, {"session_created": 1}))
+        self.assertEqual(self.learner.sessions_created_count, 1)
+
+    def test_one_counter_update_per_event(self):
+        users = [CustomUser.objects.create(username=f"u{i}", email=f"u{i}@example.com") for i in range(5)]
+        gamification.record("feedback_given", [u.pk for u in users])
+        with self.assertNumQueries(1):
+            gamification._add_to_counters([u.pk for u in users], "feedback_given", 1)
+        self.assertEqual(
+            set(UserCounter.objects.filter(name="feedback_given").values_list("value", flat=True)), {2}
+        )
+
+    def test_removing_a_non_participant_changes_nothing(self):
+        first, second = self.session(1), self.session(2)
+        first.participants.add(self.learner)
+        before = self.state(self.mentor), self.state(self.learner)
+        first.participants.remove(self.mentor)
+        self.mentor.sessions_joined.remove(first, second)
+        self.learner.sessions_joined.remove(second)
+        second.participants.clear()
+        self.assertEqual((self.state(self.mentor), self.state(self.learner)), before)
+        self.learner.sessions_joined.remove(first, second)
+        self.assertEqual(self.state(self.learner)[:2], (0, {}))
+
+    def test_backfill_replays_history(self):
+        for i in range(3):
+            self.session(i).participants.add(self.learner, self.mentor)
+        Feedback.objects.create(session=Session.objects.first(), given_by=self.learner, rating=5)
+        expected = {user.pk: self.state(user) for user in (self.mentor, self.learner)}
+
+        UserCounter.objects.all().delete()
+        CustomUser.objects.update(points=0, sessions_created_count=0, sessions_joined_count=0)
+        CustomUser.badges.through.objects.all().delete()
+        call_command("backfill_gamification", chunk_size=1, stdout=io.StringIO())
+        self.assertEqual({user.pk: self.state(user) for user in (self.mentor, self.learner)}, expected)
+        self.assertEqual(expected[self.learner.pk][2], {"Regular", "Helpful"})
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        boards = mock.patch.object(leaderboard, "boards", leaderboard.Leaderboards())
+        boards.start()
+        self.addCleanup(boards.stop)
+        self.python = Skill.objects.create(name="Python", category="dev")
+        self.users = [
+            CustomUser.objects.create(username=f"user-{i}", email=f"user-{i}@example.com", points=points)
+            for i, points in enumerate([50, 80, 50, 10])
+        ]
+        for user in self.users[1:]:
+            user.skills_known.add(self.python)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[2])
+
+    def board(self, **params):
+        return self.client.get("/api/leaderboard/", params).json()
+
+    def test_rank_index_matches_sorting(self):
+        rng = random.Random(0)
+        index, scores = leaderboard.RankIndex(), {}
+        for _ in range(500):
+            user_id = rng.randrange(60)
+            if rng.random() < 0.2:
+                index.remove(user_id)
+                scores.pop(user_id, None)
+            else:
+                scores[user_id] = rng.randrange(3000)
+                index.set(user_id, scores[user_id])
+        ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        offset = rng.randrange(len(ordered))
+        self.assertEqual([(u, s) for _, u, s in index.top(15, offset)], ordered[offset:offset + 15])
+        for user_id, score in scores.items():
+            self.assertEqual(index.rank(user_id), 1 + sum(s > score for s in scores.values()))
+        self.assertEqual(leaderboard.RankIndex.from_scores(scores).top(100), index.top(100))
+
+    def test_rank_index_size_does_not_follow_scores(self):
+        index = leaderboard.RankIndex.from_scores({1: 10 ** 12, 2: 5})
+        index.set(3, 10 ** 15)
+        self.assertEqual(len(index._order), 3)
+        self.assertEqual([(rank, user_id) for rank, user_id, _ in index.top(3)], [(1, 3), (2, 1), (3, 2)])
+
+    def test_updates_during_a_build_are_not_lost(self):
+        boards = leaderboard.boards
+        from_scores = leaderboard.RankIndex.from_scores
+        late = self.users[3]
+
+        def racing(scores):
+            # Another thread's update lands after the build read the points
+            if late.pk in scores and scores[late.pk] == 10:
+                CustomUser.objects.filter(pk=late.pk).update(points=1000)
+                boards.update([late.pk])
+            return from_scores(scores)
+
+        with mock.patch.object(leaderboard.RankIndex, "from_scores", side_effect=racing):
+            boards.build()
+        self.assertEqual(boards.everyone.score(late.pk), 1000)
+        self.assertEqual(boards.by_skill[self.python.pk].rank(late.pk), 1)
+
+    def test_global_and_per_skill(self):
+        body = self.board(limit=3)
+        self.assertEqual(body["total"], 4)
+        self.assertEqual([(r["rank"], r["username"]) for r in body["results"]][0], (1, "user-1"))
+        self.assertEqual([r["rank"] for r in body["results"]], [1, 2, 2])
+        self.assertEqual(body["me"], {"rank": 2, "points": 50})
+
+        body = self.board(skill=self.python.pk)
+        self.assertEqual([r["username"] for r in body["results"]], ["user-1", "user-2", "user-3"])
+        self.assertEqual(self.board(offset=3)["results"][0]["username"], "user-3")
+
+    def test_incremental_updates(self):
+        self.board()
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.filter(pk=self.users[3].pk).update(points=100)
+            leaderboard.users_changed(self.users[3].pk)
+            self.users[0].skills_known.add(self.python)
+            self.users[1].skills_known.remove(self.python)
+        with self.assertNumQueries(1):
+            body = self.board(skill=self.python.pk)
+        ranks = {r["username"]: r["rank"] for r in body["results"]}
+        self.assertEqual(ranks, {"user-3": 1, "user-0": 2, "user-2": 2})
+        self.assertEqual(body["me"]["rank"], 2)
+
+
+class SchedulingTests(TestCase):
+    def setUp(self):
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        self.learner = CustomUser.objects.create(username="learner", email="learner@example.com")
+        self.skill = Skill.objects.create(name="Python", category="dev")
+        self.day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor)
+
+    def at(self, hours):
+        return (self.day + timedelta(hours=hours)).isoformat()
+
+    def create(self, start, end, **extra):
+        return self.client.post("/api/sessions/", {
+            "title": "Session", "description": "Pairing", "created_by": self.mentor.pk, "skill": self.skill.pk,
+            "start_time": self.at(start), "end_time": self.at(end), "meeting_link": "https://example.com/meet",
+            **extra,
+        }, format="json")
+
+    def test_interval_tree_matches_scan(self):
+        rng = random.Random(0)
+        intervals = []
+        for i in range(300):
+            start = rng.randrange(1000)
+            intervals.append((start, start + rng.randrange(1, 40), i))
+        tree = schedule.IntervalTree(intervals)
+        for _ in range(100):
+            start = rng.randrange(1000)
+            end = start + rng.randrange(1, 60)
+            expected = sorted(i for i in intervals if i[0] < end and i[1] > start)
+            self.assertEqual(tree.overlapping(start, end), expected)
+
+    def test_create_and_update_conflicts(self):
+        first = self.create(9, 10)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(self.create(10, 11).status_code, 201)
+        clash = self.create(9.25, 9.75)
+        self.assertEqual(clash.status_code, 409)
+        self.assertEqual(clash.json()["conflicts"], [first.json()["id"]])
+        # Zero and negative durations are stored as before and overlap nothing
+        self.assertEqual(self.create(12, 11).status_code, 201)
+        self.assertEqual(self.create(9.5, 9.5).status_code, 201)
+
+        url = f"/api/sessions/{first.json()['id']}/"
+        self.assertEqual(self.client.patch(url, {"end_time": self.at(10.5)}, format="json").status_code, 409)
+        self.assertEqual(self.client.patch(url, {"start_time": self.at(8)}, format="json").status_code, 200)
+
+    def test_writes_recheck_calendars_missed_by_a_stale_tree(self):
+        def other_process_books(hours):
+            # bulk_create sends no signals, so the calendar version is not bumped
+            Session.objects.bulk_create([Session(
+                title="Elsewhere", description="", created_by=self.mentor, skill=self.skill,
+                start_time=self.day + timedelta(hours=hours), end_time=self.day + timedelta(hours=hours + 1),
+                meeting_link="https://example.com/meet",
+            )])
+
+        self.assertEqual(schedule.busy(self.mentor.pk, self.day, self.day + timedelta(days=1)), [])
+        other_process_books(12)
+        noon = self.day + timedelta(hours=12)
+        # The cached tree has not seen it
+        self.assertEqual(schedule.busy(self.mentor.pk, noon, noon + timedelta(hours=1)), [])
+        self.assertEqual(self.create(12.5, 13.5).status_code, 409)
+        self.assertEqual(Session.objects.filter(created_by=self.mentor).count(), 1)
+
+        session = Session.objects.create(
+            title="Talk", description="", created_by=self.learner, skill=self.skill,
+            start_time=self.day + timedelta(hours=15), end_time=self.day + timedelta(hours=16),
+            meeting_link="https://example.com/meet",
+        )
+        schedule.busy(self.mentor.pk, self.day, self.day + timedelta(days=1))
+        other_process_books(15)
+        self.assertEqual(self.client.post(f"/api/sessions/{session.pk}/join/").status_code, 409)
+        self.assertFalse(session.participants.exists())
+
+        # PostgreSQL rechecks too: its exclusion constraint only covers creators
+        session.participants.add(self.mentor)
+        with mock.patch.object(schedule, "uses_ranges", return_value=True):
+            with self.assertRaises(schedule.SessionConflict):
+                schedule.recheck([self.mentor], session)
+
+    def test_trees_follow_calendar_versions(self):
+        self.assertEqual(self.create(9, 10).status_code, 201)
+        day = (self.day, self.day + timedelta(days=1))
+        with self.assertNumQueries(2):
+            self.assertEqual(len(schedule.busy(self.mentor.pk, *day)), 1)
+        # Cached: only the version is read
+        with self.assertNumQueries(1):
+            self.assertEqual(len(schedule.busy(self.mentor.pk, *day)), 1)
+        self.assertEqual(self.create(11, 12).status_code, 201)
+        self.assertEqual(len(schedule.busy(self.mentor.pk, *day)), 2)
+
+    def test_participants_and_join(self):
+        session = self.create(9, 10).json()
+        learner_client = APIClient()
+        learner_client.force_authenticate(self.learner)
+        self.assertEqual(learner_client.post(f"/api/sessions/{session['id']}/join/").status_code, 200)
+        self.assertEqual(learner_client.post(f"/api/sessions/{session['id']}/join/").status_code, 200)
+
+        other = Session.objects.create(
+            title="Other", description="", created_by=self.learner, skill=self.skill,
+            start_time=self.day + timedelta(hours=9, minutes=30), end_time=self.day + timedelta(hours=11),
+            meeting_link="https://example.com/meet",
+        )
+        self.assertEqual(self.client.post(f"/api/sessions/{other.pk}/join/").status_code, 409)
+        clash = self.create(10.5, 12, participants=[str(self.learner.pk)])
+        self.assertEqual(clash.status_code, 409)
+        self.assertEqual(clash.json()["user"], str(self.learner.pk))
+        self.assertFalse(other.participants.exists())
+
+    def test_free_slots(self):
+        self.create(9, 10)
+        self.create(13, 14)
+        response = self.client.get("/api/sessions/free-slots/", {
+            "user": str(self.mentor.pk), "start": self.at(8), "end": self.at(15), "duration": 120,
+        })
+        self.assertEqual(response.status_code, 200)
+        slots = [(s["start"], s["end"]) for s in response.json()["slots"]]
+        self.assertEqual(len(slots), 1)
+        self.assertEqual(
+            [parse_datetime(t) for t in slots[0]], [self.day + timedelta(hours=10), self.day + timedelta(hours=13)]
+        )
+        self.assertEqual(self.client.get("/api/sessions/free-slots/", {"start": "soon"}).status_code, 400)
+
+
+class DenormalizedCounterTests(TestCase):
+    def setUp(self):
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        self.learners = [CustomUser.objects.create(username=f"u{i}", email=f"u{i}@example.com") for i in range(3)]
+        self.skill = Skill.objects.create(name="Python", category="dev")
+        self.sessions = [self.session(self.mentor, i) for i in range(2)]
+
+    def session(self, owner, hour):
+        start = timezone.now() + timedelta(days=1, hours=hour)
+        return Session.objects.create(
+            title="Session", description="", created_by=owner, skill=self.skill,
+            start_time=start, end_time=start + timedelta(minutes=30), meeting_link="https://example.com/meet",
+        )
+
+    def assert_consistent(self):
+        for model, expected in (
+            (CustomUser, counters.expected_user_counters()),
+            (Session, counters.expected_session_counters()),
+        ):
+            for row in model.objects.annotate(**{f"expected_{f}": e for f, e in expected.items()}).values():
+                for field in expected:
+                    self.assertEqual(row[field], row[f"expected_{field}"], (model.__name__, row["id"], field))
+
+    def counts(self, obj, *fields):
+        obj.refresh_from_db(fields=fields)
+        return tuple(getattr(obj, field) for field in fields)
+
+    def test_participants_and_mentees(self):
+        first, second = self.sessions
+        a, b, c = self.learners
+        first.participants.add(a, b)
+        second.participants.add(a)
+        self.assertEqual(self.counts(self.mentor, "sessions_created_count", "mentee_count"), (2, 2))
+        self.assertEqual(self.counts(a, "sessions_joined_count"), (2,))
+        self.assertEqual(self.counts(first, "participant_count"), (2,))
+
+        # Removing someone who never joined changes nothing
+        second.participants.remove(b, c)
+        c.sessions_joined.add(first)
+        a.sessions_joined.remove(first)
+        self.assertEqual(self.counts(self.mentor, "mentee_count"), (3,))
+        self.assert_consistent()
+
+        second.participants.clear()
+        b.sessions_joined.clear()
+        self.assertEqual(self.counts(self.mentor, "mentee_count"), (1,))
+        self.assert_consistent()
+
+    def test_deletes_and_owner_changes(self):
+        first, second = self.sessions
+        a, b, _ = self.learners
+        first.participants.add(a, b)
+        second.participants.add(a)
+        Session.objects.filter(pk=first.pk).delete()
+        self.assertEqual(self.counts(self.mentor, "sessions_created_count", "mentee_count"), (1, 1))
+        self.assertEqual(self.counts(b, "sessions_joined_count"), (0,))
+
+        second.created_by = b
+        second.save()
+        self.assertEqual(self.counts(b, "sessions_created_count", "mentee_count"), (1, 1))
+        a.delete()
+        self.assertEqual(self.counts(b, "mentee_count"), (0,))
+        self.assertEqual(self.counts(second, "participant_count"), (0,))
+        self.assert_consistent()
+
+    def test_ratings_and_wishlist(self):
+        first = self.sessions[0]
+        a, b, _ = self.learners
+        feedback = Feedback.objects.create(session=first, given_by=a, rating=5)
+        Feedback.objects.create(session=first, given_by=b, rating=2)
+        feedback.rating = 4
+        feedback.save()
+        Wishlist.objects.create(user=a, session=first)
+        Wishlist.objects.create(user=b, session=first).delete()
+        self.assertEqual(self.counts(first, "rating_count", "rating_sum", "wishlist_count"), (2, 6, 1))
+        feedback.delete()
+        self.assert_consistent()
+
+        body = APIClient().get(f"/api/sessions/{first.pk}/").json()
+        self.assertEqual((body["rating_count"], body["average_rating"], body["wishlist_count"]), (1, 2.0, 1))
+
+    def test_dashboard_reads_columns(self):
+        self.sessions[0].participants.add(*self.learners)
+        client = APIClient()
+        client.force_authenticate(self.mentor)
+        with self.assertNumQueries(2):
+            body = client.get("/api/dashboard/").json()
+        self.assertEqual((body["sessions_created"], body["total_mentees"]), (2, 3))
+
+    def test_full_save_of_a_stale_user_keeps_counters(self):
+        stale = CustomUser.objects.get(pk=self.learners[0].pk)
+        self.sessions[0].participants.add(stale)
+        # core.gamification moves points the same way
+        CustomUser.objects.filter(pk=stale.pk).update(points=F("points") + 25)
+        points = CustomUser.objects.values_list("points", flat=True).get(pk=stale.pk)
+        stale.bio = "Learning Python"
+        stale.save()
+        fresh = CustomUser.objects.get(pk=stale.pk)
+        self.assertEqual((fresh.bio, fresh.points, fresh.sessions_joined_count), ("Learning Python", points, 1))
+        self.assertGreaterEqual(points, 25)
+
+    def test_reconcile_repairs_drift(self):
+        self.sessions[0].participants.add(*self.learners)
+        # Bulk writes send no signals
+        Session.participants.through.objects.bulk_create(
+            [Session.participants.through(session=self.sessions[1], customuser=self.learners[0])]
+        )
+        CustomUser.objects.filter(pk=self.mentor.pk).update(sessions_created_count=7)
+
+        out = io.StringIO()
+        call_command("reconcile_counters", dry_run=True, stdout=out)
+        self.assertIn("users: checked 4, found 2 drifted", out.getvalue())
+        self.assertEqual(self.counts(self.mentor, "sessions_created_count"), (7,))
+
+        out = io.StringIO()
+        call_command("reconcile_counters", chunk_size=2, stdout=out)
+        self.assertIn("repaired 2 drifted", out.getvalue())
+        self.assert_consistent()
+
+
+class MentorshipTests(TestCase):
+    def setUp(self):
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        self.learners = [CustomUser.objects.create(username=f"u{i}", email=f"u{i}@example.com") for i in range(3)]
+        skill = Skill.objects.create(name="Python", category="dev")
+        self.day = timezone.now() + timedelta(days=1)
+        self.sessions = [
+            Session.objects.create(
+                title=f"Session {i}", description="", created_by=self.mentor, skill=skill,
+                start_time=self.day + timedelta(hours=i), end_time=self.day + timedelta(hours=i, minutes=30),
+                meeting_link="https://example.com/meet",
+            )
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor)
+
+    def edges(self):
+        return {
+            mentee_id: (n, first, last)
+            for mentee_id, n, first, last in Mentorship.objects.filter(mentor=self.mentor)
+            .values_list("mentee_id", "session_count", "first_session_at", "last_session_at")
+        }
+
+    def assert_edges_match_participants(self):
+        self.assertEqual(mentorship.rebuild(CustomUser.objects.values_list("pk", flat=True), dry_run=True), 0)
+        self.mentor.refresh_from_db(fields=["mentee_count"])
+        self.assertEqual(self.mentor.mentee_count, Mentorship.objects.filter(mentor=self.mentor).count())
+
+    def test_edges_follow_participants(self):
+        first, second, third = self.sessions
+        a, b, c = self.learners
+        first.participants.add(a, b)
+        second.participants.add(a)
+        c.sessions_joined.add(third)
+        self.assertEqual(self.edges()[a.pk], (2, first.start_time, second.start_time))
+        self.assert_edges_match_participants()
+
+        second.start_time = self.day + timedelta(hours=5)
+        second.save()
+        self.assertEqual(self.edges()[a.pk][2], second.start_time)
+        first.participants.remove(b)
+        a.sessions_joined.clear()
+        self.assertEqual(set(self.edges()), {c.pk})
+        Session.objects.filter(pk=third.pk).delete()
+        self.assertEqual(self.edges(), {})
+        self.assert_edges_match_participants()
+
+    def test_mentee_deleted(self):
+        self.sessions[0].participants.add(*self.learners)
+        self.learners[0].delete()
+        self.assertEqual(len(self.edges()), 2)
+        self.assert_edges_match_participants()
+
+    def test_mine_orderings(self):
+        first, second, third = self.sessions
+        a, b, c = self.learners
+        first.participants.add(a, b, c)
+        second.participants.add(b, c)
+        third.participants.add(b)
+
+        def mine(ordering):
+            body = self.client.get(f"/api/mentees/mine/?ordering={ordering}&page_size=2").json()
+            return [row["username"] for row in body["results"]] + (["..."] if body["next"] else [])
+
+        self.assertEqual(mine("username"), ["u0", "u1", "..."])
+        self.assertEqual(mine("engaged"), ["u1", "u2", "..."])
+        self.assertEqual(mine("recent")[0], "u1")
+        row = self.client.get("/api/mentees/mine/?ordering=engaged").json()["results"][0]
+        self.assertEqual(row["session_count"], 3)
+        self.assertEqual(self.client.get("/api/mentees/mine/?ordering=points").status_code, 400)
+
+    def test_reconcile_rebuilds_edges(self):
+        self.sessions[0].participants.add(self.learners[0])
+        Mentorship.objects.all().delete()
+        out = io.StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("mentorships: repaired 1 drifted", out.getvalue())
+        self.assertEqual(set(self.edges()), {self.learners[0].pk})
+        self.assert_edges_match_participants()
+
+
+class MatchingTests(TestCase):
+    def setUp(self):
+        engine = mock.patch.object(matching, "matcher", matching.Matcher())
+        engine.start()
+        self.addCleanup(engine.stop)
+        self.skills = [Skill.objects.create(name=name, category="dev") for name in ("Python", "Rust", "Go", "SQL")]
+        python, rust, go, sql = self.skills
+        self.learner = CustomUser.objects.create(username="learner", email="learner@example.com", role="learner")
+        self.learner.skills_to_learn.add(python, rust)
+        self.learner.skills_known.add(sql)
+        self.both = self.user("both", known=[python, rust])
+        self.rust = self.user("rust", known=[rust])
+        self.python = self.user("python", known=[python], wanted=[sql])
+        self.user("no-mentor", known=[python, rust], role="learner")
+        self.client = APIClient()
+
+    def user(self, name, known=(), wanted=(), role="both"):
+        user = CustomUser.objects.create(username=name, email=f"{name}@example.com", role=role)
+        user.skills_known.add(*known)
+        user.skills_to_learn.add(*wanted)
+        return user
+
+    def matches(self, user, **params):
+        response = self.client.get(f"/api/users/{user.pk}/matches/", params)
+        self.assertEqual(response.status_code, 200)
+        return [(row["username"], row["score"], sorted(s["name"] for s in row["skills"])) for row in response.json()["results"]]
+
+    def test_weighted_overlap_ranking(self):
+        found = self.matches(self.learner)
+        # Python and Rust are equally common; python also wants the learner's SQL
+        self.assertEqual(found, [
+            ("both", 1.0, ["Python", "Rust"]),
+            ("python", 0.75, ["Python"]),
+            ("rust", 0.5, ["Rust"]),
+        ])
+        self.assertEqual(len(self.matches(self.learner, limit=1)), 1)
+        self.assertEqual(self.matches(self.both), [])
+        self.assertEqual(self.client.get(f"/api/users/{uuid.uuid4()}/matches/").status_code, 404)
+
+        # A rarer skill counts for more
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user("extra", known=[self.skills[0]])
+        with override_settings(MATCHING_RECIPROCITY=0):
+            found = dict((name, score) for name, score, _ in self.matches(self.learner))
+        self.assertGreater(found["rust"], found["python"])
+
+    def test_ties_keep_the_earliest_users(self):
+        rng = random.Random(0)
+        python, rust, go, _ = self.skills
+        for i in range(40):
+            self.user(f"tied-{i}", known=rng.choice([[go], [rust], [go, rust], [python, go]]))
+        self.learner.skills_to_learn.set([go, rust])
+        for sparse_below in (2.0, 0.0):
+            with self.subTest(sparse_below=sparse_below), mock.patch.object(matching.Matcher, "SPARSE_BELOW", sparse_below):
+                matching.matcher.build()
+                ranked = [name for name, _, _ in self.matches(self.learner, limit=50)]
+                for limit in range(1, len(ranked)):
+                    self.assertEqual([name for name, _, _ in self.matches(self.learner, limit=limit)], ranked[:limit])
+
+    def test_users_unknown_to_the_engine_leave_it_alone(self):
+        self.matches(self.learner)
+        # Created elsewhere: no signal reached this process's engine
+        with mock.patch.object(matching, "users_changed"):
+            late = self.user("late", wanted=[self.skills[0], self.skills[1]], known=[self.skills[3]])
+        found = self.matches(late)
+        self.assertEqual(found, self.matches(self.learner))
+        self.assertNotIn(late.pk, matching.matcher)
+
+    def test_follows_skill_and_role_changes(self):
+        self.matches(self.learner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rust.skills_known.add(self.skills[0])
+            self.both.role = "learner"
+            self.both.save()
+            newcomer = self.user("newcomer", known=[self.skills[1]])
+        self.assertEqual([name for name, _, _ in self.matches(self.learner)], ["rust", "python", "newcomer"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skills[1].delete()
+        self.assertEqual({name for name, _, _ in self.matches(self.learner)}, {"rust", "python"})
+        self.assertIn(newcomer.pk, matching.matcher)
+
+    def test_matches_brute_force_with_overrides(self):
+        # Both scoring paths: sorted postings only, then dense passes only
+        for sparse_below in (float("inf"), 0):
+            with self.subTest(sparse_below=sparse_below), \
+                    mock.patch.object(matching.Matcher, "SPARSE_BELOW", sparse_below):
+                self.check_against_brute_force()
+
+    def check_against_brute_force(self):
+        rng = random.Random(1)
+        engine = matching.Matcher()
+        engine.built_at = 0
+        users = [uuid.uuid4() for _ in range(200)]
+        skills = [uuid.uuid4() for _ in range(30)]
+        known, wanted = {}, {}
+        with mock.patch.object(matching.Matcher, "COMPACT_AT", 50), \
+                mock.patch.object(CustomUser.objects, "filter"), mock.patch.object(matching, "settings") as conf:
+            conf.MATCHING_RECIPROCITY = 0.5
+            for step in range(600):
+                user_id = rng.choice(users)
+                known[user_id] = set(rng.sample(skills, rng.randrange(4)))
+                wanted[user_id] = set(rng.sample(skills, rng.randrange(4)))
+                self.apply(engine, user_id, known[user_id], wanted[user_id])
+                if step % 50 == 49:
+                    learner = rng.choice(list(known))
+                    expected = self.brute_force(learner, known, wanted)
+                    found = [(m, round(score, 9)) for m, score, _ in engine.matches(learner, 5)]
+                    # Equal scores may come out in either order
+                    self.assertEqual([score for _, score in found], sorted(expected.values(), reverse=True)[:5])
+                    self.assertEqual(found, [(m, expected[m]) for m, _ in found])
+
+    def apply(self, engine, user_id, known, wanted):
+        with engine.lock:
+            pos = engine._pos.setdefault(user_id, len(engine._ids))
+            if pos == len(engine._ids):
+                engine._ids.append(user_id)
+                engine.can_mentor = np.concatenate([engine.can_mentor, [True]])
+            engine.known.set_row(pos, [engine._col(s) for s in known])
+            engine.wanted.set_row(pos, [engine._col(s) for s in wanted])
+            for relation in (engine.known, engine.wanted):
+                if len(relation.overrides) > engine.COMPACT_AT:
+                    relation.compact()
+
+    def brute_force(self, learner, known, wanted):
+        df = {}
+        for skills in known.values():
+            for skill in skills:
+                df[skill] = df.get(skill, 0) + 1
+
+        def coverage(want, have):
+            idf = {s: math.log((1 + len(known)) / (1 + df.get(s, 0))) + 1 for s in want}
+            return sum(idf[s] for s in want & have) / sum(idf.values()) if want else 0.0
+
+        scores = {}
+        for mentor in known:
+            primary = coverage(wanted[learner], known[mentor])
+            if mentor != learner and primary > 0:
+                scores[mentor] = round(primary + 0.5 * coverage(known[learner], wanted[mentor]), 9)
+        return scores
+
+
+class SkillGraphTests(TestCase):
+    def setUp(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        override = override_settings(SKILL_GRAPH_PATH=os.path.join(workdir, "graph", "skills.npz"))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.skills = {
+            name: Skill.objects.create(name=name, category=category)
+            for name, category in (("python", "dev"), ("django", "dev"), ("sql", "data"), ("rust", "dev"))
+        }
+        mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        users = [CustomUser.objects.create(username=f"u{i}", email=f"u{i}@example.com") for i in range(4)]
+        for user, known in zip(users, (["python", "django"], ["python", "sql"], ["python"], ["rust"])):
+            user.skills_known.set([self.skills[name] for name in known])
+        start = timezone.now() + timedelta(days=1)
+        session = Session.objects.create(
+            title="Django 101", description="", created_by=mentor, skill=self.skills["django"],
+            start_time=start, end_time=start + timedelta(hours=1), meeting_link="https://example.com/meet",
+        )
+        # Joining a django session puts django in u2's basket next to python
+        session.participants.add(users[2])
+
+    def pk(self, name):
+        return self.skills[name].pk
+
+    def test_counts_known_skills_and_participation(self):
+        graph = skillgraph.build(chunk_size=2)
+        self.assertEqual(graph.baskets, 4)
+        self.assertEqual(dict(zip(graph.skills, graph.df.tolist()))[self.pk("python")], 3)
+        ranked = graph.next_skills([self.pk("python")])
+        self.assertEqual([skill_id for skill_id, _ in ranked], [self.pk("django"), self.pk("sql")])
+        self.assertAlmostEqual(ranked[0][1], 2 / math.sqrt(3 * 2))
+        self.assertEqual(graph.next_skills([self.pk("python")], category="data"), [(self.pk("sql"), ranked[1][1])])
+        self.assertEqual(graph.next_skills([self.pk("rust")]), [])
+        self.assertEqual(graph.next_skills([uuid.uuid4()]), [])
+
+    def test_recommender_scores_from_the_graph(self):
+        graph = skillgraph.build()
+        ranked = recommender.score_user({self.pk("python")}, {self.pk("rust")}, graph)
+        self.assertEqual([skill_id for skill_id, _ in ranked], [self.pk("rust"), self.pk("django"), self.pk("sql")])
+        # One known skill and a full vote for rust: out of 2. django shares u0 and u2's session basket
+        for (_, score), expected in zip(ranked, (1 / 2, 2 / math.sqrt(3 * 2) / 2, 1 / math.sqrt(3 * 1) / 2)):
+            self.assertAlmostEqual(score, expected)
+        self.assertEqual(recommender.score_user({self.pk("python")}, set(), graph, limit=1), ranked[1:2])
+
+        out = io.StringIO()
+        call_command("materialize_recommendations", stdout=out)
+        self.assertIn("Built the skill graph", out.getvalue())
+        self.assertIsNotNone(skillgraph.current())
+        row = Recommendation.objects.get(user__username="u2", suggested_skill=self.skills["sql"])
+        self.assertAlmostEqual(row.confidence_score, 1 / math.sqrt(3 * 1) / 2)
+
+    def test_refresh_publishes_graph_and_popularity(self):
+        client = APIClient()
+        response = client.get("/api/skills/next/", {"skills": str(self.pk("python"))})
+        self.assertEqual(response.status_code, 503)
+        version = httpcache.version(Skill._meta.db_table)
+
+        graph, changed = skillgraph.refresh()
+        self.assertEqual(changed, 4)
+        self.assertNotEqual(httpcache.version(Skill._meta.db_table), version)
+        self.assertAlmostEqual(Skill.objects.get(name="python").popularity_score, 0.75)
+        self.assertEqual(skillgraph.refresh()[1], 0)
+
+        loaded = skillgraph.current()
+        self.assertEqual(loaded.skills, graph.skills)
+        self.assertEqual(loaded.next_skills([self.pk("python")]), graph.next_skills([self.pk("python")]))
+        response = client.get("/api/skills/next/", {"skills": f"{self.pk('python')},{self.pk('sql')}", "limit": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["name"] for r in response.json()["results"]], ["django"])
+        self.assertEqual(client.get("/api/skills/next/", {"skills": "nope"}).status_code, 400)
+        with mock.patch.object(ai_client, "get_client") as get_client:
+            get_client.return_value.recommend.return_value = {"mentors": [], "next_skills": ["guess"], "source": "ai"}
+            response = client.get("/api/recommendations/for-skill/", {"skill": "Python"})
+        self.assertEqual(response.json()["next_skills"], ["django", "sql"])
+        # Defaults to the caller's own skills
+        client.force_authenticate(CustomUser.objects.get(username="u3"))
+        self.assertEqual(client.get("/api/skills/next/").json()["results"], [])
+
+    def test_job_reschedules_itself(self):
+        skillgraph.schedule()
+        skillgraph.schedule()
+        self.assertEqual(Job.objects.filter(kind=skillgraph.JOB).count(), 1)
+        self.assertTrue(jobs.run(jobs.claim("test", [skillgraph.JOB])))
+        self.assertIsNotNone(skillgraph.current())
+        queued = Job.objects.get(kind=skillgraph.JOB, status="queued")
+        self.assertGreater(queued.run_after, timezone.now() + timedelta(hours=1))
+
+
+class MaterializeRecommendationsTests(TestCase):
+    def setUp(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        override = override_settings(SKILL_GRAPH_PATH=os.path.join(workdir, "skills.npz"))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.skills = {name: Skill.objects.create(name=name, category="dev") for name in ("python", "django", "sql")}
+        self.veteran = CustomUser.objects.create(username="veteran", email="veteran@example.com")
+        self.veteran.skills_known.set([self.skills["python"], self.skills["django"]])
+        self.newcomer = CustomUser.objects.create(username="newcomer", email="newcomer@example.com")
+        self.newcomer.skills_known.set([self.skills["python"]])
+        self.newcomer.skills_to_learn.set([self.skills["sql"]])
+        self.week_ago = timezone.now() - timedelta(days=7)
+        CustomUser.objects.filter(pk=self.veteran.pk).update(skills_updated_at=self.week_ago)
+
+    def materialize(self, **options):
+        out = io.StringIO()
+        call_command("materialize_recommendations", stdout=out, **options)
+        return out.getvalue()
+
+    def rows(self, user):
+        return list(
+            Recommendation.objects.filter(user=user)
+            .order_by("-confidence_score")
+            .values_list("suggested_skill__name", "confidence_score")
+        )
+
+    def test_writes_top_suggestions_per_user(self):
+        Recommendation.objects.create(user=self.newcomer, suggested_skill=self.skills["python"], confidence_score=1)
+        self.assertIn("Materialized 2 recommendations for 2 users", self.materialize(limit=2))
+        # Out of 2: a full vote for sql, and django's co-occurrence 1 / sqrt(2 * 1) with python
+        (sql, sql_score), (django, django_score) = self.rows(self.newcomer)
+        self.assertEqual((sql, django), ("sql", "django"))
+        self.assertAlmostEqual(sql_score, 0.5)
+        self.assertAlmostEqual(django_score, 1 / math.sqrt(2) / 2)
+        # Known skills are never suggested
+        self.assertEqual(self.rows(self.veteran), [])
+
+    def test_since_only_touches_users_changed_since(self):
+        stale = Recommendation.objects.create(user=self.veteran, suggested_skill=self.skills["sql"], confidence_score=1)
+        for since in ((self.week_ago + timedelta(days=1)).isoformat(), timezone.localdate().isoformat()):
+            with self.subTest(since=since):
+                self.assertIn("for 1 users", self.materialize(since=since))
+                self.assertTrue(Recommendation.objects.filter(pk=stale.pk).exists())
+                self.assertEqual(len(self.rows(self.newcomer)), 2)
+        self.assertIn("for 2 users", self.materialize(since=self.week_ago.isoformat()))
+        self.assertFalse(Recommendation.objects.filter(pk=stale.pk).exists())
+
+    def test_rejects_bad_since(self):
+        for since in ("soon", "2024-13-01", "2024-02-30", "2024-02-30T10:00", "2024-01-01T25:00"):
+            with self.subTest(since=since), self.assertRaisesMessage(CommandError, "Invalid --since value"):
+                self.materialize(since=since)
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        httpcache.responses.clear()
+        self.mentor = CustomUser.objects.create(username="mentor", email="mentor@example.com")
+        self.learner = CustomUser.objects.create(username="learner", email="learner@example.com")
+        skill = Skill.objects.create(name="Python", category="dev")
+        self.learner.skills_known.add(skill)
+        start = timezone.now() + timedelta(days=1)
+        self.sessions = [
+            Session.objects.create(
+                title=f"Session {i}", description="", created_by=self.mentor, skill=skill,
+                start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i, minutes=30),
+                meeting_link="https://example.com/meet",
+            )
+            for i in range(3)
+        ]
+        self.sessions[0].participants.add(self.learner)
+        for session in self.sessions[:2]:
+            Wishlist.objects.create(user=self.learner, session=session)
+        self.sync = APIClient()
+        self.sync.force_authenticate(self.learner)
+        self.auth = {"headers": {"Authorization": f"Bearer {RefreshToken.for_user(self.learner).access_token}"}}
+
+    async def walk(self, client, url, **extra):
+        """Every result of a paged async endpoint, following ``next``."""
+        results = []
+        while url:
+            page = (await client.get(url, **extra)).json()
+            results += page["results"]
+            url = page["next"]
+        return results
+
+    async def test_lists_match_the_sync_views(self):
+        client = AsyncClient()
+        for sync_url, async_url, extra in (
+            ("/api/sessions/", "/api/async/sessions/?page_size=2", {}),
+            ("/api/wishlist/mine/", "/api/async/wishlist/mine/?page_size=1", self.auth),
+            ("/api/skills/", "/api/async/skills/", {}),
+        ):
+            with self.subTest(url=async_url):
+                expected = (await sync_to_async(self.sync.get)(sync_url)).json()["results"]
+                self.assertEqual(await self.walk(client, async_url, **extra), expected)
+
+    async def test_session_detail_and_filters(self):
+        client = AsyncClient()
+        session = self.sessions[0]
+        response = await client.get(f"/api/async/sessions/{session.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["participants"], [str(self.learner.pk)])
+        self.assertEqual(response.json()["participant_count"], 1)
+        self.assertEqual((await client.get(f"/api/async/sessions/{uuid.uuid4()}/")).status_code, 404)
+        self.assertEqual((await client.get("/api/async/sessions/", {"created_by": "x"})).status_code, 400)
+        self.assertEqual((await client.get("/api/async/sessions/", {"cursor": "!!"})).status_code, 400)
+        mine = await client.get("/api/async/sessions/", {"created_by": str(self.learner.pk)})
+        self.assertEqual(mine.json()["results"], [])
+        self.assertEqual((await client.post("/api/async/sessions/")).status_code, 405)
+
+    async def test_dashboard_requires_a_token_and_uses_the_cache(self):
+        client = AsyncClient()
+        self.assertEqual((await client.get("/api/async/dashboard/")).status_code, 401)
+        bad = await client.get("/api/async/dashboard/", headers={"Authorization": "Bearer nope"})
+        self.assertEqual(bad.status_code, 401)
+        self.assertIn("WWW-Authenticate", bad)
+        first = await client.get("/api/async/dashboard/", **self.auth)
+        again = await client.get("/api/async/dashboard/", **self.auth)
+        self.assertEqual((first["X-Cache"], again["X-Cache"]), ("MISS", "HIT"))
+        self.assertEqual(first.json(), (await sync_to_async(self.sync.get)("/api/dashboard/")).json())
+        self.assertEqual(first.json()["sessions_joined"], 1)
+        self.assertEqual(first.json()["skills_known"], ["Python"])
+
+    async def test_skills_etag(self):
+        client = AsyncClient()
+        first = await client.get("/api/async/skills/")
+        self.assertEqual(first["ETag"], (await sync_to_async(self.sync.get)("/api/skills/"))["ETag"])
+        not_modified = await client.get("/api/async/skills/", headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(not_modified.status_code, 304)
+        await Skill.objects.acreate(name="Rust", category="dev")
+        changed = await client.get("/api/async/skills/", headers={"If-None-Match": first["ETag"]})
+        self.assertEqual([s["name"] for s in changed.json()["results"]], ["Python", "Rust"])
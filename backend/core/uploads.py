@@ -0,0 +1,206 @@
+"""Resumable, chunked uploads of session recordings.
+
+A client starts an upload with the total size, PUTs the file in order as raw
+``application/octet-stream`` chunks (``Upload-Offset`` says where each one starts,
+``X-Chunk-SHA256`` carries its digest) and finalizes once every byte has arrived.
+Chunks are streamed straight into a ``.part`` file in small blocks, so memory stays
+bounded whatever the recording size, and a failed or interrupted chunk is truncated
+away so the client can resume from the last acknowledged offset.
+
+Uploads left untouched for ``RECORDING_UPLOAD_TTL`` seconds are deleted with their
+part files by the ``uploads.expire`` job, which ``start`` queues and which requeues
+itself while uploads remain.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from . import jobs
+from .models import Job, RecordingUpload
+
+READ_BLOCK = 64 * 1024
+EXPIRE_JOB = "uploads.expire"
+
+
+class OffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_code = "offset_mismatch"
+
+    def __init__(self, upload, detail):
+        super().__init__(detail)
+        # Keep the offset numeric so clients can resume from it directly
+        self.detail = {"detail": self.detail, "offset": upload.offset}
+
+
+class ChunkTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Chunk exceeds RECORDING_UPLOAD_MAX_CHUNK."
+    default_code = "chunk_too_large"
+
+
+def part_path(upload):
+    return os.path.join(settings.RECORDING_UPLOAD_DIR, f"{upload.pk.hex}.part")
+
+
+def start(session, user, filename, size):
+    filename = os.path.basename(str(filename or "")).strip()
+    if not filename:
+        raise ValidationError({"filename": "This field is required."})
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise ValidationError({"size": "Total size in bytes is required."})
+    if size <= 0:
+        raise ValidationError({"size": "Must be positive."})
+    upload = RecordingUpload.objects.create(session=session, created_by=user, filename=filename, size=size)
+    os.makedirs(settings.RECORDING_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), "wb").close()
+    schedule_expiry()
+    return upload
+
+
+def append_chunk(upload, stream, offset, length, checksum):
+    """Write ``length`` bytes from ``stream`` at ``offset`` and advance the upload.
+
+    The chunk is hashed while it is written; on a short read or digest mismatch the
+    part file is truncated back to ``offset`` and the upload does not move.
+    """
+    if offset != upload.offset:
+        raise OffsetMismatch(upload, "Chunk does not start at the current offset.")
+    if length <= 0:
+        raise ValidationError({"detail": "Empty chunk."})
+    if length > settings.RECORDING_UPLOAD_MAX_CHUNK:
+        raise ChunkTooLarge()
+    if offset + length > upload.size:
+        raise ValidationError({"detail": "Chunk runs past the declared size."})
+    if not checksum:
+        raise ValidationError({"detail": "X-Chunk-SHA256 header is required."})
+
+    digest = hashlib.sha256()
+    received = 0
+    with open(part_path(upload), "r+b") as fh:
+        # Drop whatever an interrupted earlier attempt left past the offset
+        fh.truncate(offset)
+        fh.seek(offset)
+        while received < length:
+            block = stream.read(min(READ_BLOCK, length - received))
+            if not block:
+                break
+            digest.update(block)
+            fh.write(block)
+            received += len(block)
+        if received != length or digest.hexdigest() != checksum.strip().lower():
+            fh.truncate(offset)
+            raise ValidationError({"detail": "Chunk checksum mismatch."})
+
+    # Conditional update: of two racing PUTs for the same offset only one advances it
+    advanced = RecordingUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=offset + length, updated_at=timezone.now()
+    )
+    if not advanced:
+        upload.refresh_from_db(fields=["offset"])
+        raise OffsetMismatch(upload, "Upload advanced concurrently.")
+    upload.offset = offset + length
+    return upload
+
+
+def finalize(upload):
+    """Move the assembled file into ``session.recording_file`` and drop the upload."""
+    if upload.offset != upload.size:
+        raise OffsetMismatch(upload, "Upload is incomplete.")
+    # Conditional update, as for chunks: of two racing finalize calls only one proceeds
+    claimed = RecordingUpload.objects.filter(pk=upload.pk, offset=upload.size, finalizing=False).update(
+        finalizing=True
+    )
+    if not claimed:
+        raise OffsetMismatch(upload, "Upload is already being finalized.")
+    try:
+        return _finalize(upload)
+    except BaseException:
+        RecordingUpload.objects.filter(pk=upload.pk).update(finalizing=False)
+        raise
+
+
+def _finalize(upload):
+    session = upload.session
+    field = session.recording_file.field
+    storage = field.storage
+    name = field.generate_filename(session, upload.filename)
+    src = part_path(upload)
+    try:
+        dest = storage.path(storage.get_available_name(name))
+    except NotImplementedError:
+        # Remote storage: stream the part file up in File.DEFAULT_CHUNK_SIZE pieces
+        with open(src, "rb") as fh:
+            name = storage.save(name, File(fh, name=upload.filename))
+        os.remove(src)
+    else:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        # A rename when the part file is on the same filesystem, a copy otherwise
+        shutil.move(src, dest)
+        name = os.path.relpath(dest, storage.location).replace(os.sep, "/")
+
+    session.recording_file.name = name
+    session.is_recorded = True
+    session.save(update_fields=["recording_file", "is_recorded"])
+    upload.delete()
+    return session
+
+
+def discard(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def expire(now=None):
+    """Discard uploads idle for ``RECORDING_UPLOAD_TTL`` and part files no upload owns.
+
+    Returns the number of uploads and orphan part files removed.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.RECORDING_UPLOAD_TTL)
+    removed = 0
+    for upload in RecordingUpload.objects.filter(updated_at__lt=cutoff, finalizing=False):
+        discard(upload)
+        removed += 1
+    try:
+        names = os.listdir(settings.RECORDING_UPLOAD_DIR)
+    except FileNotFoundError:
+        return removed
+    live = {pk.hex for pk in RecordingUpload.objects.values_list("pk", flat=True)}
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        path = os.path.join(settings.RECORDING_UPLOAD_DIR, name)
+        try:
+            orphan = ext == ".part" and uuid.UUID(stem).hex not in live
+            # Recent files may belong to an upload created since ``live`` was read
+            if orphan and os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+                removed += 1
+        except (ValueError, FileNotFoundError):
+            continue
+    return removed
+
+
+def schedule_expiry(delay=None):
+    """Queue an ``uploads.expire`` run unless one is already queued."""
+    if not Job.objects.filter(kind=EXPIRE_JOB, status="queued").exists():
+        jobs.enqueue(EXPIRE_JOB, delay=delay or timedelta(seconds=settings.RECORDING_UPLOAD_TTL))
+
+
+@jobs.handler(EXPIRE_JOB, on_failure=lambda payload: schedule_expiry())
+def run_expiry(payload):
+    expire()
+    if RecordingUpload.objects.exists():
+        schedule_expiry()
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
+from . import async_views
 from .views import CustomTokenObtainPairView, MentorMeView
 from .views import (
     SkillViewSet,
@@ -16,6 +17,7 @@ from .views import (
     WishlistViewSet,
     RegisterView,
     DashboardView,
+    LeaderboardView,
 )
 
 router = DefaultRouter()
@@ -34,10 +36,17 @@ urlpatterns = [
     path("login/", CustomTokenObtainPairView.as_view(), name="login"),
     path("register/", RegisterView.as_view(), name="register"),
     path("dashboard/", DashboardView.as_view(), name="dashboard"),
+    path("leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
     path("mentors/me/", MentorMeView.as_view(), name="mentor_me"),
 
     # Also expose standard JWT paths
     path("auth/token/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    # Async reads for ASGI servers (see core.async_views)
+    path("async/sessions/", async_views.session_list, name="async-session-list"),
+    path("async/sessions/<uuid:pk>/", async_views.session_detail, name="async-session-detail"),
+    path("async/dashboard/", async_views.dashboard_view, name="async-dashboard"),
+    path("async/wishlist/mine/", async_views.wishlist_mine, name="async-wishlist-mine"),
+    path("async/skills/", async_views.skill_list, name="async-skill-list"),
     path("", include(router.urls)),
 ]
@@ -1,12 +1,22 @@
-from rest_framework import viewsets, permissions, status, filters
+from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.decorators import action
-from django.db.models import Count
-from .models import Skill, Badge, Session, Certificate, Feedback, Recommendation, CustomUser, Wishlist
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DurationField, F, Sum, Value, When
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import ai_client, dashboard, leaderboard, matching, media, playback, schedule, skillgraph, uploads
+from .httpcache import CachedListMixin
+from .models import Skill, Badge, Session, Certificate, Feedback, Recommendation, CustomUser, Wishlist, RecordingUpload
+from .search import FullTextSearchFilter
 from .serializers import (
     SkillSerializer,
     BadgeSerializer,
@@ -15,6 +25,7 @@ from .serializers import (
     FeedbackSerializer,
     RecommendationSerializer,
     UserSerializer,
+    MenteeSerializer,
     RegisterSerializer,
     WishlistSerializer,
     CustomTokenObtainPairSerializer,
@@ -25,17 +36,55 @@ class DefaultPermission(permissions.IsAuthenticatedOrReadOnly):
     pass
 
 
-class SkillViewSet(viewsets.ModelViewSet):
+class SkillViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Skill.objects.all().order_by("name")
+    cache_table = Skill._meta.db_table
     serializer_class = SkillSerializer
     permission_classes = [DefaultPermission]
-    filter_backends = [filters.SearchFilter]
+    cursor_ordering = ("name",)
+    filter_backends = [FullTextSearchFilter]
+    search_index = "skill"
+    # Used by the icontains fallback when no full-text index is available
     search_fields = ["name", "description", "category"]
 
+    @action(detail=False, methods=["get"], url_path="next")
+    def next(self, request):
+        """What to learn next after ``?skills=<id>,<id>`` (default: your skills_known), from
+        the co-occurrence graph (see core.skillgraph). ``?category=`` narrows the results."""
+        try:
+            limit = min(max(int(request.query_params.get("limit", 5)), 1), 50)
+            raw = request.query_params.get("skills", "")
+            skill_ids = [uuid.UUID(s) for s in raw.split(",") if s.strip()]
+        except ValueError:
+            return Response({"detail": "Invalid skills or limit."}, status=status.HTTP_400_BAD_REQUEST)
+        if not raw and request.user.is_authenticated:
+            skill_ids = list(request.user.skills_known.values_list("pk", flat=True))
+        graph = skillgraph.current()
+        if graph is None:
+            return Response({"detail": "Skill graph not built yet."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        found = graph.next_skills(skill_ids, limit, request.query_params.get("category") or None)
+        skills = Skill.objects.in_bulk([skill_id for skill_id, _ in found])
+        return Response({
+            "built_at": graph.built_at,
+            "results": [
+                {
+                    "id": skill_id,
+                    "name": skills[skill_id].name,
+                    "category": skills[skill_id].category,
+                    "score": round(score, 4),
+                }
+                for skill_id, score in found
+                # Deleted since the graph was built
+                if skill_id in skills
+            ],
+        })
 
-class BadgeViewSet(viewsets.ModelViewSet):
+
+class BadgeViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Badge.objects.all().order_by("name")
+    cache_table = Badge._meta.db_table
     serializer_class = BadgeSerializer
+    cursor_ordering = ("name",)
     permission_classes = [DefaultPermission]
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated], url_path="mine")
@@ -54,6 +103,7 @@ class WishlistViewSet(viewsets.ModelViewSet):
     queryset = Wishlist.objects.select_related("user", "session", "session__created_by")
     serializer_class = WishlistSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("-created_at", "id")
 
     def get_queryset(self):
         return Wishlist.objects.select_related("session", "session__created_by").filter(user=self.request.user)
@@ -61,6 +111,10 @@ class WishlistViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="mine")
     def mine(self, request):
         qs = self.get_queryset()
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            ser = self.get_serializer(page, many=True)
+            return self.get_paginated_response(ser.data)
         ser = self.get_serializer(qs, many=True)
         return Response(ser.data)
 
@@ -87,7 +141,9 @@ class SessionViewSet(viewsets.ModelViewSet):
     queryset = Session.objects.select_related("skill", "created_by").prefetch_related("participants")
     serializer_class = SessionSerializer
     permission_classes = [DefaultPermission]
-    filter_backends = [filters.SearchFilter]
+    cursor_ordering = ("start_time", "id")
+    filter_backends = [FullTextSearchFilter]
+    search_index = "session"
     search_fields = ["title", "description", "skill__name"]
 
     def get_queryset(self):
@@ -115,20 +171,56 @@ class SessionViewSet(viewsets.ModelViewSet):
         ser = self.get_serializer(qs, many=True)
         return Response(ser.data)
 
-    @action(detail=True, methods=["post"], url_path="upload_video")
-    def upload_video(self, request, pk=None):
+    @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated], url_path="join")
+    def join(self, request, pk=None):
         session = self.get_object()
-        user = request.user
+        if not session.participants.filter(pk=request.user.pk).exists():
+            schedule.check([request.user], session.start_time, session.end_time, exclude=session.pk)
+            with transaction.atomic():
+                session.participants.add(request.user)
+                schedule.recheck([request.user], session)
+            session = self.get_object()
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=False, methods=["get"], url_path="free-slots")
+    def free_slots(self, request):
+        params = request.query_params
+        user_id = params.get("user") or (request.user.pk if request.user.is_authenticated else None)
+        if not user_id:
+            return Response({"detail": "user is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            user_id = uuid.UUID(str(user_id))
+            start = parse_datetime(params["start"]) if params.get("start") else timezone.now()
+            end = parse_datetime(params["end"]) if params.get("end") else start and start + timedelta(days=7)
+            length = timedelta(minutes=int(params.get("duration", 30)))
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({"detail": "Invalid user, start, end or duration."}, status=status.HTTP_400_BAD_REQUEST)
+        start, end = (timezone.make_aware(t) if timezone.is_naive(t) else t for t in (start, end))
+        if not timedelta(0) < end - start <= timedelta(days=31) or length <= timedelta(0):
+            return Response(
+                {"detail": "end must be after start, at most 31 days later, and duration positive."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not CustomUser.objects.filter(pk=user_id).exists():
+            return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+        slots = schedule.free_slots(user_id, start, end, length)
+        return Response({
+            "user": user_id,
+            "start": start,
+            "end": end,
+            "slots": [{"start": slot_start, "end": slot_end} for slot_start, slot_end in slots],
+        })
+
+    def _recording_denied(self, session, user):
         if not user.is_authenticated:
             return Response({"detail": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
         if not (user.is_staff or session.created_by_id == user.id):
             return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
-        file = request.FILES.get("video")
-        if not file:
-            return Response({"detail": "No file uploaded. Use 'video' field."}, status=status.HTTP_400_BAD_REQUEST)
-        session.recording_file = file
-        session.is_recorded = True
-        session.save()
+        return None
+
+    def _recording_response(self, request, session):
         # Provide absolute URL if possible
         file_url = getattr(session.recording_file, 'url', None)
         if file_url and request:
@@ -140,13 +232,89 @@ class SessionViewSet(viewsets.ModelViewSet):
             "id": str(session.id),
             "recording_file": file_url,
             "is_recorded": session.is_recorded,
+            "processing_status": session.processing_status,
         })
 
+    @action(detail=True, methods=["post"], url_path="upload_video")
+    def upload_video(self, request, pk=None):
+        session = self.get_object()
+        denied = self._recording_denied(session, request.user)
+        if denied:
+            return denied
+        file = request.FILES.get("video")
+        if not file:
+            return Response({"detail": "No file uploaded. Use 'video' field."}, status=status.HTTP_400_BAD_REQUEST)
+        session.recording_file = file
+        session.is_recorded = True
+        session.save()
+        # Renditions, HLS and the poster are made by `manage.py run_worker`
+        media.enqueue_processing(session)
+        return self._recording_response(request, session)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="recording",
+        content_negotiation_class=playback.IgnoreAcceptNegotiation,
+    )
+    def recording(self, request, pk=None):
+        # Hit on every seek, so skip the list queryset's joins and prefetches
+        session = get_object_or_404(Session.objects.only("id", "recording_file"), pk=pk)
+        return playback.recording_response(request, session)
+
+    # Resumable upload: POST uploads/ -> PUT uploads/<id>/ per chunk -> POST uploads/<id>/finalize/.
+    # Large recordings should use this instead of upload_video; see core.uploads.
+
+    @action(detail=True, methods=["post"], url_path="uploads")
+    def start_upload(self, request, pk=None):
+        session = self.get_object()
+        denied = self._recording_denied(session, request.user)
+        if denied:
+            return denied
+        upload = uploads.start(session, request.user, request.data.get("filename"), request.data.get("size"))
+        return Response(
+            {"id": str(upload.id), "offset": upload.offset, "size": upload.size,
+             "max_chunk": settings.RECORDING_UPLOAD_MAX_CHUNK},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=True, methods=["get", "put", "delete"], url_path=r"uploads/(?P<upload_id>[0-9a-f-]+)")
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        session = self.get_object()
+        denied = self._recording_denied(session, request.user)
+        if denied:
+            return denied
+        upload = get_object_or_404(RecordingUpload, pk=upload_id, session=session)
+        if request.method == "DELETE":
+            uploads.discard(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == "PUT":
+            try:
+                offset = int(request.headers.get("Upload-Offset", ""))
+                length = int(request.META.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                return Response({"detail": "Upload-Offset header is required."}, status=status.HTTP_400_BAD_REQUEST)
+            # Read the raw body; request.data would run the parsers over the whole chunk
+            uploads.append_chunk(upload, request.stream, offset, length, request.headers.get("X-Chunk-SHA256"))
+        return Response({"id": str(upload.id), "offset": upload.offset, "size": upload.size})
+
+    @action(detail=True, methods=["post"], url_path=r"uploads/(?P<upload_id>[0-9a-f-]+)/finalize")
+    def finalize_upload(self, request, pk=None, upload_id=None):
+        session = self.get_object()
+        denied = self._recording_denied(session, request.user)
+        if denied:
+            return denied
+        upload = get_object_or_404(RecordingUpload, pk=upload_id, session=session)
+        session = uploads.finalize(upload)
+        media.enqueue_processing(session)
+        return self._recording_response(request, session)
+
 
 class CertificateViewSet(viewsets.ModelViewSet):
     queryset = Certificate.objects.select_related("user", "skill")
     serializer_class = CertificateSerializer
     permission_classes = [DefaultPermission]
+    cursor_ordering = ("-issue_date", "id")
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated], url_path="mine")
     def mine(self, request):
@@ -165,18 +333,42 @@ class FeedbackViewSet(viewsets.ModelViewSet):
     queryset = Feedback.objects.select_related("session", "given_by")
     serializer_class = FeedbackSerializer
     permission_classes = [DefaultPermission]
+    cursor_ordering = ("-created_at", "id")
 
 
 class RecommendationViewSet(viewsets.ModelViewSet):
     queryset = Recommendation.objects.select_related("user", "suggested_skill")
     serializer_class = RecommendationSerializer
     permission_classes = [DefaultPermission]
+    cursor_ordering = ("-confidence_score", "id")
+
+    @action(detail=False, methods=["get"], url_path="for-skill")
+    def for_skill(self, request):
+        skill = request.query_params.get("skill", "").strip()
+        if not skill:
+            return Response({"detail": "skill is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            top_k = min(max(int(request.query_params.get("top_k", 5)), 1), 50)
+        except ValueError:
+            return Response({"detail": "top_k must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user if request.user.is_authenticated else None
+        data = ai_client.get_client().recommend(skill, top_k, user=user)
+        graph = skillgraph.current()
+        target = Skill.objects.filter(name__iexact=skill).values_list("pk", flat=True).first()
+        if graph is not None and target is not None:
+            # The co-occurrence graph knows the catalog; the service only guesses from text
+            seeds = [target, *(user.skills_known.values_list("pk", flat=True) if user else ())]
+            found = [skill_id for skill_id, _ in graph.next_skills(seeds, top_k)]
+            names = dict(Skill.objects.filter(pk__in=found).values_list("pk", "name"))
+            data["next_skills"] = [names[skill_id] for skill_id in found if skill_id in names]
+        return Response(data)
 
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = CustomUser.objects.all()
+    queryset = UserSerializer.setup_eager_loading(CustomUser.objects.all())
     serializer_class = UserSerializer
     permission_classes = [DefaultPermission]
+    cursor_ordering = ("username",)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -188,16 +380,75 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(role=role)
         return qs
 
+    @action(detail=True, methods=["get"], url_path="matches")
+    def matches(self, request, pk=None):
+        """Best mentors for this user's skills_to_learn (see core.matching)."""
+        try:
+            user_id = uuid.UUID(str(pk))
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            return Response({"detail": "Invalid user or limit."}, status=status.HTTP_400_BAD_REQUEST)
+        engine = matching.matcher.fresh()
+        found = engine.matches(user_id, limit)
+        if found is None:
+            # Created by another process since the last rebuild: score from the database,
+            # leaving the engine to the signals and the next rebuild
+            user = CustomUser.objects.filter(pk=user_id).first()
+            if user is None:
+                return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+            wanted = user.skills_to_learn.values_list("pk", flat=True)
+            found = engine.matches_for(wanted, user.skills_known.values_list("pk", flat=True), limit)
+        usernames = dict(CustomUser.objects.filter(pk__in=[m for m, _, _ in found]).values_list("pk", "username"))
+        skill_names = dict(
+            Skill.objects.filter(pk__in={s for _, _, skills in found for s in skills}).values_list("pk", "name")
+        )
+        return Response({
+            "user": user_id,
+            "results": [
+                {
+                    "user_id": mentor_id,
+                    "username": usernames.get(mentor_id),
+                    "score": round(score, 4),
+                    "skills": [{"id": s, "name": skill_names.get(s)} for s in skills],
+                }
+                for mentor_id, score, skills in found
+            ],
+        })
+
 
 class MenteeViewSet(viewsets.ModelViewSet):
-    queryset = CustomUser.objects.all()
+    queryset = UserSerializer.setup_eager_loading(CustomUser.objects.all())
     serializer_class = UserSerializer
     permission_classes = [DefaultPermission]
+    cursor_ordering = ("username",)
+
+    # ?ordering= for mine; the Mentorship indexes cover recent and engaged
+    mine_orderings = {
+        "username": ("username",),
+        "recent": ("-last_session_at", "id"),
+        "engaged": ("-session_count", "id"),
+    }
+
+    def get_serializer_class(self):
+        return MenteeSerializer if self.action == "mine" else super().get_serializer_class()
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated], url_path="mine")
     def mine(self, request):
-        mentor = request.user
-        mentees = CustomUser.objects.filter(sessions_joined__created_by=mentor).distinct()
+        ordering = request.query_params.get("ordering", "username")
+        if ordering not in self.mine_orderings:
+            return Response(
+                {"detail": f"ordering must be one of {', '.join(self.mine_orderings)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        self.cursor_ordering = self.mine_orderings[ordering]
+        # One edge per mentee (core.mentorship), so no DISTINCT over the participant rows
+        mentees = UserSerializer.setup_eager_loading(
+            CustomUser.objects.filter(mentor_links__mentor=request.user).annotate(
+                first_session_at=F("mentor_links__first_session_at"),
+                last_session_at=F("mentor_links__last_session_at"),
+                session_count=F("mentor_links__session_count"),
+            )
+        )
         page = self.paginate_queryset(mentees)
         if page is not None:
             ser = self.get_serializer(page, many=True)
@@ -229,47 +480,44 @@ class DashboardView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user: CustomUser = request.user
-        points = user.points
-        badges = list(user.badges.values("id", "name"))
-        sessions_created = user.sessions_created.count()
-        sessions_joined = user.sessions_joined.count()
-        skills_known = list(user.skills_known.values_list("name", flat=True))
-        skills_to_learn = list(user.skills_to_learn.values_list("name", flat=True))
-        # Distinct mentees taught by this mentor (participants in sessions created by the user)
-        total_mentees = (
-            CustomUser.objects.filter(sessions_joined__created_by=user).distinct().count()
-        )
+        payload, hit = dashboard.get_payload(request.user.pk)
+        response = Response(payload)
+        response["X-Cache"] = "HIT" if hit else "MISS"
+        return response
 
-        # Simple sample stats for charts
-        stats = {
-            "weekly_learning_hours": [
-                {"day": "Mon", "hours": 1.5},
-                {"day": "Tue", "hours": 0.5},
-                {"day": "Wed", "hours": 2.0},
-                {"day": "Thu", "hours": 1.0},
-                {"day": "Fri", "hours": 0.0},
-                {"day": "Sat", "hours": 2.5},
-                {"day": "Sun", "hours": 1.0},
-            ],
-            "top_skills": [
-                {"skill": s, "value": 1} for s in skills_known[:5]
-            ],
-        }
 
-        return Response(
-            {
-                "role": user.role,
-                "points": points,
-                "badges": badges,
-                "sessions_created": sessions_created,
-                "sessions_joined": sessions_joined,
-                "total_mentees": total_mentees,
-                "skills_known": skills_known,
-                "skills_to_learn": skills_to_learn,
-                "stats": stats,
-            }
-        )
+class LeaderboardView(APIView):
+    """Top users by points, globally or among those who know ``?skill=<id>``."""
+
+    permission_classes = [DefaultPermission]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            skill_id = uuid.UUID(params["skill"]) if params.get("skill") else None
+            limit = min(max(int(params.get("limit", 10)), 1), 100)
+            offset = max(int(params.get("offset", 0)), 0)
+        except ValueError:
+            return Response({"detail": "Invalid skill, limit or offset."}, status=status.HTTP_400_BAD_REQUEST)
+
+        boards = leaderboard.boards.fresh()
+        with boards.lock:
+            board = boards.board(skill_id)
+            rows = board.top(limit, offset)
+            total = len(board)
+            me = None
+            if request.user.is_authenticated and request.user.pk in board:
+                me = {"rank": board.rank(request.user.pk), "points": board.score(request.user.pk)}
+        usernames = dict(CustomUser.objects.filter(pk__in=[user_id for _, user_id, _ in rows]).values_list("pk", "username"))
+        return Response({
+            "skill": skill_id,
+            "total": total,
+            "results": [
+                {"rank": rank, "user_id": user_id, "username": usernames.get(user_id), "points": points}
+                for rank, user_id, points in rows
+            ],
+            "me": me,
+        })
 
 # Create your views here.
 
@@ -278,6 +526,20 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
+def seconds_taught(user):
+    """Total length of the sessions ``user`` created, computed by the database.
+
+    Sessions whose end is not after their start count as zero, as before.
+    """
+    duration = Case(
+        When(end_time__gt=F("start_time"), then=F("end_time") - F("start_time")),
+        default=Value(timedelta(0)),
+        output_field=DurationField(),
+    )
+    total = Session.objects.filter(created_by=user).aggregate(total=Sum(duration))["total"]
+    return total.total_seconds() if total else 0
+
+
 class MentorMeView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -290,16 +552,7 @@ class MentorMeView(APIView):
             return Response({"detail": "Not a mentor"}, status=status.HTTP_403_FORBIDDEN)
 
         # Sum hours taught based on sessions created durations
-        sessions = Session.objects.filter(created_by=user)
-        total_seconds = 0
-        for s in sessions:
-            try:
-                if s.start_time and s.end_time:
-                    delta = s.end_time - s.start_time
-                    total_seconds += max(0, int(delta.total_seconds()))
-            except Exception:
-                pass
-        total_hours = int(round(total_seconds / 3600))
+        total_hours = int(round(seconds_taught(user) / 3600))
 
         avatar_url = None
         try:
@@ -129,6 +129,32 @@ else:
     }
 
 
+# Cache
+# LocMem by default; point REDIS_URL at a Redis-compatible server in production
+
+REDIS_URL = env("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds a per-user dashboard payload may be served from cache
+DASHBOARD_CACHE_TIMEOUT = env.int("DASHBOARD_CACHE_TIMEOUT", default=300)
+# In-process cache of rendered skill/badge lists (core.httpcache)
+CATALOG_CACHE_TTL = env.int("CATALOG_CACHE_TTL", default=300)
+CATALOG_CACHE_MAX_BYTES = env.int("CATALOG_CACHE_MAX_BYTES", default=8 * 1024 * 1024)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -167,6 +193,54 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Chunked recording uploads (core.uploads): where partial files are assembled, and
+# the largest chunk a single PUT may carry
+RECORDING_UPLOAD_DIR = env("RECORDING_UPLOAD_DIR", default=str(MEDIA_ROOT / "uploads"))
+RECORDING_UPLOAD_MAX_CHUNK = env.int("RECORDING_UPLOAD_MAX_CHUNK", default=16 * 1024 * 1024)
+# Seconds without a chunk before an upload and its part file are discarded
+RECORDING_UPLOAD_TTL = env.int("RECORDING_UPLOAD_TTL", default=24 * 3600)
+# When set (e.g. "/protected-media"), recording playback answers with X-Accel-Redirect
+# to this internal nginx location instead of streaming the file from Python
+RECORDING_ACCEL_REDIRECT = env("RECORDING_ACCEL_REDIRECT", default="")
+
+# Recording processing jobs (core.media), run by `manage.py run_worker`
+FFMPEG_BINARY = env("FFMPEG_BINARY", default="ffmpeg")
+FFPROBE_BINARY = env("FFPROBE_BINARY", default="ffprobe")
+# (height, video kbps) per rendition; heights at or above the source's are skipped
+MEDIA_RENDITIONS = [(360, 800), (720, 2500), (1080, 5000)]
+HLS_SEGMENT_SECONDS = env.int("HLS_SEGMENT_SECONDS", default=6)
+
+# Points per gamification event (core.gamification)
+GAMIFICATION_POINTS = {
+    "session_created": 10,
+    "session_joined": 5,
+    "feedback_given": 2,
+    "certificate_issued": 25,
+}
+
+# Seconds before the in-process leaderboards (core.leaderboard) are rebuilt to pick up
+# points changed by other processes
+LEADERBOARD_REFRESH = env.int("LEADERBOARD_REFRESH", default=300)
+
+# In-process mentor matching (core.matching): seconds before a full rebuild picks up
+# other processes' changes, and the weight of the mentor wanting what the learner knows
+MATCHING_REFRESH = env.int("MATCHING_REFRESH", default=300)
+MATCHING_RECIPROCITY = env.float("MATCHING_RECIPROCITY", default=0.25)
+
+# Skill co-occurrence graph (core.skillgraph): where the `skills.graph` job publishes it,
+# and seconds between its runs
+SKILL_GRAPH_PATH = env("SKILL_GRAPH_PATH", default="") or str(BASE_DIR / "data" / "skill_graph.npz")
+SKILL_GRAPH_REFRESH = env.int("SKILL_GRAPH_REFRESH", default=6 * 3600)
+
+# AI service client (core.ai_client)
+AI_SERVICE_URL = env("AI_SERVICE_URL", default="http://localhost:8001")
+# Seconds one call may take, retries included
+AI_SERVICE_TIMEOUT = env.float("AI_SERVICE_TIMEOUT", default=2.0)
+AI_SERVICE_RETRIES = env.int("AI_SERVICE_RETRIES", default=2)
+# Consecutive failed calls that open the breaker, and seconds before a trial call
+AI_SERVICE_BREAKER_THRESHOLD = env.int("AI_SERVICE_BREAKER_THRESHOLD", default=5)
+AI_SERVICE_BREAKER_RESET = env.float("AI_SERVICE_BREAKER_RESET", default=30.0)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -179,6 +253,8 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.KeysetPagination",
+    "PAGE_SIZE": 20,
 }
 
 SPECTACULAR_SETTINGS = {
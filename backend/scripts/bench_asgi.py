@@ -0,0 +1,165 @@
+"""Sync WSGI versus async ASGI serving of the hot read endpoints, at high concurrency.
+
+Seeds a throwaway mentor, learner and SESSIONS sessions (deleted again at the end),
+then for each mode starts a server, drives it with --concurrency keep-alive clients
+for --duration seconds and reports requests/s, p50/p99 latency and failures. Every
+client cycles through the session list and detail, dashboard, wishlist and skills.
+
+- ``wsgi``: the DRF views under gunicorn (gthread workers), or under uvicorn's WSGI
+  adapter when gunicorn is not installed
+- ``asgi-sync``: the same DRF views under uvicorn, which Django runs in threads
+- ``asgi``: the ``/api/async/`` views (core.async_views) under uvicorn
+
+    DB_ENGINE=sqlite python scripts/bench_asgi.py --concurrency 1000 --duration 20
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import django
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "peerverse.settings")
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from core.models import CustomUser, Session, Skill, Wishlist  # noqa: E402
+
+MODES = ("wsgi", "asgi-sync", "asgi")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_command(mode, port, workers, threads):
+    if mode == "wsgi" and importlib.util.find_spec("gunicorn"):
+        return [
+            sys.executable, "-m", "gunicorn", "peerverse.wsgi", "-b", f"127.0.0.1:{port}",
+            "-w", str(workers), "-k", "gthread", "--threads", str(threads), "--log-level", "warning",
+        ]
+    app = "peerverse.wsgi:application" if mode == "wsgi" else "peerverse.asgi:application"
+    return [
+        sys.executable, "-m", "uvicorn", app, "--port", str(port), "--workers", str(workers),
+        "--interface", "wsgi" if mode == "wsgi" else "asgi3", "--log-level", "warning", "--no-access-log",
+    ]
+
+
+def seed(sessions):
+    mentor = CustomUser.objects.create(username="bench-mentor", email="bench-mentor@example.com")
+    learner = CustomUser.objects.create(username="bench-learner", email="bench-learner@example.com")
+    skill = Skill.objects.create(name="bench-skill", category="bench")
+    learner.skills_known.add(skill)
+    start = timezone.now() + timedelta(days=1)
+    rows = Session.objects.bulk_create([
+        Session(
+            title=f"Session {i}", description="", created_by=mentor, skill=skill,
+            start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i, minutes=30),
+            meeting_link="https://example.com/meet",
+        )
+        for i in range(sessions)
+    ])
+    Wishlist.objects.bulk_create([Wishlist(user=learner, session=session) for session in rows[:20]])
+    return mentor, learner, skill, rows
+
+
+async def load(url, paths, token, concurrency, duration):
+    latencies, failures = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=url, limits=limits, headers=headers, timeout=60) as client:
+
+        async def worker(i):
+            nonlocal failures
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    r = await client.get(paths[i % len(paths)])
+                    ok = r.status_code == 200
+                except httpx.TransportError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    failures += 1
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    if not latencies:
+        return 0, float("nan"), float("nan"), failures
+    return len(latencies) / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--threads", type=int, default=32, help="Threads per gunicorn worker.")
+    parser.add_argument("--sessions", type=int, default=500)
+    args = parser.parse_args()
+
+    mentor, learner, skill, sessions = seed(args.sessions)
+    token = str(RefreshToken.for_user(learner).access_token)
+    endpoints = [
+        "sessions/?page_size=20",
+        f"sessions/{sessions[len(sessions) // 2].pk}/",
+        "dashboard/",
+        "wishlist/mine/",
+        "skills/",
+    ]
+    print(
+        f"{args.concurrency} concurrent clients, {args.workers} server workers, {os.cpu_count()} CPUs, "
+        f"{django.db.connection.vendor}"
+    )
+    print(f"{'mode':>10} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'failed':>9}")
+    try:
+        for mode in args.modes:
+            prefix = "/api/async/" if mode == "asgi" else "/api/"
+            paths = [prefix + endpoint for endpoint in endpoints]
+            port = free_port()
+            server = subprocess.Popen(
+                server_command(mode, port, args.workers, args.threads),
+                cwd=BACKEND_DIR,
+                # DEBUG keeps every query in memory and renders errors as HTML
+                env={**os.environ, "DJANGO_DEBUG": "false"},
+            )
+            url = f"http://127.0.0.1:{port}"
+            try:
+                for _ in range(600):
+                    try:
+                        httpx.get(f"{url}/api/skills/")
+                        break
+                    except httpx.TransportError:
+                        time.sleep(0.1)
+                asyncio.run(load(url, paths, token, 10, 1.0))
+                rps, p50, p99, failed = asyncio.run(load(url, paths, token, args.concurrency, args.duration))
+                print(f"{mode:>10} {rps:>9.0f} {p50:>9.1f} {p99:>9.1f} {failed:>9}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        Session.objects.filter(pk__in=[s.pk for s in sessions]).delete()
+        CustomUser.objects.filter(pk__in=[mentor.pk, learner.pk]).delete()
+        skill.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Time core.matching on a synthetic population, without touching the database.
+
+USERS users each know 1-8 and want 1-4 of SKILLS skills, drawn with a Zipf-like
+popularity so a few skills have very long postings lists. Reports the time to build
+the relations, the latency of matches() for random learners, and of update-sized
+row changes (including the compaction they trigger).
+
+    DB_ENGINE=sqlite python scripts/bench_matching.py
+"""
+import os
+import sys
+import time
+import uuid
+
+import django
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "peerverse.settings")
+django.setup()
+
+from core import matching  # noqa: E402
+
+USERS = int(os.getenv("USERS", "1000000"))
+SKILLS = int(os.getenv("SKILLS", "2000"))
+QUERIES = int(os.getenv("QUERIES", "200"))
+rng = np.random.default_rng(0)
+
+popularity = 1 / np.arange(1, SKILLS + 1) ** 0.8
+popularity /= popularity.sum()
+
+
+def relation(low, high):
+    counts = rng.integers(low, high + 1, USERS)
+    users = np.repeat(np.arange(USERS, dtype=np.int32), counts)
+    skills = rng.choice(SKILLS, size=len(users), p=popularity).astype(np.int32)
+    # Drop repeats within a user
+    pairs = np.unique(users.astype(np.int64) * SKILLS + skills)
+    return (pairs // SKILLS).astype(np.int32), (pairs % SKILLS).astype(np.int32)
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):.2f}ms  p95 {np.percentile(ms, 95):.2f}ms  max {ms.max():.2f}ms"
+
+
+engine = matching.Matcher()
+known, wanted = relation(1, 8), relation(1, 4)
+started = time.perf_counter()
+engine.known = matching.SkillRelation(*known, USERS, SKILLS)
+engine.wanted = matching.SkillRelation(*wanted, USERS, SKILLS)
+engine._ids = [uuid.UUID(int=i) for i in range(USERS)]
+engine._pos = {user_id: i for i, user_id in enumerate(engine._ids)}
+engine._skill_ids = [uuid.UUID(int=i) for i in range(SKILLS)]
+engine._skill_cols = {skill_id: i for i, skill_id in enumerate(engine._skill_ids)}
+built = time.perf_counter() - started
+engine.can_mentor = rng.random(USERS) < 0.7
+engine.built_at = time.monotonic()
+print(
+    f"{USERS} users, {len(known[0])} known + {len(wanted[0])} wanted pairs; "
+    f"relations built in {built:.1f}s"
+)
+
+learners = rng.integers(0, USERS, QUERIES)
+for label in ("clean", "with overrides"):
+    samples = []
+    for pos in learners:
+        start = time.perf_counter()
+        engine.matches(engine._ids[pos], 10)
+        samples.append(time.perf_counter() - start)
+    print(f"matches(top 10), {label}: {percentiles(samples)}")
+    if label == "clean":
+        # Stay just under the compaction threshold
+        for pos in rng.integers(0, USERS, engine.COMPACT_AT):
+            engine.known.set_row(int(pos), rng.choice(SKILLS, 4, p=popularity))
+
+samples = []
+for pos in rng.integers(0, USERS, QUERIES):
+    start = time.perf_counter()
+    engine.known.set_row(int(pos), rng.choice(SKILLS, 4, p=popularity))
+    samples.append(time.perf_counter() - start)
+print(f"set_row: {percentiles(samples)}")
+start = time.perf_counter()
+engine.known.compact()
+print(f"compact: {(time.perf_counter() - start) * 1000:.0f}ms")
@@ -0,0 +1,74 @@
+"""Compare the Python loop and the DB aggregate behind MentorMeView's hours taught.
+
+Seeds a throwaway mentor with SESSIONS sessions inside a transaction that is
+rolled back at the end, so the database is left untouched.
+
+    DB_ENGINE=sqlite python scripts/bench_mentor_hours.py
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "peerverse.settings")
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from core.models import CustomUser, Session, Skill  # noqa: E402
+from core.views import seconds_taught  # noqa: E402
+
+SESSIONS = int(os.getenv("SESSIONS", "50000"))
+REPEAT = int(os.getenv("REPEAT", "5"))
+
+
+def loop_seconds(user):
+    # The pre-aggregate implementation
+    total_seconds = 0
+    for s in Session.objects.filter(created_by=user):
+        delta = s.end_time - s.start_time
+        total_seconds += max(0, int(delta.total_seconds()))
+    return total_seconds
+
+
+def best_of(fn, *args):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+with transaction.atomic():
+    mentor = CustomUser.objects.create(username="bench-mentor", email="bench-mentor@example.com")
+    skill = Skill.objects.create(name="bench-skill", category="bench")
+    now = timezone.now()
+    Session.objects.bulk_create(
+        [
+            Session(
+                title=f"Session {i}",
+                description="",
+                created_by=mentor,
+                skill=skill,
+                start_time=now + timedelta(hours=i),
+                # Every tenth session ends before it starts and must count as zero
+                end_time=now + timedelta(hours=i, minutes=-30 if i % 10 == 0 else 45),
+                meeting_link="https://example.com/meet",
+            )
+            for i in range(SESSIONS)
+        ],
+        batch_size=5000,
+    )
+
+    loop_total, loop_ms = best_of(loop_seconds, mentor)
+    agg_total, agg_ms = best_of(seconds_taught, mentor)
+    print(f"{SESSIONS} sessions")
+    print(f"  python loop: {loop_ms:9.1f} ms  ({loop_total} s)")
+    print(f"  aggregate:   {agg_ms:9.1f} ms  ({int(agg_total)} s)")
+    transaction.set_rollback(True)
@@ -0,0 +1,177 @@
+"""Compare peak RSS and throughput of upload_video and the chunked upload API.
+
+Each mode runs in its own child process so ru_maxrss is not shared. Requests go
+straight through Django's WSGI handler with the body read from a file on disk, so
+only server-side memory is measured. Rows are seeded inside a transaction that is
+rolled back and files land in a temporary MEDIA_ROOT.
+
+    DB_ENGINE=sqlite SIZE_MB=512 python scripts/bench_upload.py
+"""
+import hashlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+SIZE_MB = int(os.getenv("SIZE_MB", "256"))
+CHUNK_MB = int(os.getenv("CHUNK_MB", "8"))
+BLOCK = 1024 * 1024
+BOUNDARY = "benchboundary"
+
+
+def rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_payload(path):
+    block = os.urandom(BLOCK)
+    with open(path, "wb") as fh:
+        for _ in range(SIZE_MB):
+            fh.write(block)
+
+
+def write_multipart(src, path):
+    with open(src, "rb") as data, open(path, "wb") as fh:
+        fh.write(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="video"; filename="talk.mp4"\r\n'
+            f"Content-Type: video/mp4\r\n\r\n".encode()
+        )
+        while block := data.read(BLOCK):
+            fh.write(block)
+        fh.write(f"\r\n--{BOUNDARY}--\r\n".encode())
+
+
+def chunk_digests(path, chunk):
+    digests = []
+    with open(path, "rb") as fh:
+        while True:
+            digest, left = hashlib.sha256(), chunk
+            while left and (block := fh.read(min(BLOCK, left))):
+                digest.update(block)
+                left -= len(block)
+            if left == chunk:
+                return digests
+            digests.append(digest.hexdigest())
+
+
+def call(app, method, path, token, body=b"", content_type="application/json", headers=None, length=None):
+    # body is bytes or an open file positioned at the data; the file is streamed, never loaded
+    if isinstance(body, bytes):
+        stream, length = io.BytesIO(body), len(body)
+    else:
+        stream = body
+        length = os.fstat(body.fileno()).st_size if length is None else length
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "localhost",
+        "HTTP_AUTHORIZATION": f"Bearer {token}",
+        "CONTENT_TYPE": content_type,
+        "CONTENT_LENGTH": str(length),
+        "wsgi.input": stream,
+        "wsgi.url_scheme": "http",
+        "wsgi.errors": sys.stderr,
+    }
+    environ.update(headers or {})
+    status = []
+    body = b"".join(app(environ, lambda s, h: status.append(s)))
+    assert status[0].startswith("2"), (status, body[:200])
+    return json.loads(body or b"null")
+
+
+def run(mode):
+    media = tempfile.mkdtemp()
+    os.environ["RECORDING_UPLOAD_DIR"] = os.path.join(media, "uploads")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "peerverse.settings")
+
+    import django
+
+    django.setup()
+
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.signals import request_finished, request_started
+    from django.db import close_old_connections, transaction
+    from django.utils import timezone
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from core.models import CustomUser, Session, Skill
+
+    settings.MEDIA_ROOT = media
+    # As in the test client: keep the connection (and its open transaction) across requests
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+
+    payload = os.path.join(media, "payload.bin")
+    write_payload(payload)
+    if mode == "multipart":
+        write_multipart(payload, payload + ".form")
+    app = WSGIHandler()
+
+    with transaction.atomic():
+        mentor = CustomUser.objects.create(username="bench-uploader", email="bench-uploader@example.com")
+        now = timezone.now()
+        session = Session.objects.create(
+            title="Bench",
+            description="",
+            created_by=mentor,
+            skill=Skill.objects.create(name="bench-upload-skill", category="bench"),
+            start_time=now,
+            end_time=now + timedelta(hours=1),
+            meeting_link="https://example.com/meet",
+        )
+        token = str(RefreshToken.for_user(mentor).access_token)
+        base = f"/api/sessions/{session.pk}/"
+
+        size = os.path.getsize(payload)
+        chunk = CHUNK_MB * BLOCK
+        # Client-side work, kept out of the timing
+        digests = chunk_digests(payload, chunk) if mode == "chunked" else []
+
+        baseline = rss_mb()
+        start = time.perf_counter()
+        if mode == "multipart":
+            with open(payload + ".form", "rb") as body:
+                call(app, "POST", base + "upload_video/", token, body, f"multipart/form-data; boundary={BOUNDARY}")
+        else:
+            upload = call(app, "POST", base + "uploads/", token, json.dumps({"filename": "talk.mp4", "size": size}).encode())
+            url = f"{base}uploads/{upload['id']}/"
+            with open(payload, "rb") as data:
+                for i, offset in enumerate(range(0, size, chunk)):
+                    data.seek(offset)
+                    call(
+                        app, "PUT", url, token, data, "application/octet-stream",
+                        {"HTTP_UPLOAD_OFFSET": str(offset), "HTTP_X_CHUNK_SHA256": digests[i]},
+                        length=min(chunk, size - offset),
+                    )
+            call(app, "POST", url + "finalize/", token)
+
+        elapsed = time.perf_counter() - start
+        session.refresh_from_db()
+        assert session.is_recorded and os.path.getsize(session.recording_file.path) == size
+        transaction.set_rollback(True)
+
+    print(json.dumps({"mode": mode, "seconds": elapsed, "peak_rss_mb": rss_mb(), "growth_mb": rss_mb() - baseline}))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run(sys.argv[1])
+        sys.exit(0)
+    print(f"{SIZE_MB} MB recording, {CHUNK_MB} MB chunks")
+    for mode in ("multipart", "chunked"):
+        out = subprocess.run([sys.executable, __file__, mode], check=True, capture_output=True, text=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(
+            f"  {mode:9}: {SIZE_MB / r['seconds']:7.1f} MB/s  "
+            f"peak RSS {r['peak_rss_mb']:6.1f} MB (+{r['growth_mb']:.1f} MB during upload)"
+        )
@@ -0,0 +1,138 @@
+"""Print the query plan of each list endpoint's main query.
+
+Seeds synthetic rows inside a transaction that is rolled back afterwards, runs
+ANALYZE so the planner has statistics, then EXPLAINs the querysets the views
+build and reports which core_* / *_idx indexes each plan uses.
+
+    DB_ENGINE=sqlite python scripts/explain_queries.py
+    USERS=20000 SESSIONS=200000 python scripts/explain_queries.py   # Postgres
+"""
+import os
+import random
+import re
+import sys
+from datetime import timedelta
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "peerverse.settings")
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from core.models import (  # noqa: E402
+    Certificate,
+    CustomUser,
+    Feedback,
+    Recommendation,
+    Session,
+    Skill,
+    Wishlist,
+)
+
+USERS = int(os.getenv("USERS", "2000"))
+SKILLS = int(os.getenv("SKILLS", "200"))
+SESSIONS = int(os.getenv("SESSIONS", "20000"))
+PAGE = 21  # page_size + 1, as CursorPagination fetches
+
+
+def seed():
+    rng = random.Random(0)
+    now = timezone.now()
+    users = CustomUser.objects.bulk_create(
+        CustomUser(
+            username=f"explain-{i}",
+            email=f"explain-{i}@example.com",
+            role=rng.choice(["learner", "sharer", "both"]),
+        )
+        for i in range(USERS)
+    )
+    skills = Skill.objects.bulk_create(
+        Skill(name=f"explain-skill-{i}", category=f"cat-{i % 10}") for i in range(SKILLS)
+    )
+    sessions = Session.objects.bulk_create(
+        (
+            Session(
+                title=f"Session {i}",
+                description="",
+                created_by=rng.choice(users),
+                skill=rng.choice(skills),
+                start_time=now + timedelta(minutes=i),
+                end_time=now + timedelta(minutes=i + 45),
+                meeting_link="https://example.com/meet",
+            )
+            for i in range(SESSIONS)
+        ),
+        batch_size=5000,
+    )
+    Participants = Session.participants.through
+    Participants.objects.bulk_create(
+        (
+            Participants(session_id=s.pk, customuser_id=u.pk)
+            for s in sessions
+            for u in rng.sample(users, 3)
+        ),
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+    Feedback.objects.bulk_create(
+        (Feedback(session=s, given_by=rng.choice(users), rating=rng.randint(1, 5)) for s in sessions),
+        batch_size=5000,
+    )
+    Certificate.objects.bulk_create(
+        (Certificate(user=rng.choice(users), skill=rng.choice(skills)) for _ in range(SESSIONS // 2)),
+        batch_size=5000,
+    )
+    Recommendation.objects.bulk_create(
+        (
+            Recommendation(user=u, suggested_skill=rng.choice(skills), confidence_score=rng.random())
+            for u in users
+            for _ in range(5)
+        ),
+        batch_size=5000,
+    )
+    Wishlist.objects.bulk_create(
+        (Wishlist(user=rng.choice(users), session=s) for s in rng.sample(sessions, SESSIONS // 4)),
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+    return users[0], sessions[0]
+
+
+def queries(user, session):
+    # Mirrors the querysets the viewsets paginate (see core/views.py cursor_ordering)
+    return {
+        "GET /sessions/?created_by=": Session.objects.filter(created_by_id=user.pk).order_by("start_time", "id")[:PAGE],
+        "GET /sessions/?skill=": Session.objects.filter(skill_id=session.skill_id).order_by("start_time", "id")[:PAGE],
+        "GET /sessions/": Session.objects.order_by("start_time", "id")[:PAGE],
+        "GET /sessions/mine/": Session.objects.filter(created_by=user).order_by("start_time", "id")[:PAGE],
+        "GET /certificates/mine/": Certificate.objects.filter(user=user).order_by("-issue_date", "id")[:PAGE],
+        "certificate (user, skill) lookup": Certificate.objects.filter(user=user, skill_id=session.skill_id),
+        "feedback for a session by rating": Feedback.objects.filter(session=session, rating__gte=4),
+        "GET /recommendations/": Recommendation.objects.order_by("-confidence_score", "id")[:PAGE],
+        "recommendations of a user": Recommendation.objects.filter(user=user).order_by("-confidence_score")[:PAGE],
+        "GET /wishlist/mine/": Wishlist.objects.filter(user=user).order_by("-created_at", "id")[:PAGE],
+        "GET /users/?role=": CustomUser.objects.filter(role="sharer").order_by("username")[:PAGE],
+        "GET /mentees/mine/": CustomUser.objects.filter(sessions_joined__created_by=user).distinct().order_by("username")[:PAGE],
+    }
+
+
+def main():
+    with transaction.atomic():
+        user, session = seed()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        for name, qs in queries(user, session).items():
+            plan = qs.explain()
+            used = sorted(set(re.findall(r"\b(\w+_idx|core_\w+_[0-9a-f]{8})\b", plan)))
+            print(f"== {name}")
+            print(f"   indexes: {', '.join(used) or 'none'}")
+            for line in plan.splitlines():
+                print(f"   {line}")
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@ import { NextResponse } from "next/server";
 
 // Django API root for sessions
 const DJANGO_API_ROOT = "http://127.0.0.1:8000/api";
-const SESSIONS_ENDPOINT = `${DJANGO_API_ROOT}/sessions/`;
+// The list is cursor-paginated: ask for the largest page and follow `next`
+const SESSIONS_ENDPOINT = `${DJANGO_API_ROOT}/sessions/?page_size=100`;
 
 type SessionItem = {
   id?: string | number;
@@ -70,11 +71,16 @@ export async function GET(request: Request) {
   // Fetch sessions from Django backend
   let sessions: any = [];
   try {
-    const res = await fetch(SESSIONS_ENDPOINT, { cache: "no-store" });
-    console.log("[AIRec API] fetch", SESSIONS_ENDPOINT, "status:", res.status);
-    const json = await res.json();
-    // Accept either array or wrapped in results/data/items
-    sessions = Array.isArray(json) ? json : json?.results ?? json?.data ?? json?.items ?? [];
+    let url: string | null = SESSIONS_ENDPOINT;
+    while (url) {
+      const res: Response = await fetch(url, { cache: "no-store" });
+      console.log("[AIRec API] fetch", url, "status:", res.status);
+      const json: any = await res.json();
+      // Accept either array or wrapped in results/data/items
+      const page = Array.isArray(json) ? json : json?.results ?? json?.data ?? json?.items ?? [];
+      sessions = sessions.concat(page);
+      url = Array.isArray(json) ? null : json?.next ?? null;
+    }
   } catch (e) {
     console.log("[AIRec API] error fetching sessions:", e);
     sessions = [];
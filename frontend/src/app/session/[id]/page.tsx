@@ -174,12 +174,18 @@ export default function SessionDetailPage() {
           </Button>
         )}
       </div>
-      {session.is_recorded && session.recording_url && (
+      {session.is_recorded && (session.playback_url || session.recording_url) && (
         <div className="bg-white rounded-xl p-4 shadow">
           <p className="font-medium mb-2">Recording</p>
-          <video controls className="w-full rounded">
-            <source src={session.recording_url} />
+          <video controls className="w-full rounded" poster={session.renditions?.poster}>
+            {session.renditions?.hls && <source src={session.renditions.hls} type="application/vnd.apple.mpegurl" />}
+            {session.renditions?.["720p"] && <source src={session.renditions["720p"]} type="video/mp4" />}
+            {session.renditions?.["360p"] && <source src={session.renditions["360p"]} type="video/mp4" />}
+            <source src={(session.playback_url || session.recording_url)!} />
           </video>
+          {(session.processing_status === "pending" || session.processing_status === "processing") && (
+            <p className="text-sm text-gray-500 mt-2">Optimised versions of this recording are still being prepared.</p>
+          )}
         </div>
       )}
     </div>
@@ -1,6 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
-import { api, getCertificatesPaged, getMySessions, getSessionParticipants, uploadVideo } from "@/lib/api";
+import { api, cursorFrom, getCertificatesPaged, getMySessions, getSessionParticipants, uploadVideo } from "@/lib/api";
 import { useToast } from "@/components/ui/use-toast";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader } from "@/components/ui/card";
@@ -26,7 +26,7 @@ const SessionsDetails = () => {
   useEffect(() => {
     (async () => {
       try {
-        const res = await getMySessions(1, 50);
+        const res = await getMySessions(null, 50);
         setSessions(Array.isArray(res) ? res : (res.results || []));
       } catch {
         setSessions([]);
@@ -98,6 +98,16 @@ const MenteesDetails = () => {
   );
 };
 
+// Cursor pages carry no total; report one page past the current while `next` exists
+const pagedTotal = (page: number, pageSize: number, res: any) =>
+  res.next ? (page + 1) * pageSize : (page - 1) * pageSize + (res.results || []).length;
+
+const withNextCursor = (cursors: (string | null)[], page: number, next: string | null) => {
+  const copy = cursors.slice(0, page);
+  if (next) copy[page] = cursorFrom(next);
+  return copy;
+};
+
 const SkillPointsDetails = ({ total }: { total: number }) => {
   return (
     <div className="space-y-3">
@@ -117,12 +127,15 @@ export default function MentorDashboard({ data }: { data: any }) {
   const [certPage, setCertPage] = useState(1);
   const [certPageSize] = useState(6);
   const [certCount, setCertCount] = useState(0);
+  // Cursor for each visited page; index 0 (page 1) starts from the beginning
+  const [certCursors, setCertCursors] = useState<(string | null)[]>([null]);
 
   const [sessions, setSessions] = useState<any[]>([]);
   const [loadingSessions, setLoadingSessions] = useState(true);
   const [sessPage, setSessPage] = useState(1);
   const [sessPageSize] = useState(6);
   const [sessCount, setSessCount] = useState(0);
+  const [sessCursors, setSessCursors] = useState<(string | null)[]>([null]);
   const [viewCert, setViewCert] = useState<any | null>(null);
   const [search, setSearch] = useState("");
 
@@ -151,14 +164,15 @@ export default function MentorDashboard({ data }: { data: any }) {
       // Certificates paginated
       try {
         setLoadingCerts(true);
-        const res = await getCertificatesPaged(certPage, certPageSize);
+        const res = await getCertificatesPaged(certCursors[certPage - 1] ?? null, certPageSize);
         if (Array.isArray(res)) {
           // in case backend returned list directly
           setCertificates(res);
           setCertCount(res.length);
         } else {
           setCertificates(res.results || []);
-          setCertCount(res.count || 0);
+          setCertCount(pagedTotal(certPage, certPageSize, res));
+          setCertCursors((c) => withNextCursor(c, certPage, res.next));
         }
       } finally {
         setLoadingCerts(false);
@@ -166,13 +180,14 @@ export default function MentorDashboard({ data }: { data: any }) {
       // My sessions paginated
       try {
         setLoadingSessions(true);
-        const res2 = await getMySessions(sessPage, sessPageSize);
+        const res2 = await getMySessions(sessCursors[sessPage - 1] ?? null, sessPageSize);
         if (Array.isArray(res2)) {
           setSessions(res2);
           setSessCount(res2.length);
         } else {
           setSessions(res2.results || []);
-          setSessCount(res2.count || 0);
+          setSessCount(pagedTotal(sessPage, sessPageSize, res2));
+          setSessCursors((c) => withNextCursor(c, sessPage, res2.next));
         }
       } finally {
         setLoadingSessions(false);
@@ -199,9 +214,13 @@ export default function MentorDashboard({ data }: { data: any }) {
       // refresh certificates after upload (some backends issue certificates after upload)
       setCertPage(1);
       setLoadingCerts(true);
-      const res = await getCertificatesPaged(1, certPageSize);
+      const res = await getCertificatesPaged(null, certPageSize);
       if (Array.isArray(res)) { setCertificates(res); setCertCount(res.length); }
-      else { setCertificates(res.results || []); setCertCount(res.count || 0); }
+      else {
+        setCertificates(res.results || []);
+        setCertCount(pagedTotal(1, certPageSize, res));
+        setCertCursors(withNextCursor([null], 1, res.next));
+      }
     } catch (e: any) {
       toast({ variant: "destructive", title: "Upload failed", description: e?.response?.data?.detail || e?.message || "Something went wrong" });
     } finally {
@@ -79,8 +79,27 @@ export type Session = {
   meeting_link: string;
   is_recorded: boolean;
   recording_url?: string | null;
+  // Range-capable stream of the uploaded recording_file
+  playback_url?: string | null;
+  processing_status?: 'none' | 'pending' | 'processing' | 'ready' | 'failed';
+  // URLs of derived media once processed: "360p", "720p", ..., "hls" (master playlist), "poster"
+  renditions?: Record<string, string>;
 };
 
+// List endpoints are cursor-paginated: { next, previous, results }
+export type CursorPage<T> = { next: string | null; previous: string | null; results: T[] };
+
+export function listOf<T>(data: CursorPage<T> | T[] | undefined): T[] {
+  if (Array.isArray(data)) return data;
+  return data?.results ?? [];
+}
+
+// Extract the opaque cursor token from a `next`/`previous` link
+export function cursorFrom(link: string | null | undefined): string | null {
+  if (!link) return null;
+  try { return new URL(link).searchParams.get('cursor'); } catch { return null; }
+}
+
 // Helper methods with basic mock fallback
 // IMPORTANT: Backend JWT obtain pair endpoint is /api/auth/token/.
 // Our api base may already include /api from env; we always call relative path '/auth/token/'.
@@ -138,10 +157,10 @@ export async function getDashboard() {
 }
 
 export async function getUsers() {
-  try { const r = await api.get<User[]>('/users/'); return r.data; } catch { return []; }
+  try { const r = await api.get('/users/'); return listOf<User>(r.data); } catch { return []; }
 }
 export async function getSkills() {
-  try { const r = await api.get<Skill[]>('/skills/'); return r.data; } catch { return []; }
+  try { const r = await api.get('/skills/'); return listOf<Skill>(r.data); } catch { return []; }
 }
 export async function searchSkills(query: string) {
   const q = query?.trim();
@@ -149,16 +168,16 @@ export async function searchSkills(query: string) {
   try { const r = await api.get('/skills/', { params: { search: q } }); return r.data?.results ?? r.data ?? []; } catch { return []; }
 }
 export async function getBadges() {
-  try { const r = await api.get<Badge[]>('/badges/'); return r.data; } catch { return []; }
+  try { const r = await api.get('/badges/'); return listOf<Badge>(r.data); } catch { return []; }
 }
 export async function getCertificates() {
-  try { const r = await api.get<Certificate[]>('/certificates/'); return r.data; } catch { return []; }
+  try { const r = await api.get('/certificates/'); return listOf<Certificate>(r.data); } catch { return []; }
 }
-export async function getCertificatesPaged(page = 1, page_size = 10) {
-  try { const r = await api.get('/certificates/mine/', { params: { page, page_size } }); return r.data; } catch { return { results: [], count: 0, next: null, previous: null }; }
+export async function getCertificatesPaged(cursor: string | null = null, page_size = 10) {
+  try { const r = await api.get('/certificates/mine/', { params: { cursor, page_size } }); return r.data; } catch { return { results: [], next: null, previous: null }; }
 }
 export async function getSessions() {
-  try { const r = await api.get<Session[]>('/sessions/'); return r.data; } catch { return []; }
+  try { const r = await api.get('/sessions/'); return listOf<Session>(r.data); } catch { return []; }
 }
 export async function getSessionsBySkill(skillId: string) {
   try { const r = await api.get('/sessions/', { params: { skill: skillId } }); return r.data?.results ?? r.data ?? []; } catch { return []; }
@@ -177,12 +196,40 @@ export async function searchSessions(query: string) {
   try { const r = await api.get('/sessions/', { params: { search: q } }); return r.data; } catch { return { results: [], count: 0 } as any; }
 }
 
-export async function uploadSessionVideo(sessionId: string, file: File) {
-  const form = new FormData();
-  form.append('video', file);
-  const r = await api.post(`/sessions/${sessionId}/upload_video/`, form, {
-    headers: { 'Content-Type': 'multipart/form-data' },
-  });
+async function sha256Hex(data: ArrayBuffer) {
+  const digest = await crypto.subtle.digest('SHA-256', data);
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+// Resumable upload: the file is sent in chunks, each with its SHA-256, starting from
+// whatever offset the server already has (so a retry after a dropped connection resumes).
+export async function uploadSessionVideo(sessionId: string, file: File, chunkSize = 8 * 1024 * 1024) {
+  const base = `/sessions/${sessionId}/uploads/`;
+  const { data: upload } = await api.post(base, { filename: file.name, size: file.size });
+  const url = `${base}${upload.id}/`;
+  const size = Math.min(chunkSize, upload.max_chunk || chunkSize);
+  let offset: number = upload.offset;
+  let retries = 0;
+  while (offset < file.size) {
+    const chunk = await file.slice(offset, offset + size).arrayBuffer();
+    try {
+      const r = await api.put(url, chunk, {
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'Upload-Offset': String(offset),
+          'X-Chunk-SHA256': await sha256Hex(chunk),
+        },
+      });
+      offset = r.data.offset;
+      retries = 0;
+    } catch (err: any) {
+      if (++retries > 3) throw err;
+      // 409 carries the offset to resume from; otherwise ask the server
+      const resume = err?.response?.data?.offset;
+      offset = typeof resume === 'number' ? resume : (await api.get(url)).data.offset;
+    }
+  }
+  const r = await api.post(`${url}finalize/`);
   return r.data;
 }
 
@@ -209,16 +256,16 @@ export async function uploadVideo(formData: FormData) {
 
 // List sessions created by current user. Uses /sessions/mine/ if available,
 // otherwise falls back to filtering /sessions/ by created_by decoded from access token.
-export async function getMySessions(page = 1, page_size = 10) {
+export async function getMySessions(cursor: string | null = null, page_size = 10) {
   try {
-    const r = await api.get('/sessions/mine/', { params: { page, page_size } });
+    const r = await api.get('/sessions/mine/', { params: { cursor, page_size } });
     return r.data;
   } catch (err: any) {
     if (err?.response?.status === 404) {
       const { getUserIdFromAccess } = await import('./jwt');
       const uid = getUserIdFromAccess();
-      if (!uid) return { results: [], count: 0, next: null, previous: null } as any;
-      const r2 = await api.get('/sessions/', { params: { created_by: uid, page, page_size } });
+      if (!uid) return { results: [], next: null, previous: null } as any;
+      const r2 = await api.get('/sessions/', { params: { created_by: uid, cursor, page_size } });
       return r2.data;
     }
     throw err;